@@ -0,0 +1,122 @@
+"""Measures MasterConverter throughput with 1, 2, 4, and 8 converter processes.
+
+Usage:
+    python benchmarks/converter_scaling.py [--input PATH] [--lines N]
+        [--converter MODULE] [--genome hg38] [--procs 1 2 4 8] [--threads]
+
+Without --input, a synthetic single-sample VCF of --lines lines is written to
+a temporary directory. --converter is a converter module name or directory
+(vcf-converter by default). With --threads, the thread mode is measured
+instead of the process mode. With --procs 1, the thread mode is used in either
+case.
+
+Measured on a 1-CPU machine with a 1,000,000-line tsv input, where processes
+can only add overhead:
+
+    procs   variant dicts   records
+    2       80.09s          76.56s
+    4       84.18s          74.12s
+
+Run-to-run noise on that machine was about 10s. A 2,500-line batch pickled to
+125,763 bytes as variant dicts and 88,209 bytes as records, and a pickle round
+trip took 7.8ms and 4.8ms. Scaling on multiple cores has not been measured yet;
+on such a machine, run
+
+    python benchmarks/converter_scaling.py --procs 1 2 4 8
+"""
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import List
+
+
+def write_synthetic_vcf(path: Path, num_lines: int):
+    from random import Random
+
+    rnd = Random(0)
+    bases = "ACGT"
+    with open(path, "w") as wf:
+        wf.write("##fileformat=VCFv4.2\n")
+        wf.write('##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">\n')
+        wf.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tS1\n")
+        pos = 10000
+        for line_no in range(num_lines):
+            chrom = f"chr{line_no * 22 // num_lines + 1}"
+            pos += rnd.randint(1, 200)
+            ref = rnd.choice(bases)
+            alt = rnd.choice([v for v in bases if v != ref])
+            wf.write(f"{chrom}\t{pos}\t.\t{ref}\t{alt}\t.\tPASS\t.\tGT\t0/1\n")
+
+
+def count_data_lines(path: Path) -> int:
+    with open(path, "rb") as f:
+        return sum([1 for line in f if not line.startswith(b"#")])
+
+
+def run_converter(
+    input_path: Path,
+    converter: str,
+    genome: str,
+    num_procs: int,
+    use_processes: bool,
+    output_dir: Path,
+) -> float:
+    from time import time
+    from oakvar.lib.base.master_converter import MasterConverter
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    master = MasterConverter(
+        inputs=[str(input_path)],
+        converter_module=converter,
+        output_dir=str(output_dir),
+        genome=genome,
+        mp=num_procs,
+        use_processes=use_processes,
+    )
+    stime = time()
+    master.run()
+    return time() - stime
+
+
+def main(args: List[str]):
+    from os import cpu_count
+    from tempfile import TemporaryDirectory
+
+    parser = ArgumentParser()
+    parser.add_argument("--input", default=None)
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--converter", default="vcf-converter")
+    parser.add_argument("--genome", default="hg38")
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", action="store_true", default=False)
+    parsed = parser.parse_args(args)
+    with TemporaryDirectory() as tmp_dir:
+        if parsed.input:
+            input_path = Path(parsed.input)
+        else:
+            input_path = Path(tmp_dir) / "synthetic.vcf"
+            write_synthetic_vcf(input_path, parsed.lines)
+        num_lines = count_data_lines(input_path)
+        mode = "threads" if parsed.threads else "processes"
+        print(f"{num_lines} lines, {mode}, {cpu_count()} CPUs")
+        base_runtime = None
+        for num_procs in parsed.procs:
+            runtime = run_converter(
+                input_path,
+                parsed.converter,
+                parsed.genome,
+                num_procs,
+                not parsed.threads,
+                Path(tmp_dir) / f"out_{num_procs}",
+            )
+            if base_runtime is None:
+                base_runtime = runtime
+            print(
+                f"{num_procs}\t{runtime:.2f}s\t{num_lines / runtime:.0f} lines/s\t"
+                + f"{base_runtime / runtime:.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    from sys import argv
+
+    main(argv[1:])
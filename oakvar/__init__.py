@@ -68,6 +68,7 @@ from .lib.util import inout
 from .lib.util import admin_util
 from .lib.util.util import get_df_from_db
 from .lib.util.util import get_sample_uid_variant_arrays
+from .lib.util.util import iter_sample_uid_variant_blocks
 from .lib.util.inout import read_crv
 from .lib.util.seq import get_lifter
 from .lib.util.seq import liftover
@@ -263,4 +264,5 @@ _ = cli or wgs
 _ = stdouter
 _ = get_lifter or liftover or get_wgs_reader
 _ = get_df_from_db or get_sample_uid_variant_arrays or read_crv
+_ = iter_sample_uid_variant_blocks
 _ = get_module_test_dir
@@ -119,6 +119,7 @@ def run(
     skip_variant_deduplication: bool = False,
     keep_liftover_failed: bool = False,
     keep_ref: bool = False,
+    converter_processes: bool = False,
     loop=None,
     outer=None,
 ) -> Optional[Dict[str, Any]]:
@@ -170,6 +171,7 @@ def run(
         uid (Optional[str]): uid
         skip_variant_deduplication (bool): Skip de-duplication of variants.
         keep_ref (bool): Keep reference alleles.
+        converter_processes (bool): If True, input conversion runs in `mp` worker processes instead of threads.
         loop:
         outer:
 
@@ -242,6 +244,7 @@ def run(
         skip_variant_deduplication=skip_variant_deduplication,
         keep_liftover_failed=keep_liftover_failed,
         keep_ref=keep_ref,
+        converter_processes=converter_processes,
         uid=uid,
         outer=outer,
     )
@@ -333,6 +336,9 @@ def report(
     from . import handle_exception
     from ..lib.util.util import load_class
     from ..lib.base.reporter import BaseReporter
+    from ..lib.base.reporter_fanout import can_fan_out_reporters
+    from ..lib.base.reporter_fanout import ReporterFanout
+    from ..lib.system import get_max_num_concurrent_modules_per_job
 
     if report_types is None:
         report_types = []
@@ -394,6 +400,69 @@ def report(
         mode="a",
         logtofile=logtofile,
     )
+    arg_dict = {
+        "dbpath": str(dbpath),
+        "report_types": report_types,
+        "filterpath": filterpath,
+        "filter": filter,
+        "filtersql": filtersql,
+        "filtername": filtername,
+        "filterstring": filterstring,
+        "savepath": savepath,
+        "confpath": confpath,
+        "conf": conf,
+        "nogenelevelonvariantlevel": nogenelevelonvariantlevel,
+        "inputfiles": inputfiles,
+        "separatesample": separatesample,
+        "output_dir": str(output_dir),
+        "run_name": run_name,
+        "includesample": includesample,
+        "excludesample": excludesample,
+        "package": package,
+        "cols": cols,
+        "level": level,
+        "user": user,
+        "no_summary": no_summary,
+        "serveradmindb": serveradmindb,
+        "module_options": module_options,
+        "logtofile": logtofile,
+        "outer": outer,
+    }
+    if (
+        len(module_infos) > 1
+        and get_max_num_concurrent_modules_per_job() > 1
+        and can_fan_out_reporters(
+            [module_info.script_path for module_info in module_infos.values()]
+        )
+    ):
+        if logger:
+            logger.info(f"Generating {', '.join(module_infos.keys())} reports...")
+        elif outer:
+            outer.write(f"Generating {', '.join(module_infos.keys())} reports...")
+        try:
+            if not loop:
+                loop = get_event_loop()
+            fanout = ReporterFanout(
+                {k: v.script_path for k, v in module_infos.items()},
+                {
+                    k: dict(
+                        arg_dict,
+                        module_name=k,
+                        module_options=module_options.get(k, {}),
+                    )
+                    for k in module_infos.keys()
+                },
+                head_n=head_n,
+            )
+            response = loop.run_until_complete(fanout.run())
+            for response_t in response.values():
+                if isinstance(response_t, list):
+                    response_t = " ".join(response_t)
+                if response_t is not None and outer:
+                    outer.write(f"report created: {response_t}")
+        except Exception as e:
+            handle_exception(e)
+        return response
     for module_name, module_info in module_infos.items():
         try:
             if logger:
@@ -401,35 +470,12 @@ def report(
             elif outer:
                 outer.write(f"Generating {module_name} report...")
             Reporter: Type[BaseReporter] = load_class(module_info.script_path, "Reporter")  # type: ignore
-            #reporter_module_options = module_options.get(module_name, {})
             reporter = Reporter(
-                dbpath=str(dbpath),
-                report_types=report_types,
-                filterpath=filterpath,
-                filter=filter,
-                filtersql=filtersql,
-                filtername=filtername,
-                filterstring=filterstring,
-                savepath=savepath,
-                confpath=confpath,
-                conf=conf,
-                module_name=module_name,
-                nogenelevelonvariantlevel=nogenelevelonvariantlevel,
-                inputfiles=inputfiles,
-                separatesample=separatesample,
-                output_dir=str(output_dir),
-                run_name=run_name,
-                includesample=includesample,
-                excludesample=excludesample,
-                package=package,
-                cols=cols,
-                level=level,
-                user=user,
-                no_summary=no_summary,
-                serveradmindb=serveradmindb,
-                module_options=module_options,
-                logtofile=logtofile,
-                outer=outer,
+                **dict(
+                    arg_dict,
+                    module_name=module_name,
+                    module_options=module_options.get(module_name, {}),
+                )
             )
             response_t = None
             if not loop:
@@ -179,16 +179,19 @@ def sqliteinfo(dbpath: Union[Path, str], fmt: str = "json", outer=None):
         return out
 
 
-def mergesqlite(dbpaths: List[str] = [], outpath: str = ""):
+def mergesqlite(dbpaths: List[str] = [], outpath: str = "", num_workers: int = 1):
     """mergesqlite.
 
     Args:
         dbpaths (List[str]): dbpaths
         outpath (str): outpath
+        num_workers (int): Number of processes which merge groups of
+            dbpaths in parallel before the groups are merged together.
     """
     import sqlite3
-    from json import loads, dumps
-    from shutil import copy
+    import multiprocessing as mp
+    from os import remove
+    from ..lib.util.db import merge_result_dbs
 
     if len(dbpaths) < 2:
         exit("Multiple sqlite file paths should be given")
@@ -203,7 +206,7 @@ def mergesqlite(dbpaths: List[str] = [], outpath: str = ""):
     g_cols = sorted([r[0] for r in c.fetchall()])
     c.close()
     conn.close()
-    for dbpath in dbpaths[1:]:
+    for dbpath in dbpaths:
         conn = sqlite3.connect(dbpath)
         c = conn.cursor()
         c.execute("select col_name from variant_header")
@@ -212,113 +215,43 @@ def mergesqlite(dbpaths: List[str] = [], outpath: str = ""):
         c.execute("select col_name from gene_header")
         if g_cols != sorted([r[0] for r in c.fetchall()]):
             exit("Annotation columns mismatch (gene table)")
-    # Copies the first db.
-    print(f"Copying {dbpaths[0]} to {outpath}...")
-    copy(dbpaths[0], outpath)
-    outconn = sqlite3.connect(outpath)
-    outc = outconn.cursor()
-    # Gets key column numbers.
-    outc.execute("select col_name from variant_header order by rowid")
-    cols = [r[0] for r in outc.fetchall()]
-    v_chrom_colno = cols.index("base__chrom")
-    v_pos_colno = cols.index("base__pos")
-    v_ref_colno = cols.index("base__ref_base")
-    v_alt_colno = cols.index("base__alt_base")
-    outc.execute("select col_name from gene_header order by rowid")
-    cols = [r[0] for r in outc.fetchall()]
-    g_hugo_colno = cols.index("base__hugo")
-    outc.execute("select col_name from sample_header order by rowid")
-    cols = [r[0] for r in outc.fetchall()]
-    s_uid_colno = cols.index("base__uid")
-    outc.execute("select col_name from mapping_header order by rowid")
-    cols = [r[0] for r in outc.fetchall()]
-    m_uid_colno = cols.index("base__uid")
-    m_fileno_colno = cols.index("base__fileno")
-    outc.execute("select max(base__uid) from variant")
-    new_uid = outc.fetchone()[0] + 1
-    # Input paths
-    outc.execute('select colkey, colval from info where colkey="_input_paths"')
-    input_paths = loads(outc.fetchone()[1].replace("'", '"'))
-    new_fileno = max([int(v) for v in input_paths.keys()]) + 1
-    rev_input_paths = {}
-    for fileno, filepath in input_paths.items():
-        rev_input_paths[filepath] = fileno
-    # Makes initial hugo and variant id lists.
-    outc.execute("select base__hugo from gene")
-    genes = {r[0] for r in outc.fetchall()}
-    outc.execute(
-        "select base__chrom, base__pos, base__ref_base, base__alt_base from variant"
-    )
-    variants = {variant_id(r[0], r[1], r[2], r[3]) for r in outc.fetchall()}
-    for dbpath in dbpaths[1:]:
-        print(f"Merging {dbpath}...")
-        conn = sqlite3.connect(dbpath)
-        c = conn.cursor()
-        # Gene
-        c.execute("select * from gene order by rowid")
-        for r in c.fetchall():
-            hugo = r[g_hugo_colno]
-            if hugo in genes:
-                continue
-            q = f'insert into gene values ({",".join(["?" for _ in range(len(r))])})'
-            outc.execute(q, r)
-            genes.add(hugo)
-        # Variant
-        uid_dic = {}
-        c.execute("select * from variant order by rowid")
-        for r in c.fetchall():
-            vid = variant_id(
-                r[v_chrom_colno], r[v_pos_colno], r[v_ref_colno], r[v_alt_colno]
+        c.execute('select colval from info where colkey="_input_paths"')
+        if not c.fetchone():
+            exit(f"Input file information is missing in {dbpath}")
+        c.close()
+        conn.close()
+    # Groups of dbpaths are merged in parallel, and then the merged groups.
+    # Variants get the same uids as when dbpaths are merged one by one.
+    num_groups = min(num_workers, len(dbpaths) // 2)
+    if num_groups < 2:
+        merge_result_dbs(dbpaths, outpath)
+        return True
+    group_size = -(-len(dbpaths) // num_groups)
+    groups = [
+        dbpaths[i : i + group_size] for i in range(0, len(dbpaths), group_size)
+    ]
+    group_outpaths = [f"{outpath}.part{i}.sqlite" for i in range(len(groups))]
+    try:
+        with mp.get_context("spawn").Pool(num_groups) as pool:
+            pool.starmap(
+                merge_result_dbs,
+                [
+                    (group, group_outpath)
+                    for group, group_outpath in zip(groups, group_outpaths)
+                    if len(group) > 1
+                ],
             )
-            if vid in variants:
-                continue
-            old_uid = r[0]
-            r = list(r)
-            r[0] = new_uid
-            uid_dic[old_uid] = new_uid
-            new_uid += 1
-            q = f'insert into variant values ({",".join(["?" for _ in range(len(r))])})'
-            outc.execute(q, r)
-            variants.add(vid)
-        # Sample
-        c.execute("select * from sample order by rowid")
-        for r in c.fetchall():
-            uid = r[s_uid_colno]
-            if uid in uid_dic:
-                new_uid = uid_dic[uid]
-                r = list(r)
-                r[s_uid_colno] = new_uid
-                q = f'insert into sample values ({",".join(["?" for _ in range(len(r))])})'
-                outc.execute(q, r)
-        # File numbers
-        c.execute('select colkey, colval from info where colkey="_input_paths"')
-        ips = loads(c.fetchone()[1].replace("'", '"'))
-        fileno_dic = {}
-        for fileno, filepath in ips.items():
-            if filepath not in rev_input_paths:
-                input_paths[str(new_fileno)] = filepath
-                rev_input_paths[filepath] = str(new_fileno)
-                fileno_dic[int(fileno)] = new_fileno
-                new_fileno += 1
-        # Mapping
-        c.execute("select * from mapping order by rowid")
-        for r in c.fetchall():
-            uid = r[m_uid_colno]
-            if uid in uid_dic:
-                new_uid = uid_dic[uid]
-                r = list(r)
-                r[m_uid_colno] = new_uid
-                r[m_fileno_colno] = fileno_dic[r[m_fileno_colno]]
-                q = f'insert into mapping values ({",".join(["?" for _ in range(len(r))])})'
-                outc.execute(q, r)
-    q = 'update info set colval=? where colkey="_input_paths"'
-    outc.execute(q, [dumps(input_paths)])
-    q = 'update info set colval=? where colkey="Input file name"'
-    v = ";".join(
-        [input_paths[str(v)] for v in sorted(input_paths.keys(), key=lambda v: int(v))]
-    )
-    outc.execute(q, [v])
-    outconn.commit()
+        merge_result_dbs(
+            [
+                group_outpath if len(group) > 1 else group[0]
+                for group, group_outpath in zip(groups, group_outpaths)
+            ],
+            outpath,
+        )
+    finally:
+        for group_outpath in group_outpaths:
+            if Path(group_outpath).exists():
+                remove(group_outpath)
     return True
 
 
@@ -526,3 +459,48 @@ def move_job(job_dir="", new_account="", outer=None):
         else:
             return msg
     return move_job_to_account(job_dir, new_account)
+
+
+def filter_index(dbpath: Union[Path, str] = "", filterpath: str = "", outer=None):
+    """filter_index.
+
+    Creates indexes on the columns which a filter file filters a result
+    database on, so that filtering it does not scan the whole table.
+
+    Args:
+        dbpath (str): Path to a result SQLite file
+        filterpath (str): Path to a filter JSON or YAML file
+        outer: Deprecated
+
+    Returns:
+        Names of the created indexes
+    """
+    from ..lib.util.asyn import get_event_loop
+    from ..lib.util.db import make_filter_column_indexes
+    from ..lib.exceptions import ExpectedException
+
+    _ = outer
+    if not dbpath:
+        raise ExpectedException("SQLite result file should be given as dbpath.")
+    if not filterpath:
+        raise ExpectedException("Filter file should be given as filterpath.")
+    loop = get_event_loop()
+    columns = loop.run_until_complete(
+        get_filter_columns_async(dbpath=str(dbpath), filterpath=filterpath)
+    )
+    return make_filter_column_indexes(dbpath, columns)
+
+
+async def get_filter_columns_async(dbpath: str = "", filterpath: str = ""):
+    """get_filter_columns_async.
+
+    Args:
+        dbpath (str): Path to a result SQLite file
+        filterpath (str): Path to a filter JSON or YAML file
+    """
+    from .. import ReportFilter
+
+    cf = await ReportFilter.create(dbpath=dbpath, filterpath=filterpath, strict=False)
+    columns = cf.get_filter_columns()
+    await cf.close_db()
+    return columns
@@ -358,4 +358,10 @@ def add_parser_ov_run(subparsers):
         default=False,
         help="Keep reference variants",
     )
+    parser_ov_run.add_argument(
+        "--converter-processes",
+        action="store_true",
+        default=False,
+        help="Run input conversion in worker processes instead of threads. The number of processes is set by --mp.",
+    )
     parser_ov_run.set_defaults(func=cli_run)
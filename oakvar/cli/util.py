@@ -93,6 +93,25 @@ def movejob(args, __name__="util move-job"):
     console.print(out)
 
 
+@cli_entry
+def cli_util_filterindex(args):
+    filterindex(args)
+
+
+@cli_func
+def filterindex(args, __name__="util filter-index"):
+    from rich.console import Console
+    from ..api.util import filter_index
+
+    index_names = filter_index(**args)
+    console = Console()
+    if index_names:
+        for index_name in index_names:
+            console.print(f"Created {index_name}")
+    else:
+        console.print("No new index was needed.")
+
+
 # @cli_entry
 # def cli_util_mergesqlite(args):
 # mergesqlite(args)
@@ -193,6 +212,22 @@ def get_parser_fn_util():
     parser_fn_util_movejob.add_argument("--new-account", help="New account")
     parser_fn_util_movejob.set_defaults(func=cli_util_movejob)
 
+    # Index filter columns
+    parser_fn_util_filterindex = _subparsers.add_parser(
+        "filter-index",
+        help="Create indexes on the columns used by a filter in a result file",
+    )
+    parser_fn_util_filterindex.add_argument("dbpath", help="SQLite result file path")
+    parser_fn_util_filterindex.add_argument(
+        "-f", dest="filterpath", required=True, help="Path to a filter JSON file"
+    )
+    parser_fn_util_filterindex.set_defaults(func=cli_util_filterindex)
+    parser_fn_util_filterindex.r_return = "A list. Names of created indexes"  # type: ignore
+    parser_fn_util_filterindex.r_examples = [  # type: ignore
+        "# Index the columns used by a filter file in an analysis result file",
+        '#roakvar::util.filter_index(dbpath="example.sqlite", filterpath="filter.json")',
+    ]
+
     # Filter SQLite
     # parser_fn_util_filtersqlite = _subparsers.add_parser(
     #    "filtersqlite",
@@ -60,6 +60,9 @@ logger = None
 default_gui_result_pagesize = 100
 gui_result_pagesize_key = "gui_result_pagesize"
 servermode = False
+max_result_sessions = 16
+result_sessions = None
+json_reporter_module = None
 
 
 async def get_nowg_annot_modules(_):
@@ -369,10 +372,107 @@ async def get_count(request):
     return web.json_response(content)
 
 
-async def get_result(request):
-    import importlib
-    import importlib.util
+def get_json_reporter_module():
     from pathlib import Path
+    from ...lib.util.util import load_module
+
+    global json_reporter_module
+    if json_reporter_module is not None:
+        return json_reporter_module
+    reporter_name = "jsonreporter"
+    reporter_path = Path(__file__).parent / f"{reporter_name}.py"
+    m = load_module(reporter_path)
+    if m is None:
+        raise Exception(f"Could not load {reporter_name}.")
+    json_reporter_module = m
+    return m
+
+
+def get_db_signature(dbpath):
+    # Only the main file is looked at. The report filter switches result
+    # databases to WAL mode, which touches the -wal file on every read.
+    st = os.stat(dbpath)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+async def get_result_session(
+    dbpath, filterstring, confpath, separatesample, no_summary, make_filtered_table
+):
+    """Returns a cached json reporter session for a result view.
+
+    The reporter keeps its filter, column infos, and column categories
+    between calls, so paging through the same filtered view does not
+    rebuild them. Sessions are dropped when the result database changes.
+    """
+    import asyncio
+    from collections import OrderedDict
+
+    global result_sessions
+    if result_sessions is None:
+        result_sessions = OrderedDict()
+    key = (
+        dbpath,
+        filterstring,
+        confpath,
+        separatesample,
+        no_summary,
+        bool(make_filtered_table),
+    )
+    signature = get_db_signature(dbpath)
+    session = result_sessions.get(key)
+    if session is not None and session["signature"] != signature:
+        del result_sessions[key]
+        async with session["lock"]:
+            await session["reporter"].close_db()
+        session = None
+    if session is not None:
+        result_sessions.move_to_end(key)
+        return session
+    m = get_json_reporter_module()
+    reporter = m.Reporter(
+        dbpath=dbpath,
+        module_name="jsonreporter",
+        nogenelevelonvariantlevel=True,
+        confpath=confpath,
+        filterstring=filterstring,
+        separatesample=separatesample,
+        report_types=["text"],
+        no_summary=no_summary,
+        make_col_categories=True,
+    )
+    reporter.keep_session = True
+    session = {
+        "reporter": reporter,
+        "lock": asyncio.Lock(),
+        "signature": signature,
+    }
+    result_sessions[key] = session
+    while len(result_sessions) > max_result_sessions:
+        _, old_session = result_sessions.popitem(last=False)
+        async with old_session["lock"]:
+            await old_session["reporter"].close_db()
+    return session
+
+
+def get_result_content(tab, data, ftable_uid):
+    content = {}
+    content["stat"] = {
+        "rowsreturned": True,
+        "wherestr": "",
+        "filtered": True,
+        "filteredresultmessage": "",
+        "norows": data["info"]["norows"],
+    }
+    content["columns"] = get_colmodel(tab, data["colinfo"])
+    content["data"] = get_datamodel(data[tab])
+    content["status"] = "normal"
+    content["warning_msgs"] = data["warning_msgs"]
+    content["total_norows"] = data["total_norows"]
+    content["ftable_uid"] = ftable_uid
+    return content
+
+
+async def get_result(request):
     from ...lib.exceptions import DatabaseConnectionError
 
     global logger
@@ -400,14 +500,6 @@ async def get_result(request):
         confpath = queries["confpath"]
     else:
         confpath = None
-    reporter_name = "jsonreporter"
-    this_file_dir = Path(__file__).parent
-    reporter_path = this_file_dir / f"{reporter_name}.py"
-    spec = importlib.util.spec_from_file_location(reporter_name, reporter_path)
-    if spec is None:
-        raise Exception(f"Could not load {reporter_name}.")
-    m = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(m)  # type: ignore
     if "separatesample" in queries:
         separatesample = queries["separatesample"]
         if separatesample == "true":
@@ -418,41 +510,23 @@ async def get_result(request):
         separatesample = False
     no_summary = queries.get("no_summary")
     add_summary = not no_summary
-    reporter = m.Reporter(
-        dbpath=dbpath,
-        module_name=reporter_name,
-        nogenelevelonvariantlevel=True,
-        confpath=confpath,
-        filterstring=filterstring,
-        separatesample=separatesample,
-        report_types=["text"],
-        no_summary=no_summary,
-        make_col_categories=True,
-    )
-    data = await reporter.run(
-        tab=tab,
-        pagesize=pagesize,
-        page=page,
-        add_summary=add_summary,
-        make_filtered_table=make_filtered_table,
-        make_col_categories=True,
+    session = await get_result_session(
+        dbpath, filterstring, confpath, separatesample, no_summary, make_filtered_table
     )
-    data["modules_info"] = await get_modules_info(request)
-    content = {}
-    content["stat"] = {
-        "rowsreturned": True,
-        "wherestr": "",
-        "filtered": True,
-        "filteredresultmessage": "",
-        "norows": data["info"]["norows"],
-    }
-    content["columns"] = get_colmodel(tab, data["colinfo"])
-    content["data"] = get_datamodel(data[tab])
-    content["status"] = "normal"
-    content["modules_info"] = data["modules_info"]
-    content["warning_msgs"] = data["warning_msgs"]
-    content["total_norows"] = data["total_norows"]
-    content["ftable_uid"] = reporter.ftable_uid
+    reporter = session["reporter"]
+    async with session["lock"]:
+        data = await reporter.run(
+            tab=tab,
+            pagesize=pagesize,
+            page=page,
+            add_summary=add_summary,
+            make_filtered_table=make_filtered_table,
+            make_col_categories=True,
+        )
+        content = get_result_content(tab, data, reporter.ftable_uid)
+        # The first run switches the database to WAL mode.
+        session["signature"] = get_db_signature(dbpath)
+    content["modules_info"] = await get_modules_info(request)
     t = round(time.time() - start_time, 3)
     if logger is not None:
         logger.info("Done getting result of [{}][{}] in {}s".format(dbname, tab, t))
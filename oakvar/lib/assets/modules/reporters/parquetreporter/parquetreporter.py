@@ -0,0 +1,53 @@
+# OakVar
+#
+# Copyright (c) 2024 Oak Bioinformatics, LLC
+#
+# All rights reserved.
+#
+# Do not distribute or use this software without obtaining
+# a license from Oak Bioinformatics, LLC.
+#
+# Do not use this software to develop another software
+# which competes with the products by Oak Bioinformatics, LLC,
+# without obtaining a license for such use from Oak Bioinformatics, LLC.
+#
+# For personal use of non-commercial nature, you may use this software
+# after registering with `ov store account create`.
+#
+# For research use of non-commercial nature, you may use this software
+# after registering with `ov store account create`.
+#
+# For use by commercial entities, you must obtain a commercial license
+# from Oak Bioinformatics, LLC. Please write to info@oakbioinformatics.com
+# to obtain the commercial license.
+# ================
+# OpenCRAVAT
+#
+# MIT License
+#
+# Copyright (c) 2021 KarchinLab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is furnished to do
+# so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from oakvar.lib.base.columnar_reporter import ParquetReporter
+
+
+class Reporter(ParquetReporter):
+    pass
@@ -47,11 +47,13 @@
 
 from typing import Optional
 from typing import List
+from typing import Dict
 
 
 class Aggregator(object):
     cr_type_to_sql = {"string": "text", "int": "integer", "float": "real"}
     commit_threshold = 10000
+    stage_batch_size = 1_000_000
 
     def __init__(
         self,
@@ -62,6 +64,8 @@ class Aggregator(object):
         delete: bool = False,
         append: bool = False,
         serveradmindb=None,
+        bulk_load: bool = True,
+        staging: bool = False,
     ):
         self.input_dir = input_dir
         self.level = level
@@ -70,6 +74,10 @@ class Aggregator(object):
         self.delete = delete
         self.append = append
         self.serveradmindb = serveradmindb
+        self.bulk_load = bulk_load and not append
+        self.staging = staging and not append
+        self.deferred_indexes: Dict[int, List[str]] = {}
+        self.phase_times: Dict[str, float] = {}
         self.annotators = []
         self.ipaths = {}
         self.readers = {}
@@ -135,64 +143,28 @@ class Aggregator(object):
         if self.logger is not None:
             self.logger.info("started: %s" % asctime(localtime(start_time)))
         self.dbconn.commit()
-        n = 0
+        phase_start_time = time()
         if not self.append:
             col_names = self.base_reader.get_column_names()
             columns = ",".join(col_names)
             placeholders = ",".join(["?"] * len(col_names))
             q = f"insert into {self.table_name} ({columns}) values ({placeholders});"
-            batch_size = 1_000_000
-            value_batch = []
-            for lnum, line, rd in self.base_reader.loop_data():
-                try:
-                    n += 1
-                    vals = [rd.get(c) for c in col_names]
-                    value_batch.append(vals)
-                    if len(value_batch) == batch_size:
-                        self.cursor.executemany(q, value_batch)
-                        self.dbconn.commit()
-                        value_batch = []
-                    if lnum % 100000 == 0:
-                        status = f"Running Aggregator ({self.level}:base): line {lnum}"
-                        update_status(
-                            status, logger=self.logger, serveradmindb=self.serveradmindb
-                        )
-                except Exception as e:
-                    self._log_runtime_error(lnum, line, e, fn=self.base_reader.path)
-            if value_batch:
-                self.cursor.executemany(q, value_batch)
-                self.dbconn.commit()
+            self.load_base_rows(self.base_reader, q, col_names, 1_000_000)
+        phase_start_time = self.log_phase_time("base", phase_start_time)
+        if self.annotators:
+            self.create_deferred_indexes(key_only=True)
+            phase_start_time = self.log_phase_time("key index", phase_start_time)
         for annot_name in self.annotators:
-            reader = self.readers[annot_name]
-            n = 0
-            ordered_cnames = [
-                cname for cname in reader.get_column_names() if cname != self.key_name
-            ]
-            if len(ordered_cnames) == 0:
-                continue
-            update_template = "update {} set {} where {}=?".format(
-                self.table_name,
-                ", ".join([f"{cname}=?" for cname in ordered_cnames]),
-                self.base_prefix + "__" + self.key_name,
-            )
-            for lnum, line, rd in reader.loop_data():
-                try:
-                    n += 1
-                    key_val = rd[self.key_name]
-                    ins_vals = [rd.get(cname) for cname in ordered_cnames]
-                    ins_vals.append(key_val)
-                    self.cursor.execute(update_template, ins_vals)
-                    if n % self.commit_threshold == 0:
-                        self.dbconn.commit()
-                    if lnum % 100000 == 0:
-                        status = f"Running Aggregator ({self.level}:{annot_name}): line {lnum}"
-                        update_status(
-                            status, logger=self.logger, serveradmindb=self.serveradmindb
-                        )
-                except Exception as e:
-                    self._log_runtime_error(lnum, line, e, fn=reader.path)
-            self.dbconn.commit()
+            self.merge_annotator(annot_name)
+            phase_start_time = self.log_phase_time(annot_name, phase_start_time)
+        self.create_deferred_indexes()
+        phase_start_time = self.log_phase_time("indexes", phase_start_time)
         self.fill_categories()
+        phase_start_time = self.log_phase_time("categories", phase_start_time)
+        if self.bulk_load:
+            self.cursor.execute(f"analyze {self.table_name}")
+            self.dbconn.commit()
+            phase_start_time = self.log_phase_time("analyze", phase_start_time)
         # self.cursor.execute("pragma synchronous=2;")
         # self.cursor.execute("pragma journal_mode=delete;")
         end_time = time()
@@ -204,6 +176,147 @@ class Aggregator(object):
         status = f"finished aggregator ({self.level})"
         update_status(status, logger=self.logger, serveradmindb=self.serveradmindb)
 
+    def merge_annotator(self, annot_name: str):
+        from sqlite3 import sqlite_version_info
+        from ..util.run import update_status
+
+        if self.dbconn is None or self.cursor is None:
+            return
+        reader = self.readers[annot_name]
+        ordered_cnames = [
+            cname for cname in reader.get_column_names() if cname != self.key_name
+        ]
+        if len(ordered_cnames) == 0:
+            return
+        stage_table = "temp.aggregator_stage"
+        stage_cols = [f"c{i}" for i in range(len(ordered_cnames))]
+        key_col = self.base_prefix + "__" + self.key_name
+        self.cursor.execute(f"drop table if exists {stage_table}")
+        self.cursor.execute(
+            f"create table {stage_table} (k primary key, {', '.join(stage_cols)})"
+        )
+        insert_q = (
+            f"insert or replace into {stage_table} values "
+            + f"({', '.join(['?'] * (len(stage_cols) + 1))})"
+        )
+        if sqlite_version_info >= (3, 33, 0):
+            update_q = (
+                f"update {self.table_name} set "
+                + ", ".join(
+                    [
+                        f"{cname}=s.{scol}"
+                        for cname, scol in zip(ordered_cnames, stage_cols)
+                    ]
+                )
+                + f" from {stage_table} as s where {self.table_name}.{key_col}=s.k"
+            )
+        else:
+            update_q = (
+                f"update {self.table_name} set ({', '.join(ordered_cnames)}) = "
+                + f"(select {', '.join(stage_cols)} from {stage_table} as s "
+                + f"where s.k={self.table_name}.{key_col}) "
+                + f"where {key_col} in (select k from {stage_table})"
+            )
+        n = 0
+        for value_batch in reader.loop_value_batches(
+            [self.key_name] + ordered_cnames,
+            self.stage_batch_size,
+            on_error=self.get_row_error_logger(reader.path),
+        ):
+            self.executemany_or_log(insert_q, value_batch, n, reader.path)
+            self.merge_stage(stage_table, update_q)
+            n += len(value_batch)
+            status = f"Running Aggregator ({self.level}:{annot_name}): line {n}"
+            update_status(status, logger=self.logger, serveradmindb=self.serveradmindb)
+        self.cursor.execute(f"drop table if exists {stage_table}")
+        self.dbconn.commit()
+
+    def load_base_rows(self, reader, q: str, col_names: List[str], batch_size: int):
+        from ..util.run import update_status
+
+        if self.dbconn is None or self.cursor is None:
+            return
+        n = 0
+        for value_batch in reader.loop_value_batches(
+            col_names, batch_size, on_error=self.get_row_error_logger(reader.path)
+        ):
+            self.executemany_or_log(q, value_batch, n, reader.path)
+            prev_n = n
+            n += len(value_batch)
+            if n // 100000 > prev_n // 100000:
+                status = f"Running Aggregator ({self.level}:base): line {n}"
+                update_status(
+                    status, logger=self.logger, serveradmindb=self.serveradmindb
+                )
+        self.dbconn.commit()
+
+    def executemany_or_log(self, q: str, value_batch, num_prev_rows: int, fn: str):
+        """Runs q for the rows of value_batch. If the batch fails, the rows
+        from the failed one on are run one by one, and failed rows are logged
+        with their data row numbers."""
+        if self.dbconn is None or self.cursor is None:
+            return
+        num_changes = self.dbconn.total_changes
+        try:
+            self.cursor.executemany(q, value_batch)
+            return
+        except Exception:
+            # Rows before the failed one have been run.
+            num_done = self.dbconn.total_changes - num_changes
+        for row_no in range(num_done, len(value_batch)):
+            try:
+                self.cursor.execute(q, value_batch[row_no])
+            except Exception as e:
+                self._log_runtime_error(
+                    num_prev_rows + row_no + 1, value_batch[row_no], e, fn=fn
+                )
+
+    def get_row_error_logger(self, fn: str):
+        def log_row_error(lnum, toks, e):
+            self._log_runtime_error(lnum, toks, e, fn=fn)
+
+        return log_row_error
+
+    def merge_stage(self, stage_table: str, update_q: str):
+        if self.dbconn is None or self.cursor is None:
+            return
+        self.cursor.execute(update_q)
+        self.cursor.execute(f"delete from {stage_table}")
+        self.dbconn.commit()
+
+    def log_phase_time(self, phase: str, phase_start_time: float) -> float:
+        from time import time
+
+        now = time()
+        self.phase_times[phase] = now - phase_start_time
+        if self.logger is not None:
+            self.logger.info(
+                f"{self.level} {phase} runtime: {self.phase_times[phase]:.3f}s"
+            )
+        return now
+
+    def create_index(self, index_n: int, index_columns: List[str]):
+        if self.cursor is None:
+            return
+        cols = ["base__{0}".format(x) for x in index_columns]
+        q = "create index {}_idx_{} on {} ({});".format(
+            self.table_name,
+            index_n,
+            self.table_name,
+            ", ".join(cols),
+        )
+        self.cursor.execute(q)
+
+    def create_deferred_indexes(self, key_only: bool = False):
+        if self.dbconn is None:
+            return
+        for index_n, index_columns in list(self.deferred_indexes.items()):
+            if key_only and index_columns != [self.key_name]:
+                continue
+            self.create_index(index_n, index_columns)
+            del self.deferred_indexes[index_n]
+        self.dbconn.commit()
+
     def make_reportsub(self):
         if self.cursor is None:
             return
@@ -436,14 +549,11 @@ class Aggregator(object):
             index_n = 0
             # index_columns is a list of columns to include in this index
             for index_columns in self.base_reader.get_index_columns():
-                cols = ["base__{0}".format(x) for x in index_columns]
-                q = "create index {}_idx_{} on {} ({});".format(
-                    self.table_name,
-                    index_n,
-                    self.table_name,
-                    ", ".join(cols),
-                )
-                self.cursor.execute(q)
+                if self.bulk_load:
+                    # Created after all data is loaded.
+                    self.deferred_indexes[index_n] = index_columns
+                else:
+                    self.create_index(index_n, index_columns)
                 index_n += 1
         else:
             q = f"pragma table_info({self.table_name})"
@@ -534,9 +644,13 @@ class Aggregator(object):
         self.base_reader = FileReader(self.base_fpath, logger=self.logger)
         for annot_name in self.annotators:
             self.readers[annot_name] = FileReader(self.ipaths[annot_name])
-        self.db_fname = self.output_base_fname + ".sqlite"
+        if self.staging:
+            # Merged into the final database with merge_staging_db.
+            self.db_fname = f"{self.output_base_fname}.{self.level}.staging.sqlite"
+        else:
+            self.db_fname = self.output_base_fname + ".sqlite"
         self.db_path = join(self.output_dir, self.db_fname)
-        if self.delete and exists(self.db_path):
+        if (self.delete or self.staging) and exists(self.db_path):
             remove(self.db_path)
         self.dbconn = connect(self.db_path)
         self.cursor = self.dbconn.cursor()
@@ -551,9 +665,13 @@ class Aggregator(object):
             return
         if self.error_logger is None:
             return
+        from sys import exc_info
         from traceback import format_exc
 
-        err_str = format_exc().rstrip()
+        if exc_info()[1] is e:
+            err_str = format_exc().rstrip()
+        else:
+            err_str = f"{type(e).__name__}: {e}"
         if ln is not None and line is not None:
             if err_str not in self.unique_excs:
                 self.unique_excs.append(err_str)
@@ -564,3 +682,51 @@ class Aggregator(object):
             # )
         else:
             self.logger.error(err_str)
+
+
+def merge_staging_db(db_path: str, staging_db_path: str, level: str):
+    """Copies the tables of a level from a staging database into db_path."""
+    from os import remove
+    from sqlite3 import connect
+
+    dbconn = connect(db_path)
+    cursor = dbconn.cursor()
+    cursor.execute("pragma synchronous=0;")
+    cursor.execute("pragma journal_mode=off;")
+    cursor.execute("attach database ? as staging", [staging_db_path])
+    cursor.execute(
+        "select type, name, tbl_name, sql from staging.sqlite_master "
+        + "where sql is not null order by type desc"
+    )
+    schema_rows = [
+        row
+        for row in cursor.fetchall()
+        if row[2] == level or row[2].startswith(level + "_")
+    ]
+    tables = [row[1] for row in schema_rows if row[0] == "table"]
+    for table in tables:
+        cursor.execute(f'drop table if exists main."{table}"')
+    for obj_type, name, _, sql in schema_rows:
+        cursor.execute(sql)
+        if obj_type == "table":
+            cursor.execute(f'insert into main."{name}" select * from staging."{name}"')
+    cursor.execute(
+        "select count(*) from staging.sqlite_master where name='sqlite_stat1'"
+    )
+    if cursor.fetchone()[0]:
+        # Carries over the statistics of analyze run on the staging database.
+        cursor.execute("analyze main.sqlite_master")
+        placeholders = ",".join(["?"] * len(tables))
+        cursor.execute(
+            f"delete from main.sqlite_stat1 where tbl in ({placeholders})", tables
+        )
+        cursor.execute(
+            "insert into main.sqlite_stat1 select * from staging.sqlite_stat1 "
+            + f"where tbl in ({placeholders})",
+            tables,
+        )
+    dbconn.commit()
+    cursor.execute("detach database staging")
+    cursor.close()
+    dbconn.close()
+    remove(staging_db_path)
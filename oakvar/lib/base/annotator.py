@@ -92,6 +92,10 @@ class BaseAnnotator(object):
         output_columns: List[Dict[str, Any]] = [],
         module_conf: Dict[str, Any] = {},
         code_version: Optional[str] = None,
+        seekpos: Optional[int] = None,
+        chunksize: Optional[int] = None,
+        postfix: str = "",
+        endpos: Optional[int] = None,
     ):
         """__init__.
 
@@ -112,6 +116,10 @@ class BaseAnnotator(object):
             output_columns (List[Dict]): output_columns
             module_conf (dict): module_conf
             code_version (Optional[str]): code_version
+            seekpos (Optional[int]): Byte offset in input_file to start reading at
+            chunksize (Optional[int]): Number of data lines to read from seekpos
+            postfix (str): Suffix appended to the output file path
+            endpos (Optional[int]): Byte offset in input_file to stop reading at
         """
         import os
         import sys
@@ -131,6 +139,10 @@ class BaseAnnotator(object):
         else:
             self.primary_input_path = None
         self.secondary_inputs = secondary_inputs
+        self.seekpos = seekpos
+        self.chunksize = chunksize
+        self.endpos = endpos
+        self.postfix = postfix
         self.run_name = run_name
         self.output_dir = output_dir
         self.plain_output = plainoutput
@@ -563,6 +575,9 @@ class BaseAnnotator(object):
     def process_file(self):
         """process_file."""
         assert self._id_col_name, "_id_col_name should not be None."
+        if self.has_annotate_batch():
+            self.process_file_in_batches()
+            return
         for lnum, line, input_data, secondary_data in self._get_input():
             try:
                 self.log_progress(lnum)
@@ -578,19 +593,7 @@ class BaseAnnotator(object):
                     output_dict = self.annotate(
                         input_data, secondary_data=secondary_data
                     )
-                # This enables summarizing without writing for now.
-                if output_dict is None:
-                    continue
-                # Handles empty table-format column data.
-                output_dict = self.handle_jsondata(output_dict)
-                # Preserves the first column
-                if output_dict:
-                    output_dict[self._id_col_name] = input_data[self._id_col_name]
-                # Fill absent columns with empty strings
-                output_dict = self.fill_empty_output(output_dict)
-                # Writes output.
-                if self.output_writer:
-                    self.output_writer.write_data(output_dict)
+                self.write_output_dict(input_data, output_dict)
             except Exception as e:
                 self._log_runtime_exception(
                     lnum,
@@ -602,6 +605,103 @@ class BaseAnnotator(object):
                     else "?",
                 )
 
+    def write_output_dict(self, input_data, output_dict):
+        """write_output_dict.
+
+        Args:
+            input_data:
+            output_dict:
+        """
+        assert self._id_col_name, "_id_col_name should not be None."
+        # This enables summarizing without writing for now.
+        if output_dict is None:
+            return
+        # Handles empty table-format column data.
+        output_dict = self.handle_jsondata(output_dict)
+        # Preserves the first column
+        if output_dict:
+            output_dict[self._id_col_name] = input_data[self._id_col_name]
+        # Fill absent columns with empty strings
+        output_dict = self.fill_empty_output(output_dict)
+        # Writes output.
+        if self.output_writer:
+            self.output_writer.write_data(output_dict)
+
+    def has_annotate_batch(self) -> bool:
+        """has_annotate_batch."""
+        return type(self).annotate_batch is not BaseAnnotator.annotate_batch
+
+    def get_batch_size(self) -> int:
+        """get_batch_size."""
+        from ..consts import DEFAULT_ANNOTATE_BATCH_SIZE
+
+        batch_size = self.module_options.get("batch_size")
+        if not batch_size and self.conf:
+            batch_size = self.conf.get("batch_size")
+        if not batch_size:
+            return DEFAULT_ANNOTATE_BATCH_SIZE
+        return max(int(batch_size), 1)
+
+    def process_file_in_batches(self):
+        """process_file_in_batches."""
+        batch_size = self.get_batch_size()
+        batch = []
+        for lnum, line, input_data, secondary_data in self._get_input():
+            self.log_progress(lnum)
+            # * allele and undefined non-canonical chroms are skipped.
+            if self.is_star_allele(input_data) or self.should_skip_chrom(input_data):
+                continue
+            batch.append((lnum, line, input_data, secondary_data))
+            if len(batch) >= batch_size:
+                self.process_batch(batch)
+                batch = []
+        if batch:
+            self.process_batch(batch)
+
+    def process_batch(self, batch):
+        """process_batch.
+
+        Args:
+            batch: List of (lnum, line, input_data, secondary_data)
+        """
+        fn = self.primary_input_reader.path if self.primary_input_reader else "?"
+        input_datas = [v[2] for v in batch]
+        output_dicts = None
+        try:
+            if self.secondary_readers:
+                output_dicts = self.annotate_batch(
+                    input_datas, secondary_datas=[v[3] for v in batch]
+                )
+            else:
+                output_dicts = self.annotate_batch(input_datas)
+            if output_dicts is None or len(output_dicts) != len(batch):
+                raise ValueError(
+                    "annotate_batch should return a list of the same length as "
+                    + "its input."
+                )
+        except Exception as e:
+            # Falls back to annotate for each variant of the batch, which logs
+            # the errors of variants.
+            if self.logger:
+                self.logger.warning(
+                    f"annotate_batch failed ({type(e).__name__}: {e}). "
+                    + f"Annotating {len(batch)} variants one by one."
+                )
+            output_dicts = None
+        for i, (lnum, line, input_data, secondary_data) in enumerate(batch):
+            try:
+                if output_dicts is not None:
+                    output_dict = output_dicts[i]
+                elif secondary_data == {}:
+                    output_dict = self.annotate(input_data)
+                else:
+                    output_dict = self.annotate(
+                        input_data, secondary_data=secondary_data
+                    )
+                self.write_output_dict(input_data, output_dict)
+            except Exception as e:
+                self._log_runtime_exception(lnum, line, input_data, e, fn=fn)
+
     def postprocess(self):
         """postprocess."""
         pass
@@ -689,7 +789,12 @@ class BaseAnnotator(object):
         from ..exceptions import ConfigurationError
         from ..util.inout import FileReader
 
-        self.primary_input_reader = FileReader(str(self.primary_input_path))
+        self.primary_input_reader = FileReader(
+            str(self.primary_input_path),
+            seekpos=self.seekpos or 0,
+            chunksize=self.chunksize,
+            endpos=self.endpos,
+        )
         requested_input_columns = self.conf["input_columns"]
         defined_columns = self.primary_input_reader.get_column_names()
         missing_columns = set(requested_input_columns) - set(defined_columns)
@@ -776,7 +881,7 @@ class BaseAnnotator(object):
             makedirs(self.output_dir)
         self.output_path = (
             Path(self.output_dir)
-            / f"{self.output_basename}.{self.module_name}{output_suffix}"
+            / f"{self.output_basename}.{self.module_name}{output_suffix}{self.postfix}"
         )
         if self.plain_output:
             self.output_writer = FileWriter(
@@ -784,6 +889,7 @@ class BaseAnnotator(object):
                 include_definition=False,
                 include_titles=True,
                 titles_prefix="",
+                fmt="csv",
             )
         else:
             self.output_writer = FileWriter(self.output_path)
@@ -807,18 +913,26 @@ class BaseAnnotator(object):
         """connect_db."""
         from pathlib import Path
 
+        # Shards of a shardable module open the database at the same time,
+        # and DuckDB lets only one process open a database for writing.
+        read_only = bool(self.conf.get("shardable"))
         db_path = Path(self.data_dir) / (self.module_name + ".sqlite")
         if db_path.exists():
             import sqlite3
 
-            self.dbconn = sqlite3.connect(str(db_path))
+            if read_only:
+                self.dbconn = sqlite3.connect(
+                    db_path.resolve().as_uri() + "?mode=ro", uri=True
+                )
+            else:
+                self.dbconn = sqlite3.connect(str(db_path))
             self.cursor = self.dbconn.cursor()
             return
         db_path = Path(self.data_dir) / (self.module_name + ".duckdb")
         if db_path.exists():
             import duckdb
 
-            self.dbconn = duckdb.connect(str(db_path))
+            self.dbconn = duckdb.connect(str(db_path), read_only=read_only)
             self.cursor = self.dbconn.cursor()
             return
 
@@ -863,11 +977,11 @@ class BaseAnnotator(object):
 
         if self.conf is None or self.primary_input_reader is None:
             raise SetupError(self.module_name)
-        for lnum, line, reader_data in self.primary_input_reader.loop_data():
+        for lnum, line, reader_data in self.primary_input_reader.loop_data(
+            col_names=self.conf["input_columns"]
+        ):
             try:
-                input_data = {}
-                for col_name in self.conf["input_columns"]:
-                    input_data[col_name] = reader_data[col_name]
+                input_data = reader_data
                 if all_mappings_col_name in input_data:
                     input_data[mapping_parser_name] = AllMappingsParser(
                         input_data[all_mappings_col_name]
@@ -919,6 +1033,80 @@ class BaseAnnotator(object):
             "secondary_data": secondary_data,
         }
 
+    def annotate_batch(
+        self, input_datas: List[Dict[str, Any]], secondary_datas=None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Annotates a batch of variants at once.
+
+        Override this instead of `annotate` to look up many variants with one
+        database query. The returned list should have an output dict, or None
+        for no output, for each element of input_datas in the same order. The
+        batch size can be set with `batch_size` in the module's yml file or
+        module options.
+
+        Args:
+            input_datas: List of input_data
+            secondary_datas: List of secondary_data, if secondary inputs exist
+        """
+        _ = input_datas or secondary_datas
+        raise NotImplementedError("annotate_batch method is not implemented.")
+
+    def fetch_batch_rows(
+        self,
+        table: str,
+        key_columns: List[str],
+        keys: List[Tuple],
+        columns: List[str],
+    ) -> Dict[Tuple, List[Tuple]]:
+        """Fetches the rows of a table of the module's database matching keys,
+        with one join query through a temporary key table.
+
+        Args:
+            table (str): Table name
+            key_columns (List[str]): Columns to match keys against, such as ["chrom", "pos"]
+            keys (List[Tuple]): Key values, each a tuple in the order of key_columns
+            columns (List[str]): Columns to fetch
+
+        Returns:
+            Dict of key tuples to lists of tuples of the values of `columns`
+        """
+        rows_by_key: Dict[Tuple, List[Tuple]] = {}
+        if not keys or self.cursor is None:
+            return rows_by_key
+        num_keys = len(key_columns)
+        key_table = "_oakvar_batch_keys"
+        key_col_defs = []
+        for i, v in enumerate(keys[0]):
+            if isinstance(v, int):
+                key_col_defs.append(f"k{i} bigint")
+            elif isinstance(v, float):
+                key_col_defs.append(f"k{i} double")
+            else:
+                key_col_defs.append(f"k{i} varchar")
+        self.cursor.execute(f"drop table if exists {key_table}")
+        self.cursor.execute(
+            f"create temp table {key_table} ({', '.join(key_col_defs)})"
+        )
+        self.cursor.executemany(
+            f"insert into {key_table} values ({', '.join(['?'] * num_keys)})",
+            list(set(keys)),
+        )
+        key_sel = ", ".join([f"k.k{i}" for i in range(num_keys)])
+        col_sel = ", ".join([f't."{col}"' for col in columns])
+        join_cond = " and ".join(
+            [f't."{col}"=k.k{i}' for i, col in enumerate(key_columns)]
+        )
+        self.cursor.execute(
+            f'select {key_sel}, {col_sel} from {key_table} as k join "{table}" as t '
+            + f"on {join_cond}"
+        )
+        for row in self.cursor.fetchall():
+            key = tuple(row[:num_keys])
+            if key not in rows_by_key:
+                rows_by_key[key] = []
+            rows_by_key[key].append(tuple(row[num_keys:]))
+        return rows_by_key
+
     def live_report_substitute(self, d):
         """live_report_substitute.
 
@@ -1013,15 +1201,13 @@ class SecondaryInputFetcher:
 
     def load_input(self):
         """load_input."""
-        for _, _, all_col_data in self.input_reader.loop_data():
-            key_data = all_col_data.get(self.key_col)
+        for _, _, row in self.input_reader.loop_data(
+            row_type="tuple", col_names=[self.key_col] + self.fetch_cols
+        ):
+            key_data = row[0]
             if key_data not in self.data:
                 self.data[key_data] = []
-            fetch_col_data = {}
-            for col in self.fetch_cols:
-                val = all_col_data.get(col)
-                fetch_col_data[col] = val
-            self.data[key_data].append(fetch_col_data)
+            self.data[key_data].append(dict(zip(self.fetch_cols, row[1:])))
 
     def get(self, key_data):
         """get.
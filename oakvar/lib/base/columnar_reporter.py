@@ -0,0 +1,302 @@
+# OakVar
+#
+# Copyright (c) 2024 Oak Bioinformatics, LLC
+#
+# All rights reserved.
+#
+# Do not distribute or use this software without obtaining
+# a license from Oak Bioinformatics, LLC.
+#
+# Do not use this software to develop another software
+# which competes with the products by Oak Bioinformatics, LLC,
+# without obtaining a license for such use from Oak Bioinformatics, LLC.
+#
+# For personal use of non-commercial nature, you may use this software
+# after registering with `ov store account create`.
+#
+# For research use of non-commercial nature, you may use this software
+# after registering with `ov store account create`.
+#
+# For use by commercial entities, you must obtain a commercial license
+# from Oak Bioinformatics, LLC. Please write to info@oakbioinformatics.com
+# to obtain the commercial license.
+# ================
+# OpenCRAVAT
+#
+# MIT License
+#
+# Copyright (c) 2021 KarchinLab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is furnished to do
+# so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from typing import Any
+from typing import Optional
+from typing import Dict
+from typing import List
+from typing import Union
+from .reporter import BaseReporter
+
+PARTITION_COL_NAME = "base__chrom"
+MAX_BUFFERED_BATCHES = 4
+
+
+class ColumnarReporter(BaseReporter):
+    """Writes each level as Arrow record batches.
+
+    Rows are buffered per partition and written as a record batch once
+    row_batch_size rows are collected, so memory use does not grow with
+    the size of the result. Subclasses open and close the writers.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dictrow = False
+        batch_size = self.module_options.get("batch_size")
+        if batch_size:
+            self.row_batch_size = int(batch_size)
+        self.partition_levels: List[str] = []
+        self.schema = None
+        self.col_types: List[str] = []
+        self.partition_colno: Optional[int] = None
+        self.buffered_rows: Dict[Any, List[List[Any]]] = {}
+        self.num_buffered_rows: int = 0
+        self.output_paths: List[str] = []
+
+    def write_header(self, level: str):
+        import pyarrow as pa
+
+        self.flush()
+        self.close_level_writers()
+        self.level = level
+        col_defs = {
+            col["col_name"]: col for col in self.colinfo[level]["columns"]
+        }
+        col_names = self.colnames_to_display[level]
+        self.col_types = []
+        fields = []
+        for col_name in col_names:
+            col_def = col_defs.get(col_name, {})
+            col_type = col_def.get("col_type")
+            if col_def.get("reportsub") or col_name == "base__all_mappings":
+                col_type = "string"
+            self.col_types.append(col_type)
+            fields.append(pa.field(col_name, self.get_arrow_type(col_type)))
+        self.schema = pa.schema(fields)
+        self.partition_colno = None
+        if level in self.partition_levels and PARTITION_COL_NAME in col_names:
+            self.partition_colno = col_names.index(PARTITION_COL_NAME)
+        self.open_level_writers(level)
+
+    def get_arrow_type(self, col_type: Optional[str]):
+        import pyarrow as pa
+
+        if col_type == "int":
+            return pa.int64()
+        elif col_type == "float":
+            return pa.float64()
+        return pa.string()
+
+    def write_table_row(self, row: Union[Dict[str, Any], List[Any]]):
+        if self.partition_colno is None:
+            key = None
+        else:
+            key = row[self.partition_colno]  # type: ignore
+        rows = self.buffered_rows.get(key)
+        if rows is None:
+            rows = []
+            self.buffered_rows[key] = rows
+        rows.append(row)  # type: ignore
+        self.num_buffered_rows += 1
+        if len(rows) >= self.row_batch_size:
+            self.write_buffered_rows(key)
+        elif self.num_buffered_rows >= self.row_batch_size * MAX_BUFFERED_BATCHES:
+            self.flush()
+
+    def flush(self):
+        for key in list(self.buffered_rows.keys()):
+            self.write_buffered_rows(key)
+
+    def write_buffered_rows(self, key):
+        rows = self.buffered_rows.pop(key, None)
+        if not rows:
+            return
+        self.num_buffered_rows -= len(rows)
+        self.write_record_batch(key, self.make_record_batch(rows))
+
+    def make_record_batch(self, rows: List[List[Any]]):
+        import pyarrow as pa
+
+        arrays = []
+        for colno, values in enumerate(zip(*rows)):
+            field = self.schema.field(colno)  # type: ignore
+            try:
+                array = pa.array(values, type=field.type)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                array = pa.array(
+                    self.coerce_values(values, self.col_types[colno]),
+                    type=field.type,
+                )
+            arrays.append(array)
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def coerce_values(self, values, col_type: Optional[str]) -> List[Any]:
+        if col_type == "int":
+            convert = int
+        elif col_type == "float":
+            convert = float
+        else:
+            convert = str
+        coerced = []
+        for value in values:
+            if value is None or value == "":
+                coerced.append(None)
+                continue
+            try:
+                coerced.append(convert(value))
+            except (TypeError, ValueError):
+                coerced.append(None)
+        return coerced
+
+    def end(self):
+        self.flush()
+        self.close_level_writers()
+        return self.output_paths
+
+    def open_level_writers(self, level: str):
+        _ = level
+        pass
+
+    def write_record_batch(self, key, batch):
+        _ = key
+        _ = batch
+        pass
+
+    def close_level_writers(self):
+        pass
+
+
+class ParquetReporter(ColumnarReporter):
+    """Writes each level as a Parquet dataset.
+
+    The variant level is partitioned by chromosome in hive style
+    (base__chrom=chr1/part-0.parquet), which pyarrow, Polars, and DuckDB
+    read back as a column.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        partition = self.get_standardized_module_option(
+            self.module_options.get("partition", True)
+        )
+        if partition is not False:
+            self.partition_levels = ["variant"]
+        self.compression = self.module_options.get("compression", "snappy")
+        self.level_dir = None
+        self.writers: Dict[Any, Any] = {}
+        self.file_schema = None
+
+    def open_level_writers(self, level: str):
+        from pathlib import Path
+        from shutil import rmtree
+
+        self.level_dir = Path(f"{self.savepath}.{level}.parquet")
+        if self.level_dir.exists():
+            rmtree(self.level_dir)
+        self.level_dir.mkdir(parents=True)
+        self.output_paths.append(str(self.level_dir))
+        self.file_schema = self.schema
+        if self.partition_colno is not None:
+            self.file_schema = self.schema.remove(self.partition_colno)  # type: ignore
+        else:
+            self.get_writer(None)
+
+    def get_writer(self, key):
+        from urllib.parse import quote
+        import pyarrow.parquet as pq
+
+        writer = self.writers.get(key)
+        if writer is not None:
+            return writer
+        if self.level_dir is None:
+            return None
+        if self.partition_colno is None:
+            part_dir = self.level_dir
+        else:
+            if key is None:
+                value = "__HIVE_DEFAULT_PARTITION__"
+            else:
+                value = quote(str(key), safe="")
+            part_dir = self.level_dir / f"{PARTITION_COL_NAME}={value}"
+            part_dir.mkdir(exist_ok=True)
+        writer = pq.ParquetWriter(
+            str(part_dir / "part-0.parquet"),
+            self.file_schema,
+            compression=self.compression,
+        )
+        self.writers[key] = writer
+        return writer
+
+    def write_record_batch(self, key, batch):
+        import pyarrow as pa
+
+        writer = self.get_writer(key)
+        if writer is None:
+            return
+        if self.partition_colno is not None:
+            batch = pa.RecordBatch.from_arrays(
+                [
+                    column
+                    for colno, column in enumerate(batch.columns)
+                    if colno != self.partition_colno
+                ],
+                schema=self.file_schema,
+            )
+        writer.write_batch(batch)
+
+    def close_level_writers(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+        self.level_dir = None
+
+
+class ArrowReporter(ColumnarReporter):
+    """Writes each level as an Arrow IPC file."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writer = None
+
+    def open_level_writers(self, level: str):
+        import pyarrow as pa
+
+        path = f"{self.savepath}.{level}.arrow"
+        self.writer = pa.ipc.new_file(path, self.schema)
+        self.output_paths.append(path)
+
+    def write_record_batch(self, key, batch):
+        _ = key
+        if self.writer is not None:
+            self.writer.write_batch(batch)
+
+    def close_level_writers(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
@@ -77,6 +77,10 @@ class BaseConverter(object):
         self.ignore_sample: bool = ignore_sample
         self.header_num_line: int = 0
         self.line_no: int = 0
+        self.input_encoding: Optional[str] = None
+        self.input_file_handle = None
+        self.input_file_handle_path: Optional[str] = None
+        self.next_line_no: int = 1
         if name:
             self.module_name = name
         self.title = title
@@ -114,11 +118,40 @@ class BaseConverter(object):
         _ = kwargs
         return []
 
+    def open_input_file(self, input_path: str):
+        from gzip import open as gzipopen
+
+        encoding = self.input_encoding or "utf-8"
+        with open(input_path, "rb") as f:
+            is_gzip = f.read(2) == b"\x1f\x8b"
+        if is_gzip:
+            return gzipopen(input_path, "rt", encoding=encoding, errors="replace")
+        else:
+            return open(input_path, encoding=encoding, errors="replace")
+
+    def close_input_file(self):
+        if self.input_file_handle is not None:
+            self.input_file_handle.close()
+        self.input_file_handle = None
+        self.input_file_handle_path = None
+        self.next_line_no = 1
+
     def get_variant_lines(
         self, input_path: str, num_pool: int, start_line_no: int, batch_size: int
     ) -> Tuple[Dict[int, List[Tuple[int, Any]]], bool]:
-        import linecache
-
+        if (
+            self.input_file_handle is None
+            or self.input_file_handle_path != input_path
+            or start_line_no < self.next_line_no
+        ):
+            self.close_input_file()
+            self.input_file_handle = self.open_input_file(input_path)
+            self.input_file_handle_path = input_path
+        f = self.input_file_handle
+        while self.next_line_no < start_line_no:
+            if not f.readline():
+                break
+            self.next_line_no += 1
         immature_exit: bool = False
         line_no: int = start_line_no
         end_line_no = line_no + num_pool * batch_size - 1
@@ -126,10 +159,12 @@ class BaseConverter(object):
         chunk_no: int = 0
         chunk_size: int = 0
         while True:
-            line = linecache.getline(input_path, line_no)
+            line = f.readline()
             if not line:
                 break
-            line = line[:-1]
+            self.next_line_no += 1
+            if line[-1] == "\n":
+                line = line[:-1]
             lines[chunk_no].append((line_no, line))
             chunk_size += 1
             if line_no >= end_line_no:
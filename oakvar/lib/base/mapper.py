@@ -59,6 +59,7 @@ class BaseMapper(object):
         output_dir: Optional[str] = None,
         seekpos: Optional[int] = None,
         chunksize: Optional[int] = None,
+        endpos: Optional[int] = None,
         primary_transcript: List[str] = ["mane"],
         serveradmindb=None,
         module_options: Dict = {},
@@ -99,6 +100,7 @@ class BaseMapper(object):
         self.postfix: str = postfix
         self.seekpos: Optional[int] = seekpos
         self.chunksize: Optional[int] = chunksize
+        self.endpos: Optional[int] = endpos
         self.primary_transcript = primary_transcript
         self.serveradmindb = serveradmindb
         self.reader = None
@@ -139,12 +141,18 @@ class BaseMapper(object):
     def make_input_reader(self):
         from ..util.inout import FileReader
 
-        if self.seekpos is not None and self.chunksize is not None:
+        if self.seekpos is not None and self.endpos is not None:
+            self.reader = FileReader(
+                self.input_path, seekpos=int(self.seekpos), endpos=int(self.endpos)
+            )
+        elif self.seekpos is not None and self.chunksize is not None:
             self.reader = FileReader(
                 self.input_path,
                 seekpos=int(self.seekpos),
                 chunksize=int(self.chunksize),
             )
+        elif self.seekpos is not None:
+            self.reader = FileReader(self.input_path, seekpos=int(self.seekpos))
         else:
             self.reader = FileReader(self.input_path)
         return self.reader
@@ -357,6 +365,9 @@ class BaseMapper(object):
         update_status(status, logger=self.logger, serveradmindb=self.serveradmindb)
         self.process_file()
         self.write_crg()
+        self.crx_writer.close()
+        if self.crg_writer is not None:
+            self.crg_writer.close()
         stop_time = time()
         tstamp = asctime(localtime(stop_time))
         self.logger.info(f"finished: {tstamp} | {self.seekpos}")
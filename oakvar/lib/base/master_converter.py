@@ -76,6 +76,118 @@ class LinesData:
         self.lines_data = lines_data
 
 
+class VariantDeduplicator:
+    DEFAULT_MAX_MEM_KEYS: int = 2_000_000
+    SORTED_WINDOW: int = 100_000
+
+    def __init__(self, db_path: Path, max_mem_keys: int = DEFAULT_MAX_MEM_KEYS):
+        self.db_path = db_path
+        self.max_mem_keys = max_mem_keys
+        self.mem: Dict[str, Dict[Tuple[int, int], int]] = {}
+        self.num_mem_keys: int = 0
+        self.spilled_max_pos: Dict[str, int] = {}
+        self.cur_chrom: Optional[str] = None
+        self.cur_pos: int = 0
+        self.conn = None
+
+    @staticmethod
+    def get_variant_hash(ref_base: str, alt_base: str) -> int:
+        from hashlib import blake2b
+
+        digest = blake2b(f"{ref_base}>{alt_base}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+
+    def get_uid(
+        self, chrom: str, pos: int, ref_base: str, alt_base: str
+    ) -> Optional[int]:
+        vhash = self.get_variant_hash(ref_base, alt_base)
+        self.cur_chrom = chrom
+        self.cur_pos = pos
+        chrom_mem = self.mem.get(chrom)
+        if chrom_mem is not None:
+            uid = chrom_mem.get((pos, vhash))
+            if uid is not None:
+                return uid
+        if self.conn is not None and pos <= self.spilled_max_pos.get(chrom, -1):
+            r = self.conn.execute(
+                "select uid from dedup where chrom=? and pos=? and vhash=?",
+                (chrom, pos, vhash),
+            ).fetchone()
+            if r is not None:
+                return r[0]
+        return None
+
+    def add(self, chrom: str, pos: int, ref_base: str, alt_base: str, uid: int):
+        vhash = self.get_variant_hash(ref_base, alt_base)
+        if chrom not in self.mem:
+            self.mem[chrom] = {}
+        self.mem[chrom][(pos, vhash)] = uid
+        self.num_mem_keys += 1
+        if self.num_mem_keys >= self.max_mem_keys:
+            self.flush()
+
+    def connect_db(self):
+        import sqlite3
+
+        if self.conn is not None:
+            return
+        if self.db_path.exists():
+            self.db_path.unlink()
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("pragma journal_mode=off")
+        self.conn.execute("pragma synchronous=off")
+        self.conn.execute(
+            "create table if not exists dedup (chrom text, pos int, vhash int, "
+            + "uid int, primary key (chrom, pos, vhash)) without rowid"
+        )
+
+    def spill(self, chrom: str, keys: List[Tuple[int, int]]):
+        if not keys:
+            return
+        self.connect_db()
+        if not self.conn:
+            return
+        chrom_mem = self.mem[chrom]
+        self.conn.executemany(
+            "insert or ignore into dedup values (?, ?, ?, ?)",
+            [(chrom, pos, vhash, chrom_mem[(pos, vhash)]) for pos, vhash in keys],
+        )
+        max_pos = max(pos for pos, _ in keys)
+        if max_pos > self.spilled_max_pos.get(chrom, -1):
+            self.spilled_max_pos[chrom] = max_pos
+        for key in keys:
+            del chrom_mem[key]
+        self.num_mem_keys -= len(keys)
+
+    def flush(self):
+        """Moves completed regions to the disk index. With coordinate-sorted input,
+        only the region behind the current position is moved. Otherwise, all keys
+        are moved."""
+        for chrom in list(self.mem.keys()):
+            chrom_mem = self.mem[chrom]
+            if chrom == self.cur_chrom:
+                limit = self.cur_pos - self.SORTED_WINDOW
+                keys = [key for key in chrom_mem if key[0] < limit]
+            else:
+                keys = list(chrom_mem.keys())
+            self.spill(chrom, keys)
+        if self.num_mem_keys >= self.max_mem_keys // 2:
+            for chrom in list(self.mem.keys()):
+                self.spill(chrom, list(self.mem[chrom].keys()))
+        if self.conn is not None:
+            self.conn.commit()
+
+    def close(self):
+        from os import remove
+
+        self.mem = {}
+        self.num_mem_keys = 0
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+            remove(self.db_path)
+
+
 def handle_genotype(variant):
     genotype = variant.get("genotype")
     if genotype and "." in genotype:
@@ -102,6 +214,7 @@ def _log_conversion_error(
     err_holders: List[List[str]],
     unique_err_in_line: Set[str],
     core_num=None,
+    error_records: Optional[List[Tuple[int, str, str, bool]]] = None,
 ):
     from traceback import format_exc
     from oakvar.lib.exceptions import ExpectedException
@@ -118,20 +231,55 @@ def _log_conversion_error(
         err_str = str(e)
     else:
         err_str = format_exc().rstrip()
+    if error_records is not None:
+        if err_str not in unique_err_in_line:
+            error_records.append(
+                (line_no, err_str, str(e), isinstance(e, IgnoredVariant))
+            )
+            unique_err_in_line.add(err_str)
+        return
+    record_conversion_error(
+        logger,
+        error_logger,
+        input_path,
+        line_no,
+        err_str,
+        str(e),
+        isinstance(e, IgnoredVariant),
+        unique_excs,
+        err_holders,
+        unique_err_in_line,
+        core_num,
+    )
+
+
+def record_conversion_error(
+    logger,
+    error_logger,
+    input_path: str,
+    line_no: int,
+    err_str: str,
+    e_str: str,
+    ignored: bool,
+    unique_excs: dict,
+    err_holders: List[List[str]],
+    unique_err_in_line: Set[str],
+    core_num: int,
+):
     if err_str not in unique_excs:
         err_no = len(unique_excs)
         unique_excs[err_str] = err_no
-        if isinstance(e, IgnoredVariant):
+        if ignored:
             header = "Ignored"
         else:
             header = "Error"
         logger.error(f"{header} [{err_no}]: {input_path}: {err_str}")
-        err_holders[core_num].append(f"{err_no}:{line_no}\t{str(e)}")
+        err_holders[core_num].append(f"{err_no}:{line_no}\t{e_str}")
         unique_err_in_line.add(err_str)
     else:
         if err_str not in unique_err_in_line:
             err_no = unique_excs[err_str]
-            err_holders[core_num].append(f"{err_no}:{line_no}\t{str(e)}")
+            err_holders[core_num].append(f"{err_no}:{line_no}\t{e_str}")
             unique_err_in_line.add(err_str)
     flush_err_holder(err_holders, core_num, error_logger)
 
@@ -336,6 +484,7 @@ def handle_converted_variants(
     unique_err_in_line: Set[str],
     keep_liftover_failed: bool,
     keep_ref: bool,
+    error_records: Optional[List[Tuple[int, str, str, bool]]] = None,
 ) -> Tuple[List[Dict[str, Any]], bool]:
     if variants is BaseConverter.IGNORE:
         return [], False
@@ -370,6 +519,7 @@ def handle_converted_variants(
                 err_holders,
                 unique_err_in_line,
                 core_num=core_num,
+                error_records=error_records,
             )
             error_occurred = True
             continue
@@ -393,6 +543,7 @@ def gather_variantss(
     genome: str,
     keep_liftover_failed: bool,
     keep_ref: bool,
+    error_records: Optional[List[Tuple[int, str, str, bool]]] = None,
 ) -> List[List[Dict[str, Any]]]:
     from oakvar.lib.exceptions import IgnoredInput
 
@@ -418,7 +569,8 @@ def gather_variantss(
                 genome,
                 unique_err_in_line,
                 keep_liftover_failed,
-                keep_ref
+                keep_ref,
+                error_records=error_records,
             )
             if error_occurred:
                 num_valid_error_lines[ERROR] += 1
@@ -440,6 +592,7 @@ def gather_variantss(
                 err_holders,
                 unique_err_in_line,
                 core_num=core_num,
+                error_records=error_records,
             )
             if isinstance(e, IgnoredInput):
                 num_valid_error_lines[IGNORED] += 1
@@ -452,6 +605,42 @@ def gather_variantss_wrapper(args):
     return gather_variantss(*args)
 
 
+def has_extra_info_writer(converter: BaseConverter) -> bool:
+    return type(converter).write_extra_info is not BaseConverter.write_extra_info
+
+
+def get_variant_records(
+    variants_l: List[List[Dict[str, Any]]],
+    col_names: Dict[str, List[str]],
+    with_extra_info: bool,
+) -> List[List[Any]]:
+    """Converts variants to flat records of the values of the crv, crm, and crs
+    columns, in the order of col_names, followed by the crl values or None and
+    the extra info or None. uid and fileno are filled in when written.
+
+    Records pickle smaller and faster than variant dicts, so converter processes
+    send them instead."""
+    variant_cols = col_names["crv"] + col_names["crm"]
+    crs_cols = col_names["crs"]
+    crl_cols = col_names["crl"]
+    records = []
+    for variants in variants_l:
+        for variant in variants:
+            sample = variant["sample"] if "sample" in variant else variant
+            crl = variant.get("crl")
+            record = [variant.get(v) for v in variant_cols]
+            record.extend([sample.get(v) for v in crs_cols])
+            record.append([crl.get(v) for v in crl_cols] if crl else None)
+            if not with_extra_info:
+                record.append(None)
+            elif "extra_info" in variant:
+                record.append(variant["extra_info"])
+            else:
+                record.append(variant)
+            records.append(record)
+    return records
+
+
 class MasterConverter(object):
     DEFAULT_MP: int = 4
 
@@ -472,6 +661,7 @@ class MasterConverter(object):
         mp: int = DEFAULT_MP,
         keep_liftover_failed: bool = False,
         keep_ref: bool = False,
+        use_processes: bool = False,
         outer=None,
     ):
         from re import compile
@@ -550,6 +740,7 @@ class MasterConverter(object):
         self.time_error_written: float = 0
         self.mp = mp or self.DEFAULT_MP
         self.keep_ref = keep_ref
+        self.use_processes: bool = use_processes
 
     def get_genome_assembly(self, converter) -> str:
         from oakvar.lib.system.consts import default_assembly_key
@@ -896,7 +1087,9 @@ class MasterConverter(object):
         self.logger.info("input format: %s" % converter.format_name)
         self.logger.info(f"genome_assembly: {genome_assembly}")
 
-    def setup_file(self, input_path: str) -> List[BaseConverter]:
+    def setup_file(
+        self, input_path: str, num_converters: Optional[int] = None
+    ) -> List[BaseConverter]:
         from logging import getLogger
         from oakvar.lib.util.util import log_module
         from oakvar.lib.exceptions import NoConverterFound
@@ -906,7 +1099,7 @@ class MasterConverter(object):
         if not converter_name:
             raise NoConverterFound(input_path)
         converters: List[BaseConverter] = []
-        for _ in range(self.mp):
+        for _ in range(num_converters or self.mp):
             converter = self.get_converter(converter_name)
             if not converter:
                 raise NoConverterFound(input_path)
@@ -920,6 +1113,7 @@ class MasterConverter(object):
             self.error_logger = getLogger("err." + converter.module_name)  # type: ignore
             converter.input_path = input_path
             converter.input_paths = self.input_paths
+            converter.input_encoding = encoding
             converter.setup(input_path, encoding=encoding)
             genome_assembly = self.get_genome_assembly(converter)
             self.genome_assemblies.append(genome_assembly)
@@ -931,6 +1125,152 @@ class MasterConverter(object):
             converters.append(converter)
         return converters
 
+    def get_converter_worker_kwargs(self) -> Dict[str, Any]:
+        return {
+            "inputs": self.inputs,
+            "input_format": self.format,
+            "converter_module": self.converter_module,
+            "name": self.name,
+            "output_dir": self.output_dir,
+            "genome": self.given_input_assembly,
+            "conf": self.conf,
+            "module_options": self.module_options,
+            "input_encoding": self.input_encoding,
+            "ignore_sample": self.ignore_sample,
+            "skip_variant_deduplication": self.skip_variant_deduplication,
+            "mp": 1,
+            "keep_liftover_failed": self.keep_liftover_failed,
+            "keep_ref": self.keep_ref,
+        }
+
+    def start_converter_process_pool(self, input_path: str, num_pool: int):
+        from multiprocessing import get_context
+        from oakvar.lib.base.mp_runners import init_converter_worker
+
+        return get_context("spawn").Pool(
+            num_pool,
+            init_converter_worker,
+            (
+                self.get_converter_worker_kwargs(),
+                self.converter_paths,
+                self.converter_name_by_input_path,
+                self.input_file_handles,
+                input_path,
+                self.get_output_col_names(),
+            ),
+        )
+
+    def collect_converter_process_results(
+        self, outputs: List[Tuple[Any, Dict[str, int], List[Any]]], input_path: str
+    ) -> List[List[List[Any]]]:
+        results: List[List[List[Any]]] = []
+        for core_num, (records, num_valid_error_lines, error_records) in enumerate(
+            outputs
+        ):
+            for k, v in num_valid_error_lines.items():
+                self.num_valid_error_lines[k] += v
+            for line_no, err_str, e_str, ignored in error_records:
+                record_conversion_error(
+                    self.logger,
+                    self.error_logger,
+                    input_path,
+                    line_no,
+                    err_str,
+                    e_str,
+                    ignored,
+                    self.unique_excs,
+                    self.err_holders,
+                    set(),
+                    core_num,
+                )
+            results.append(records)
+        return results
+
+    def get_output_col_names(self) -> Dict[str, List[str]]:
+        """Column names of the crv, crm, crs, and crl files in the order of
+        their values in variant records."""
+        from oakvar.lib.exceptions import SetupError
+
+        if (
+            not self.crv_writer
+            or not self.crm_writer
+            or not self.crs_writer
+            or not self.crl_writer
+        ):
+            raise SetupError()
+        return {
+            "crv": self.crv_writer.get_ordered_column_names(),
+            "crm": self.crm_writer.get_ordered_column_names(),
+            "crs": self.crs_writer.get_ordered_column_names(),
+            "crl": self.crl_writer.get_ordered_column_names(),
+        }
+
+    def write_variant_records(
+        self,
+        records: List[List[Any]],
+        fileno: int,
+        dedup: "VariantDeduplicator",
+        main_converter: BaseConverter,
+        uid_var: int,
+    ) -> int:
+        """Writes variant records made by get_variant_records and returns the
+        last uid."""
+        from oakvar.lib.exceptions import SetupError
+
+        if (
+            not self.crv_writer
+            or not self.crm_writer
+            or not self.crs_writer
+            or not self.crl_writer
+        ):
+            raise SetupError()
+        col_names = self.get_output_col_names()
+        crv_cols = col_names["crv"]
+        crm_start = len(crv_cols)
+        crs_start = crm_start + len(col_names["crm"])
+        crs_end = crs_start + len(col_names["crs"])
+        key_nos = [
+            crv_cols.index(col)
+            for col in ["chrom", "pos", "ref_base", "alt_base"]
+        ]
+        crv_uid_no = crv_cols.index("uid")
+        crm_uid_no = col_names["crm"].index("uid")
+        crm_fileno_no = col_names["crm"].index("fileno")
+        crs_uid_no = col_names["crs"].index("uid")
+        crl_uid_no = col_names["crl"].index("uid")
+        for record in records:
+            crv_vals = record[:crm_start]
+            crm_vals = record[crm_start:crs_start]
+            crs_vals = record[crs_start:crs_end]
+            crl_vals = record[crs_end]
+            extra_info = record[crs_end + 1]
+            crm_vals[crm_fileno_no] = fileno
+            if self.skip_variant_deduplication:
+                uid = None
+            else:
+                uid = dedup.get_uid(*[crv_vals[v] for v in key_nos])
+            if uid is not None:
+                self.file_num_dup_variants += 1
+            else:
+                uid_var += 1
+                uid = uid_var
+                crv_vals[crv_uid_no] = uid
+                self.crv_writer.write_values(crv_vals)
+                if not self.skip_variant_deduplication:
+                    dedup.add(*[crv_vals[v] for v in key_nos], uid)
+                if extra_info is not None:
+                    extra_info["uid"] = uid
+                    main_converter.write_extra_info(extra_info)
+                if crl_vals is not None:
+                    crl_vals[crl_uid_no] = uid
+                    self.crl_writer.write_values(crl_vals)
+                self.file_num_unique_variants += 1
+            crs_vals[crs_uid_no] = uid
+            self.crs_writer.write_values(crs_vals)
+            crm_vals[crm_uid_no] = uid
+            self.crm_writer.write_values(crm_vals)
+        return uid_var
+
     def handle_chrom(self, variant):
         from oakvar.lib.exceptions import IgnoredVariant
 
@@ -1015,8 +1355,10 @@ class MasterConverter(object):
 
     def run(self):
         from pathlib import Path
+        from time import time
         from multiprocessing.pool import ThreadPool
         from sys import platform as sysplatform
+        from oakvar.lib.base.mp_runners import converter_runner
         from oakvar.lib.util.run import update_status
 
         if not self.input_paths or not self.logger:
@@ -1045,15 +1387,24 @@ class MasterConverter(object):
         self.err_holders: List[List[str]] = []
         for _ in range(num_pool):
             self.err_holders.append([])
-        pool = ThreadPool(num_pool)
-        unique_var_dict: Dict[int, Dict[str, int]] = {}
+        # Only made if a file is converted with threads.
+        pool: Optional[ThreadPool] = None
+        dedup = VariantDeduplicator(
+            Path(str(self.output_dir)) / f"{self.output_base_fname}.dedup.sqlite"
+        )
         uid_var: int = 0
         log_batch_size: int = 100000
         for input_path in self.input_paths:
             self.input_fname = Path(input_path).name
             fileno = self.input_path_dict2[input_path]
-            converters = self.setup_file(input_path)
+            proc_pool = None
+            if self.use_processes and num_pool > 1:
+                converters = self.setup_file(input_path, num_converters=1)
+                proc_pool = self.start_converter_process_pool(input_path, num_pool)
+            else:
+                converters = self.setup_file(input_path)
             main_converter = converters[0]
+            file_start_time = time()
             self.file_num_unique_variants = 0
             self.file_num_dup_variants: int = 0
             self.file_error_lines = 0
@@ -1066,33 +1417,51 @@ class MasterConverter(object):
                 lines_data, immature_exit = main_converter.get_variant_lines(
                     input_path, num_pool, start_line_no, batch_size
                 )
-                args = [
-                    (
-                        converters[core_num],
-                        lines_data,
-                        core_num,
-                        self.do_liftover,
-                        self.do_liftover_chrM,
-                        self.lifter,
-                        self.wgs_reader,
-                        self.logger,
-                        self.error_logger,
-                        input_path,
-                        self.unique_excs,
-                        self.err_holders,
-                        self.num_valid_error_lines,
-                        self.genome,
-                        self.keep_liftover_failed,
-                        self.keep_ref
+                # Processes send compact records, and threads variant dicts.
+                recordss: List[List[List[Any]]] = []
+                results: List[List[List[Dict[str, Any]]]] = []
+                if proc_pool is not None:
+                    outputs = proc_pool.map(
+                        converter_runner,
+                        [lines_data[core_num] for core_num in range(num_pool)],
+                    )
+                    recordss = self.collect_converter_process_results(
+                        outputs, input_path
                     )
-                    for core_num in range(num_pool)
-                ]
-                results = pool.map(gather_variantss_wrapper, args)
+                else:
+                    args = [
+                        (
+                            converters[core_num],
+                            lines_data,
+                            core_num,
+                            self.do_liftover,
+                            self.do_liftover_chrM,
+                            self.lifter,
+                            self.wgs_reader,
+                            self.logger,
+                            self.error_logger,
+                            input_path,
+                            self.unique_excs,
+                            self.err_holders,
+                            self.num_valid_error_lines,
+                            self.genome,
+                            self.keep_liftover_failed,
+                            self.keep_ref,
+                        )
+                        for core_num in range(num_pool)
+                    ]
+                    if pool is None:
+                        pool = ThreadPool(num_pool)
+                    results = pool.map(gather_variantss_wrapper, args)
                 for core_num in range(num_pool):
                     flush_err_holder(
                         self.err_holders, core_num, self.error_logger, force=True
                     )
                 lines_data = None
+                for records in recordss:
+                    uid_var = self.write_variant_records(
+                        records, fileno, dedup, main_converter, uid_var
+                    )
                 for result in results:
                     variants_l = result
                     for i in range(len(variants_l)):
@@ -1124,21 +1493,16 @@ class MasterConverter(object):
                                     self.crl_writer.write_data(crl)
                                 self.file_num_unique_variants += 1
                             else:
-                                dup_found: bool = False
-                                pos: int = variant.get("pos", 0)
-                                var_str: str = f'{variant["chrom"]}:{variant["pos"]}:{variant["ref_base"]}:{variant["alt_base"]}'
-                                if pos not in unique_var_dict:
-                                    unique_var_dict[pos] = {}
-                                for comp_var_str in unique_var_dict.get(pos, {}).keys():
-                                    if var_str == comp_var_str:
-                                        # crs: uid, sample_id, genotype, zygosity, tot_reads, alt_reads, af
-                                        comp_uid: int = unique_var_dict[pos][
-                                            comp_var_str
-                                        ]
-                                        sample["uid"] = comp_uid
-                                        variant["uid"] = comp_uid
-                                        dup_found = True
-                                        break
+                                comp_uid = dedup.get_uid(
+                                    variant["chrom"],
+                                    variant["pos"],
+                                    variant["ref_base"],
+                                    variant["alt_base"],
+                                )
+                                dup_found: bool = comp_uid is not None
+                                if dup_found:
+                                    sample["uid"] = comp_uid
+                                    variant["uid"] = comp_uid
                                 if not dup_found:
                                     uid_var += 1
                                     variant["uid"] = uid_var
@@ -1148,7 +1512,13 @@ class MasterConverter(object):
                                         crl["uid"] = uid_var
                                     self.crv_writer.write_data(variant)
                                     self.file_num_unique_variants += 1
-                                    unique_var_dict[pos][var_str] = uid_var
+                                    dedup.add(
+                                        variant["chrom"],
+                                        variant["pos"],
+                                        variant["ref_base"],
+                                        variant["alt_base"],
+                                        uid_var,
+                                    )
                                     main_converter.write_extra_info(extra_info)
                                     if crl:
                                         self.crl_writer.write_data(crl)
@@ -1167,6 +1537,17 @@ class MasterConverter(object):
                         status, logger=self.logger, serveradmindb=self.serveradmindb
                     )
                     next_batch_log = start_line_no + log_batch_size
+            main_converter.close_input_file()
+            if proc_pool is not None:
+                proc_pool.close()
+                proc_pool.join()
+            file_runtime = max(time() - file_start_time, 1e-6)
+            num_lines = sum(self.num_valid_error_lines.values())
+            self.logger.info(
+                f"{input_path}: conversion runtime: {file_runtime:.3f}s, "
+                + f"{num_lines / file_runtime:.0f} lines/s with {num_pool} "
+                + ("processes" if proc_pool is not None else "threads")
+            )
             self.logger.info(
                 f"{input_path}: number of lines ignored: {self.num_valid_error_lines[IGNORED]}"
             )
@@ -1186,8 +1567,12 @@ class MasterConverter(object):
             self.total_num_duplicate_variants += self.file_num_dup_variants
             self.total_num_valid_lines += self.num_valid_error_lines[VALID]
             self.total_num_error_lines += self.num_valid_error_lines[ERROR]
+        if pool is not None:
+            pool.close()
+            pool.join()
         for core_num in range(num_pool):
             flush_err_holder(self.err_holders, core_num, self.error_logger, force=True)
+        dedup.close()
         self.close_output_files()
         self.end()
         self.log_ending()
@@ -1242,6 +1627,8 @@ class MasterConverter(object):
             self.crm_writer.close()
         if self.crs_writer is not None:
             self.crs_writer.close()
+        if self.crl_writer is not None:
+            self.crl_writer.close()
 
     def end(self):
         pass
@@ -78,15 +78,17 @@ def annot_from_queue(
         try:
             logger = getLogger(module.name)
             logger.setLevel("INFO")
-            if logtofile and log_path:
-                log_handler = FileHandler(log_path, "a")
-            else:
-                log_handler = StreamHandler(stream=sys.stdout)
-            formatter = Formatter(
-                "%(asctime)s %(name)-20s %(message)s", "%Y/%m/%d %H:%M:%S"
-            )
-            log_handler.setFormatter(formatter)
-            logger.addHandler(log_handler)
+            # A worker can run several shards of the same module.
+            if not logger.handlers:
+                if logtofile and log_path:
+                    log_handler = FileHandler(log_path, "a")
+                else:
+                    log_handler = StreamHandler(stream=sys.stdout)
+                formatter = Formatter(
+                    "%(asctime)s %(name)-20s %(message)s", "%Y/%m/%d %H:%M:%S"
+                )
+                log_handler.setFormatter(formatter)
+                logger.addHandler(log_handler)
         except Exception as e:
             traceback.print_exc()
             raise e
@@ -122,7 +124,7 @@ def annot_from_queue(
 def mapper_runner(
     crv_path,
     seekpos,
-    chunksize,
+    endpos,
     run_name,
     output_dir,
     module_name,
@@ -145,7 +147,7 @@ def mapper_runner(
                 input_file=crv_path,
                 run_name=run_name,
                 seekpos=seekpos,
-                chunksize=chunksize,
+                endpos=endpos,
                 postfix=f".{pos_no:010.0f}",
                 primary_transcript=primary_transcript,
                 serveradmindb=serveradmindb,
@@ -157,3 +159,148 @@ def mapper_runner(
                 msg=f"Mapper of {module_name} could not be loaded."
             )
     return output
+
+
+def mapper_shard_runner(args):
+    return mapper_runner(*args)
+
+
+converter_worker_state = {}
+
+
+def init_converter_worker(
+    master_kwargs,
+    converter_paths,
+    converter_name_by_input_path,
+    input_file_handles,
+    input_path,
+    col_names,
+):
+    from .master_converter import MasterConverter
+    from .master_converter import has_extra_info_writer
+
+    init_worker()
+    master = MasterConverter(**master_kwargs)
+    master.converter_paths = converter_paths
+    master.converter_name_by_input_path = converter_name_by_input_path
+    master.input_file_handles = input_file_handles
+    converters = master.setup_file(input_path, num_converters=1)
+    converter_worker_state["master"] = master
+    converter_worker_state["converter"] = converters[0]
+    converter_worker_state["input_path"] = input_path
+    converter_worker_state["col_names"] = col_names
+    converter_worker_state["with_extra_info"] = has_extra_info_writer(converters[0])
+
+
+def converter_runner(lines):
+    from .master_converter import gather_variantss
+    from .master_converter import VALID
+    from .master_converter import ERROR
+    from .master_converter import IGNORED
+    from .master_converter import get_variant_records
+
+    master = converter_worker_state["master"]
+    converter = converter_worker_state["converter"]
+    input_path = converter_worker_state["input_path"]
+    num_valid_error_lines = {VALID: 0, ERROR: 0, IGNORED: 0}
+    error_records = []
+    variants_l = gather_variantss(
+        converter,
+        {0: lines},
+        0,
+        master.do_liftover,
+        master.do_liftover_chrM,
+        master.lifter,
+        master.wgs_reader,
+        master.logger,
+        master.error_logger,
+        input_path,
+        {},
+        [[]],
+        num_valid_error_lines,
+        master.genome,
+        master.keep_liftover_failed,
+        master.keep_ref,
+        error_records=error_records,
+    )
+    records = get_variant_records(
+        variants_l,
+        converter_worker_state["col_names"],
+        converter_worker_state["with_extra_info"],
+    )
+    return records, num_valid_error_lines, error_records
+
+
+def setup_worker_loggers(logtofile, log_path, error_log_path, level):
+    """Attaches the run's log and error log handlers to the oakvar and err
+    loggers of a spawned worker, once per worker."""
+    import sys
+    from logging import getLogger
+    from logging import StreamHandler
+    from logging import FileHandler
+    from logging import Formatter
+
+    logger = getLogger("oakvar")
+    error_logger = getLogger("err")
+    if logger.handlers:
+        return
+    if logtofile and log_path:
+        log_handler = FileHandler(log_path, "a")
+    else:
+        log_handler = StreamHandler(stream=sys.stdout)
+    log_handler.setFormatter(
+        Formatter("%(asctime)s %(name)-20s %(message)s", "%Y/%m/%d %H:%M:%S")
+    )
+    if logtofile and error_log_path:
+        error_log_handler = FileHandler(error_log_path, "a")
+    else:
+        error_log_handler = StreamHandler(stream=sys.stderr)
+    error_log_handler.setFormatter(Formatter("%(name)s\t%(message)s"))
+    for lg, handler in ((logger, log_handler), (error_logger, error_log_handler)):
+        lg.setLevel(level)
+        handler.setLevel(level)
+        lg.addHandler(handler)
+
+
+def aggregator_runner(arg_dict, log_args=None):
+    from .aggregator import Aggregator
+
+    if log_args:
+        setup_worker_loggers(*log_args)
+    aggregator = Aggregator(**arg_dict)
+    aggregator.run()
+    return aggregator.db_path
+
+
+def postaggregator_runner(script_path, arg_dict, log_args=None):
+    from ..util.util import load_class
+    from ..exceptions import ModuleLoadingError
+
+    if log_args:
+        setup_worker_loggers(*log_args)
+    post_agg_cls = load_class(script_path, "PostAggregator")
+    if not post_agg_cls:
+        post_agg_cls = load_class(script_path, "CravatPostAggregator")
+    if not post_agg_cls:
+        raise ModuleLoadingError(msg=f"PostAggregator of {script_path} not found.")
+    post_agg = post_agg_cls(**arg_dict)
+    post_agg.run()
+
+
+def reporter_fanout_runner(
+    script_path, arg_dict, worker_no, row_queue, msg_queue, ftable_uid
+):
+    from asyncio import run
+    from traceback import format_exc
+    from ..util.util import load_class
+
+    init_worker()
+    try:
+        reporter_cls = load_class(script_path, "Reporter")
+        reporter = reporter_cls(**arg_dict)
+        ret = run(
+            reporter.run_fanout(worker_no, row_queue, msg_queue, ftable_uid=ftable_uid)
+        )
+        msg_queue.put(("done", worker_no, ret))
+    except Exception:
+        msg_queue.put(("error", worker_no, format_exc()))
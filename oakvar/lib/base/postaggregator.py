@@ -48,10 +48,14 @@
 from typing import Optional
 from typing import Any
 from typing import Dict
+from typing import List
+from typing import Tuple
 
 
 class BasePostAggregator(object):
     cr_type_to_sql = {"string": "text", "int": "integer", "float": "real"}
+    output_batch_size = 100000
+    concurrent_db_timeout = 3600
 
     def __init__(
         self,
@@ -62,6 +66,7 @@ class BasePostAggregator(object):
         serveradmindb=None,
         outer=None,
         module_options: Dict = {},
+        concurrent: bool = False,
     ):
         from ..exceptions import ArgumentError
         from ..util.util import get_result_dbpath
@@ -128,6 +133,10 @@ class BasePostAggregator(object):
         self.q_v: Optional[str] = None
         self.q_g: Optional[str] = None
         self.outer = outer
+        # Other postaggregators may be writing to the same database.
+        self.concurrent = concurrent
+        self.output_dbconn = None
+        self.output_batches: Optional[Dict[str, List[List[Any]]]] = None
         self.should_run_annotate = self.check()
         self._close_db_connection()
 
@@ -316,9 +325,20 @@ class BasePostAggregator(object):
         return df
 
     def save_df(self, df, level: str):
+        """Writes the output columns in a Polars DataFrame to a level table.
+
+        The DataFrame should have the key column of the level (base__uid or
+        base__hugo) and the output columns of the module, named either with
+        or without the module name prefix. The columns are bulk-loaded into
+        a staging table and then written with one joined update.
+        """
+        from sqlite3 import sqlite_version_info
+
         if not self.conf:
             return
-        assert self.dbconn is not None
+        if df is None:
+            return
+        assert self.dbconn is not None and self.cursor_w is not None
         ref_colnames = {
             "variant": "base__uid",
             "gene": "base__hugo",
@@ -326,20 +346,88 @@ class BasePostAggregator(object):
             "mapping": "base__uid",
         }
         ref_colname = ref_colnames.get(level)
-        if not ref_colname:
+        if not ref_colname or ref_colname not in df.columns:
             return
-        c = self.dbconn.cursor()
-        output_columns = self.conf.get("output_columns", [])
-        for coldef in output_columns:
-            print(coldef)
-            col_name = f"{coldef['name']}"
-            ref_ids = df[ref_colname]
-            for ref_id in ref_ids:
-                value = df[ref_colname == ref_id, col_name]
-                q = f"update {level} set {col_name}=? where {ref_colname}=?"
-                c.execute(q, (value, ref_id))
-        self.dbconn.commit()
-        c.close()
+        col_names = []
+        df_col_names = []
+        for coldef in self.conf.get("output_columns", []):
+            col_name = coldef["name"]
+            shortcol_name = col_name.split("__")[1]
+            if col_name in df.columns:
+                df_col_names.append(col_name)
+            elif shortcol_name in df.columns:
+                df_col_names.append(shortcol_name)
+            else:
+                continue
+            col_names.append(col_name)
+        if not col_names:
+            return
+        stage_table = "temp.postaggregator_stage"
+        stage_cols = [f"c{i}" for i in range(len(col_names))]
+        c = self.cursor_w
+        self.begin_write(c)
+        c.execute(f"drop table if exists {stage_table}")
+        c.execute(f"create table {stage_table} (k, {', '.join(stage_cols)})")
+        c.executemany(
+            f"insert into {stage_table} values "
+            + f"({', '.join(['?'] * (len(stage_cols) + 1))})",
+            df.select([ref_colname] + df_col_names).iter_rows(),
+        )
+        c.execute(f"create index {stage_table}_k on postaggregator_stage (k)")
+        if sqlite_version_info >= (3, 33, 0):
+            q = (
+                f"update {level} set "
+                + ", ".join(
+                    [f"{cname}=s.{scol}" for cname, scol in zip(col_names, stage_cols)]
+                )
+                + f" from {stage_table} as s where {level}.{ref_colname}=s.k"
+            )
+        else:
+            q = (
+                f"update {level} set ({', '.join(col_names)}) = "
+                + f"(select {', '.join(stage_cols)} from {stage_table} as s "
+                + f"where s.k={level}.{ref_colname}) "
+                + f"where {ref_colname} in (select k from {stage_table})"
+            )
+        c.execute(q)
+        c.execute(f"drop table {stage_table}")
+        c.execute("commit")
+
+    def has_annotate_df(self) -> bool:
+        return type(self).annotate_df is not BasePostAggregator.annotate_df
+
+    def get_input_df(self):
+        from ..consts import VARIANT
+
+        if not self.level:
+            return None
+        columns = None
+        if self.input_columns:
+            self.make_query_components()
+            if self.levelno == VARIANT:
+                columns = self.columns_v
+            else:
+                columns = self.columns_g
+        if not columns:
+            columns = "*"
+        return self.get_df(level=self.level, sql=f"select {columns} from {self.level}")
+
+    def process_df(self):
+        from ..util.run import update_status
+
+        if self.conf is None:
+            return
+        # Read before connecting, since the result database is locked
+        # exclusively while connected.
+        df = self.get_input_df()
+        if df is None:
+            return
+        status = f"Running {self.conf['title']} ({self.module_name}): {len(df)} rows"
+        update_status(status, logger=self.logger, serveradmindb=self.serveradmindb)
+        out_df = self.run_df(df)
+        self._open_db_connection()
+        self.save_df(out_df, self.level)
+        self._close_db_connection()
 
     def run(self):
         from time import time, asctime, localtime
@@ -363,7 +451,10 @@ class BasePostAggregator(object):
         self.table_headers = {}
         self.setup_input_columns()
         self.setup_output_columns()
-        self.process_file()
+        if self.has_annotate_df():
+            self.process_df()
+        else:
+            self.process_file()
         self.fill_categories()
         if self.dbconn:
             self.dbconn.commit()
@@ -386,7 +477,7 @@ class BasePostAggregator(object):
         if not self.dbconn or not self.cursor_w:
             return
         lnum = 0
-        self.cursor_w.execute("begin")
+        self.output_batches = {}
         for input_data in self._get_input():
             try:
                 output_dict = self.annotate(input_data)
@@ -402,13 +493,66 @@ class BasePostAggregator(object):
                     update_status(
                         status, logger=self.logger, serveradmindb=self.serveradmindb
                     )
-                    self.cursor_w.execute("commit")
-                    self.cursor_w.execute("begin")
+                if lnum % self.output_batch_size == 0:
+                    self.flush_output()
             except Exception as e:
                 self._log_runtime_exception(input_data, e)
-        self.cursor_w.execute("commit")
+        self.flush_output()
+        self.output_batches = None
         self._close_db_connection()
 
+    def begin_write(self, cursor):
+        if self.concurrent:
+            # Takes the write lock up front so that the transaction does not
+            # fail on a snapshot made stale by another postaggregator.
+            cursor.execute("begin immediate")
+        else:
+            cursor.execute("begin")
+
+    def flush_output(self):
+        from sqlite3 import connect
+
+        if not self.output_batches:
+            return
+        if self.concurrent:
+            # The input cursor holds a read snapshot, so writes go through
+            # a separate connection.
+            if self.output_dbconn is None:
+                self.output_dbconn = connect(
+                    self.db_path, timeout=self.concurrent_db_timeout
+                )
+                self.output_dbconn.isolation_level = None
+            cursor = self.output_dbconn.cursor()
+        elif self.cursor_w is not None:
+            cursor = self.cursor_w
+        else:
+            return
+        output_batches = self.output_batches
+        self.output_batches = {}
+        self.begin_write(cursor)
+        try:
+            for q, vals_batch in output_batches.items():
+                cursor.executemany(q, vals_batch)
+        except Exception:
+            # Writes the rows one by one and logs the ones which fail.
+            cursor.execute("rollback")
+            self.begin_write(cursor)
+            for q, vals_batch in output_batches.items():
+                for vals in vals_batch:
+                    try:
+                        cursor.execute(q, vals)
+                    except Exception as e:
+                        self._log_runtime_exception(self.get_output_key_data(vals), e)
+        cursor.execute("commit")
+
+    def get_output_key_data(self, vals) -> Dict[str, Any]:
+        """The key of an output row, as in input_data, for error logs."""
+        from ..consts import VARIANT
+
+        if self.levelno == VARIANT:
+            return {"base__uid": vals[-1]}
+        return {"base__hugo": vals[-1]}
+
     def postprocess(self):
         pass
 
@@ -423,7 +567,7 @@ class BasePostAggregator(object):
         if not self.cursor or not self.cursor_w:
             raise SetupError()
         self._open_db_connection()
-        self.cursor_w.execute("begin")
+        self.begin_write(self.cursor_w)
         for col_d in self.conf.get("output_columns", []):
             col_def = ColumnDefinition(col_d)
             if col_def.category not in ["single", "multi"]:
@@ -486,7 +630,13 @@ class BasePostAggregator(object):
                 vals.append(base__hugo)
             else:
                 return
-        self.cursor_w.execute(q, vals)
+        if self.output_batches is not None:
+            # Written with executemany in flush_output.
+            if q not in self.output_batches:
+                self.output_batches[q] = []
+            self.output_batches[q].append(vals)
+        else:
+            self.cursor_w.execute(q, vals)
 
     def _log_runtime_exception(self, input_data, e):
         import traceback
@@ -527,13 +677,18 @@ class BasePostAggregator(object):
         if self.db_path is None:
             raise SetupError()
         if os.path.exists(self.db_path):
-            self.dbconn = connect(self.db_path)
+            if self.concurrent:
+                self.dbconn = connect(self.db_path, timeout=self.concurrent_db_timeout)
+            else:
+                self.dbconn = connect(self.db_path)
             self.cursor = self.dbconn.cursor()
             self.cursor_w = self.dbconn.cursor()
             self.cursor_w.execute("pragma synchronous=0;")
-            self.cursor_w.execute("pragma journal_mode=off;")
+            if not self.concurrent:
+                self.cursor_w.execute("pragma journal_mode=off;")
             self.cursor_w.execute("pragma cache_size=1000000;")
-            self.cursor_w.execute("pragma locking_mode=EXCLUSIVE;")
+            if not self.concurrent:
+                self.cursor_w.execute("pragma locking_mode=EXCLUSIVE;")
             self.cursor_w.execute("pragma temp_store=MEMORY;")
             self.dbconn.isolation_level = None
         else:
@@ -565,6 +720,12 @@ class BasePostAggregator(object):
             except Exception:
                 pass
             self.cursor_w = None
+        if self.output_dbconn is not None:
+            try:
+                self.output_dbconn.close()
+            except Exception:
+                pass
+            self.output_dbconn = None
         if self.dbconn is not None:
             try:
                 self.dbconn.commit()
@@ -584,7 +745,7 @@ class BasePostAggregator(object):
             or self.cursor_w is None
         ):
             raise SetupError()
-        self.cursor_w.execute("begin")
+        self.begin_write(self.cursor_w)
         # annotator table
         q = 'insert or replace into {:} values ("{:}", "{:}", "{}")'.format(
             self.level + "_annotator",
@@ -731,6 +892,42 @@ class BasePostAggregator(object):
         column_names = [row[1] for row in c.fetchall()]
         return column_names
 
+    def get_gene_data_by_hugo(self) -> Dict[str, Dict[str, Any]]:
+        if not self.dbconn:
+            return {}
+        c = self.dbconn.cursor()
+        c.execute(f"select base__hugo, {self.columns_g} from {self.from_g}")
+        col_names = [d[0] for d in c.description[1:]]
+        gene_data_by_hugo = {}
+        for row in c:
+            if row[0] not in gene_data_by_hugo:
+                gene_data_by_hugo[row[0]] = dict(zip(col_names, row[1:]))
+        c.close()
+        return gene_data_by_hugo
+
+    def get_variant_groups(self):
+        from itertools import groupby
+
+        if not self.dbconn:
+            raise
+        c = self.dbconn.cursor()
+        c.execute(
+            f"select base__hugo, {self.columns_v} from {self.from_v} "
+            + "where base__hugo is not null order by base__hugo"
+        )
+        col_names: List[str] = [d[0] for d in c.description[1:]]
+
+        def variant_groups():
+            for hugo, rows in groupby(c, key=lambda row: row[0]):
+                rows = list(rows)
+                variant_data = {}
+                for i, col_name in enumerate(col_names):
+                    variant_data[col_name] = [row[i + 1] for row in rows]
+                yield hugo, variant_data
+            c.close()
+
+        return col_names, variant_groups()
+
     def _get_input(self):
         from ..exceptions import SetupError
         from ..consts import VARIANT
@@ -741,37 +938,55 @@ class BasePostAggregator(object):
         self.c_var = self.dbconn.cursor()
         self.c_gen = self.dbconn.cursor()
         self.make_queries()
+        gene_data_by_hugo: Optional[Dict[str, Dict[str, Any]]] = None
+        variant_groups = None
+        variant_group: Optional[Tuple[str, Dict[str, List[Any]]]] = None
+        col_names_var: List[str] = []
+        col_names_gen: List[str] = []
         if self.levelno == VARIANT and self.q_v:
+            if self.q_g and self.columns_g:
+                # Gene rows are looked up in memory instead of one query
+                # per variant.
+                col_names_gen = self.get_column_names_of_table("gene")
+                gene_data_by_hugo = self.get_gene_data_by_hugo()
             self.c_var.execute(self.q_v)
             cursor = self.c_var
         elif self.levelno == GENE and self.q_g:
-            self.c_gen.execute(self.q_g)
+            if self.q_v and self.columns_v:
+                # Genes and variants are both read in gene order and joined,
+                # instead of one query per gene.
+                col_names_var, variant_groups = self.get_variant_groups()
+                variant_group = next(variant_groups, None)
+                self.c_gen.execute(self.q_g + " order by base__hugo")
+            else:
+                self.c_gen.execute(self.q_g)
             cursor = self.c_gen
         else:
             raise
-        col_names_gen = self.get_column_names_of_table("gene")
+        col_names = [d[0] for d in cursor.description]
         for row in cursor:
             try:
-                input_data = {}
-                for i in range(len(row)):
-                    input_data[cursor.description[i][0]] = row[i]
-                if self.levelno == VARIANT and self.q_g and self.columns_g:
-                    if input_data["base__hugo"] is None:
+                input_data = dict(zip(col_names, row))
+                if gene_data_by_hugo is not None:
+                    hugo = input_data["base__hugo"]
+                    if hugo is None:
                         for col_name in col_names_gen:
                             input_data[col_name] = None
+                    elif hugo in gene_data_by_hugo:
+                        input_data.update(gene_data_by_hugo[hugo])
+                elif variant_groups is not None:
+                    hugo = input_data["base__hugo"]
+                    while (
+                        hugo is not None
+                        and variant_group is not None
+                        and variant_group[0] < hugo
+                    ):
+                        variant_group = next(variant_groups, None)
+                    if variant_group is not None and variant_group[0] == hugo:
+                        input_data.update(variant_group[1])
                     else:
-                        self.c_gen.execute(self.q_g, (input_data["base__hugo"],))
-                        for gen_row in self.c_gen:
-                            for i in range(len(gen_row)):
-                                input_data[self.c_gen.description[i][0]] = gen_row[i]
-                            break  # only 1 row should be returned.
-                elif self.levelno == GENE and self.q_v and self.columns_v:
-                    for column_name in self.columns_v:
-                        input_data[column_name] = []
-                    self.c_var.execute(self.q_v, (input_data["base__hugo"],))
-                    for var_row in self.c_var:
-                        for i in range(len(var_row)):
-                            input_data[self.c_var.description[i][0]].append(var_row[i])
+                        for col_name in col_names_var:
+                            input_data[col_name] = []
                 yield input_data
             except Exception as e:
                 self._log_runtime_exception(row, e)
@@ -784,3 +999,13 @@ class BasePostAggregator(object):
     def annotate(self, input_data) -> Optional[Dict[str, Any]]:
         _ = input_data
         raise NotImplementedError()
+
+    def annotate_df(self, df):
+        """Returns a Polars DataFrame of the output columns of a Polars
+        DataFrame of the input columns. Implementing this instead of annotate
+        makes the module run on the whole level table at once."""
+        _ = df
+        raise NotImplementedError()
+
+    def run_df(self, df):
+        return self.annotate_df(df)
@@ -202,6 +202,7 @@ class BasePreparer(object):
             if out_data:
                 self.writer.write_data(out_data)  # type: ignore
         self.postloop()
+        self.writer.close()  # type: ignore
         stop_time = time()
         self.logger.info("finished: %s" % asctime(localtime(stop_time)))
         runtime = stop_time - start_time
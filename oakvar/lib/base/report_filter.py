@@ -46,8 +46,11 @@
 # SOFTWARE.
 
 from typing import Any
+from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Set
+from typing import Tuple
 from pathlib import Path
 
 REPORT_FILTER_DB_NAME = "report_filter"
@@ -55,6 +58,7 @@ REPORT_FILTER_DB_DIRNAME = "report_filters"
 REPORT_FILTER_REGISTRY_NAME = "registry"
 SAMPLE_TO_FILTER_TABLE_NAME = "fsamplegiven"
 GENE_TO_FILTER_TABLE_NAME = "fgenegiven"
+COLUMN_USAGE_TABLE_NAME = "column_usage"
 REPORT_FILTER_IN_PROGRESS = "in_progress"
 REPORT_FILTER_READY = "ready"
 REPORT_FILTER_NOT_NEEDED = "not_needed"
@@ -65,6 +69,9 @@ REF_COL_NAMES = {
     "mapping": "base__uid",
 }
 level_prefixes = {"variant": "v", "gene": "g"}
+# Longer in-lists in filters are joined from temp tables instead of bound.
+MAX_BOUND_FILTER_VALUES = 100
+FILTER_VALUES_TABLE_NAME = "filter_values"
 
 
 class FilterColumn(object):
@@ -98,78 +105,74 @@ class FilterColumn(object):
     def __repr__(self):
         return f"{self.column} {self.test} {self.value}"
 
-    def get_sql(self):
+    def get_value_list(self) -> List[Any]:
+        if self.test == "inList" and isinstance(self.value, str):
+            lines = self.value.split("\n")
+            return [x.strip() for x in lines if x.strip() != ""]
+        if isinstance(self.value, list):
+            return self.value
+        return [self.value]
+
+    def get_in_sql(
+        self,
+        col_name: str,
+        values: List[Any],
+        params: List[Any],
+        value_sets: List[List[Any]],
+    ):
+        if len(values) > MAX_BOUND_FILTER_VALUES:
+            table_name = f"{FILTER_VALUES_TABLE_NAME}_{len(value_sets)}"
+            value_sets.append(values)
+            return f"{col_name} in (select value from temp.{table_name})"
+        params.extend(values)
+        return f"{col_name} in ({', '.join(['?'] * len(values))})"
+
+    def get_sql(self, params: List[Any], value_sets: List[List[Any]]):
+        """Returns the SQL of the column, with values as ? placeholders.
+
+        Bound values are appended to params in placeholder order. Value lists
+        longer than MAX_BOUND_FILTER_VALUES are appended to value_sets instead
+        and read from temp tables named by their index in value_sets.
+        """
         s = ""
         col_name = f"{level_prefixes[self.level]}.{self.column}"
         if self.test == "multicategory":
-            s = '{} like "%{}%"'.format(col_name, self.value[0])
-            for v in self.value[1:]:
-                s += ' or {} like "%{}%"'.format(col_name, v)
-        elif self.test in ("select", "in"):
-            ss = []
-            for val in self.value:
-                if isinstance(val, str):
-                    val = '"{}"'.format(val)
-                else:
-                    val = str(val)
-                ss.append(f"({col_name} = {val})")
-            if ss:
-                s = "(" + " or ".join(ss) + ")"
-            else:
-                s = ""
-        elif self.test == "inList":
-            if isinstance(self.value, str):
-                lines = self.value.split("\n")
-                self.value = [x.strip() for x in lines if x.strip() != ""]
-            ss = []
-            for val in self.value:
-                if isinstance(val, str):
-                    val = '"{}"'.format(val)
-                else:
-                    val = str(val)
-                ss.append(f"({col_name} = {val})")
-            if ss:
-                s = "(" + " or ".join(ss) + ")"
+            values = self.get_value_list()
+            s = "(" + " or ".join([f"{col_name} like ?"] * len(values)) + ")"
+            params.extend([f"%{v}%" for v in values])
+        elif self.test in ("select", "in", "inList"):
+            values = self.get_value_list()
+            if values:
+                s = self.get_in_sql(col_name, values, params, value_sets)
             else:
                 s = ""
+        elif self.test == "equals" and isinstance(self.value, list):
+            s = self.get_in_sql(col_name, self.value, params, value_sets)
         else:
             s = "{col} {opr}".format(col=col_name, opr=self.test2sql[self.test])
-            sql_val = None
             if self.test == "equals":
-                if type(self.value) is list:
-                    v = self.value[0]
-                    if type(v) is str:
-                        sql_val = '"' + v + '"'
-                    else:
-                        sql_val = str(v)
-                    for v in self.value[1:]:
-                        if type(v) is str:
-                            v = '"' + v + '"'
-                        else:
-                            v = str(v)
-                        sql_val += " OR {} == {}".format(col_name, v)
-                else:
-                    if type(self.value) is str:
-                        sql_val = '"{}"'.format(self.value)
-                    else:
-                        sql_val = str(self.value)
+                s += " ?"
+                params.append(self.value)
             elif self.test == "stringContains":
-                sql_val = '"%{}%"'.format(self.value)
+                s += " ?"
+                params.append(f"%{self.value}%")
             elif self.test == "stringStarts":
-                sql_val = '"{}%"'.format(self.value)
+                s += " ?"
+                params.append(f"{self.value}%")
             elif self.test == "stringEnds":
-                sql_val = '"%{}"'.format(self.value)
+                s += " ?"
+                params.append(f"%{self.value}")
             elif self.test == "between":
-                sql_val = "{} and {}".format(self.value[0], self.value[1])
+                s += " ? and ?"
+                params.extend([self.value[0], self.value[1]])
             elif self.test in (
                 "lessThan",
                 "lessThanEq",
                 "greaterThan",
                 "greaterThanEq",
             ):
-                sql_val = str(self.value)
-            if sql_val:
-                s += " (" + sql_val + ")"
+                s += " ?"
+                params.append(self.value)
         if self.negate:
             s = "not(" + s + ")"
         return s
@@ -189,10 +192,10 @@ class FilterGroup(object):
         self.rules += [FilterGroup(x) for x in d.get("groups", [])]
         self.rules += [FilterColumn(x, self.operator) for x in d.get("columns", [])]
 
-    def get_sql(self):
+    def get_sql(self, params: List[Any], value_sets: List[List[Any]]):
         clauses = []
         for operand in self.rules:
-            clause = operand.get_sql()
+            clause = operand.get_sql(params, value_sets)
             if clause:
                 clauses.append(clause)
         s = ""
@@ -209,6 +212,11 @@ class FilterGroup(object):
 class ReportFilter:
     from ..system.consts import DEFAULT_SERVER_DEFAULT_USERNAME
 
+    # (dbpath, level, db mtime) to the number of rows of unfiltered levels
+    level_num_rows_cache: Dict[Tuple[str, str, float], int] = {}
+    # Result databases being indexed for frequently filtered columns
+    indexing_dbpaths: Set[str] = set()
+
     @classmethod
     async def create(
         cls,
@@ -289,20 +297,25 @@ class ReportFilter:
                 self.filterpath = filterpath
         self.uid = uid
         self.user = self.escape_user(user)
+        self.report_filter_db_dir: Optional[Path] = None
+        self.registry_table_checked = False
 
     async def exec_db(self, func, *args, **kwargs) -> Any:
         conn_read, conn_write = await self.get_db_conns()
         if not conn_read or not conn_write:
             return None
-        cursor_read = await conn_read.cursor()
-        cursor_write = await conn_write.cursor()
-        ret = await func(
-            *args, cursor_read=cursor_read, cursor_write=cursor_write, **kwargs
-        )
-        await cursor_read.close()
-        await cursor_write.close()
-        await conn_read.close()
-        await conn_write.close()
+        try:
+            cursor_read = await conn_read.cursor()
+            cursor_write = await conn_write.cursor()
+            ret = await func(
+                *args, cursor_read=cursor_read, cursor_write=cursor_write, **kwargs
+            )
+            await cursor_read.close()
+            await cursor_write.close()
+            await conn_write.commit()
+        finally:
+            await conn_read.close()
+            await conn_write.close()
         return ret
 
     async def second_init(self):
@@ -391,6 +404,8 @@ class ReportFilter:
         from ..system import get_system_conf_path
         from ..exceptions import SystemMissingException
 
+        if self.report_filter_db_dir is not None:
+            return self.report_filter_db_dir
         conf_dir = get_conf_dir()
         if not conf_dir:
             sys_conf_path = get_system_conf_path()
@@ -399,7 +414,8 @@ class ReportFilter:
                 + f"in the system configuration file at {sys_conf_path}. "
                 + "Please consider running `ov system setup`."
             )
-        return conf_dir / REPORT_FILTER_DB_DIRNAME
+        self.report_filter_db_dir = conf_dir / REPORT_FILTER_DB_DIRNAME
+        return self.report_filter_db_dir
 
     def escape_user(self, user):
         return "".join([c if c.isalnum() else "_" for c in user])
@@ -421,7 +437,27 @@ class ReportFilter:
         q = (
             f"create table if not exists {REPORT_FILTER_DB_NAME}."
             + f"{REPORT_FILTER_REGISTRY_NAME} ( uid int primary key, "
-            + "user text, dbpath text, filterjson text, status text )"
+            + "user text, dbpath text, filterjson text, status text, "
+            + "num_rows text, dbmtime real )"
+        )
+        await cursor.execute(q)
+        q = (
+            f"select name from pragma_table_info('{REPORT_FILTER_REGISTRY_NAME}', "
+            + f"'{REPORT_FILTER_DB_NAME}')"
+        )
+        await cursor.execute(q)
+        registry_cols = [row[0] for row in await cursor.fetchall()]
+        for col_name, col_type in (("num_rows", "text"), ("dbmtime", "real")):
+            if col_name not in registry_cols:
+                q = (
+                    f"alter table {self.get_registry_table_name()} "
+                    + f"add column {col_name} {col_type}"
+                )
+                await cursor.execute(q)
+        q = (
+            f"create table if not exists {REPORT_FILTER_DB_NAME}."
+            + f"{COLUMN_USAGE_TABLE_NAME} ( dbpath text, level text, "
+            + "col_name text, num_uses int, primary key (dbpath, level, col_name) )"
         )
         await cursor.execute(q)
         await conn.commit()
@@ -440,7 +476,9 @@ class ReportFilter:
         q = f"attach database '{report_filter_db_path}' as {REPORT_FILTER_DB_NAME}"
         await cursor.execute(q)
         await cursor.close()
-        await self.create_report_filter_registry_table_if_not_exists(conn)
+        if not self.registry_table_checked:
+            await self.create_report_filter_registry_table_if_not_exists(conn)
+            self.registry_table_checked = True
 
     async def get_db_conns(self):
         from aiosqlite import connect
@@ -557,9 +595,8 @@ class ReportFilter:
 
     async def check_sample_name(self, sample_id, cursor):
         await cursor.execute(
-            'select base__sample_id from sample where base__sample_id="'
-            + sample_id
-            + '" limit 1'
+            "select base__sample_id from sample where base__sample_id=? limit 1",
+            (sample_id,),
         )
         ret = await cursor.fetchone()
         return ret is not None
@@ -589,16 +626,12 @@ class ReportFilter:
 
     async def col_name_exists(self, colname, cursor):
         await cursor.execute(
-            'select col_def from variant_header where col_name="'
-            + colname
-            + '" limit 1'
+            "select col_def from variant_header where col_name=? limit 1", (colname,)
         )
         ret = await cursor.fetchone()
         if ret is None:
             await cursor.execute(
-                'select col_def from gene_header where col_name="'
-                + colname
-                + '" limit 1'
+                "select col_def from gene_header where col_name=? limit 1", (colname,)
             )
             ret = await cursor.fetchone()
         return ret is not None
@@ -628,15 +661,116 @@ class ReportFilter:
             )
         return wrong_modules
 
-    def getwhere(self, level):
+    def getwhere(self, level) -> Tuple[str, List[Any], List[List[Any]]]:
         where = ""
+        params: List[Any] = []
+        value_sets: List[List[Any]] = []
         if self.filter and level in self.filter:
             criteria = self.filter[level]
             main_group = FilterGroup(criteria)
-            sql = main_group.get_sql()
+            sql = main_group.get_sql(params, value_sets)
             if sql:
                 where = "where " + sql
-        return where
+        return where, params, value_sets
+
+    async def make_filter_value_tables(self, value_sets, cursor):
+        for i, values in enumerate(value_sets):
+            table_name = f"temp.{FILTER_VALUES_TABLE_NAME}_{i}"
+            await cursor.execute(f"drop table if exists {table_name}")
+            await cursor.execute(f"create table {table_name} (value)")
+            await cursor.executemany(
+                f"insert into {table_name} (value) values (?)",
+                [(v,) for v in values],
+            )
+
+    def get_filter_columns(self) -> Dict[str, List[str]]:
+        columns: Dict[str, List[str]] = {}
+        if not self.filter or "variant" not in self.filter:
+            return columns
+        rules: List[Any] = [FilterGroup(self.filter["variant"])]
+        while rules:
+            rule = rules.pop()
+            if isinstance(rule, FilterGroup):
+                rules.extend(rule.rules)
+            elif rule.level in level_prefixes:
+                level_columns = columns.setdefault(rule.level, [])
+                if rule.column not in level_columns:
+                    level_columns.append(rule.column)
+        return columns
+
+    async def update_filter_column_usage(
+        self, columns, min_uses: int, cursor_read=Any, cursor_write=Any
+    ) -> Dict[str, List[str]]:
+        _ = cursor_read
+        table_name = f"{REPORT_FILTER_DB_NAME}.{COLUMN_USAGE_TABLE_NAME}"
+        q = (
+            f"insert into {table_name} (dbpath, level, col_name, num_uses) "
+            + "values (?, ?, ?, 1) on conflict (dbpath, level, col_name) "
+            + "do update set num_uses=num_uses+1"
+        )
+        await cursor_write.executemany(  # type: ignore
+            q,
+            [
+                (self.dbpath, level, col_name)
+                for level, col_names in columns.items()
+                for col_name in col_names
+            ],
+        )
+        q = f"select level, col_name from {table_name} where dbpath=? and num_uses>=?"
+        await cursor_write.execute(q, (self.dbpath, min_uses))  # type: ignore
+        frequent_columns: Dict[str, List[str]] = {}
+        for level, col_name in await cursor_write.fetchall():  # type: ignore
+            frequent_columns.setdefault(level, []).append(col_name)
+        return frequent_columns
+
+    async def index_frequent_filter_columns(self):
+        from threading import Thread
+        from ..system import get_sys_conf_value
+        from ..system import get_sys_conf_int_value
+        from ..system.consts import report_filter_auto_index_key
+        from ..system.consts import report_filter_auto_index_min_uses_key
+        from ..system.consts import DEFAULT_REPORT_FILTER_AUTO_INDEX_MIN_USES
+
+        if not get_sys_conf_value(report_filter_auto_index_key):
+            return
+        columns = self.get_filter_columns()
+        if not columns:
+            return
+        min_uses = get_sys_conf_int_value(report_filter_auto_index_min_uses_key)
+        if not min_uses:
+            min_uses = DEFAULT_REPORT_FILTER_AUTO_INDEX_MIN_USES
+        frequent_columns = await self.exec_db(
+            self.update_filter_column_usage, columns, min_uses
+        )
+        if not frequent_columns or self.dbpath in self.indexing_dbpaths:
+            return
+        self.indexing_dbpaths.add(self.dbpath)
+        Thread(
+            target=self.make_filter_column_indexes,
+            args=(frequent_columns,),
+            daemon=True,
+        ).start()
+
+    def make_filter_column_indexes(self, columns: Dict[str, List[str]]):
+        import sqlite3
+        from os.path import getmtime
+        from ..util.db import make_filter_column_indexes
+
+        try:
+            dbmtime = getmtime(self.dbpath)
+            if not make_filter_column_indexes(self.dbpath, columns):
+                return
+            # New indexes do not change filtered rows, so keep the cached ftables.
+            conn = sqlite3.connect(self.get_report_filter_db_path(), timeout=60)
+            q = (
+                f"update {REPORT_FILTER_REGISTRY_NAME} set dbmtime=? "
+                + "where dbpath=? and dbmtime=?"
+            )
+            conn.execute(q, (getmtime(self.dbpath), self.dbpath, dbmtime))
+            conn.commit()
+            conn.close()
+        finally:
+            self.indexing_dbpaths.discard(self.dbpath)
 
     def get_sample_to_filter(self):
         if not self.filter:
@@ -705,16 +839,17 @@ class ReportFilter:
         await cursor_write.execute(q)  # type: ignore
         await conn_write.commit()
         q = f"create table {table_name} as select distinct base__uid from main.sample"
+        params = []
         if req:
-            req_s = ", ".join([f'"{sid}"' for sid in req])
-            q += f" where base__sample_id in ({req_s})"
+            q += f" where base__sample_id in ({', '.join(['?'] * len(req))})"
+            params.extend(req)
         if rej:
-            rej_s = ", ".join([f'"{sid}"' for sid in rej])
             q += (
                 " except select base__uid from main.sample where "
-                + f"base__sample_id in ({rej_s})"
+                + f"base__sample_id in ({', '.join(['?'] * len(rej))})"
             )
-        await cursor_write.execute(q)  # type: ignore
+            params.extend(rej)
+        await cursor_write.execute(q, params)  # type: ignore
         await conn_write.commit()
         await conn_read.close()
         await conn_write.close()
@@ -735,19 +870,17 @@ class ReportFilter:
         filterjson = dumps(self.filter)
         tablename = self.get_registry_table_name()
         q = (
-            f"select uid, status from {tablename} where "
+            f"select uid, status, dbmtime from {tablename} where "
             + "user=? and dbpath=? and filterjson=?"
         )
         await cursor_read.execute(q, (self.user, self.dbpath, filterjson))  # type: ignore
         ret = await cursor_read.fetchone()  # type: ignore
-        if not ret:
-            await conn_read.close()
-            await conn_write.close()
-            return None
-        [uid, status] = ret
         await conn_read.close()
         await conn_write.close()
-        return {"uid": uid, "status": status}
+        if not ret:
+            return None
+        [uid, status, dbmtime] = ret
+        return {"uid": uid, "status": status, "dbmtime": dbmtime}
 
     async def get_report_filter_count(self, cursor=Any):
         tablename = self.get_registry_table_name()
@@ -757,6 +890,15 @@ class ReportFilter:
         count = ret[0]
         return count
 
+    async def get_unused_report_filter_uid(self, cursor=Any) -> int:
+        tablename = self.get_registry_table_name()
+        await cursor.execute(f"select uid from {tablename}")  # type: ignore
+        used_uids = {row[0] for row in await cursor.fetchall()}  # type: ignore
+        uid = 0
+        while uid in used_uids:
+            uid += 1
+        return uid
+
     async def get_max_report_filter_uid(self, cursor=Any, where=None):
         tablename = self.get_registry_table_name()
         q = f"select max(uid) from {tablename}"
@@ -810,7 +952,7 @@ class ReportFilter:
         max_uid = await self.get_max_report_filter_uid(cursor=cursor_read)
         min_uid = await self.get_min_report_filter_uid(cursor=cursor_read)
         if count < report_filter_max_num_cache_per_user:
-            uid = count
+            uid = await self.get_unused_report_filter_uid(cursor=cursor_read)
         else:
             if max_uid < report_filter_max_num_cache_per_user * 2 - 1:
                 delete_uids = [min_uid]
@@ -845,6 +987,7 @@ class ReportFilter:
         self, uid: int, cursor_read=Any, cursor_write=Any
     ):
         from json import dumps
+        from os.path import getmtime
 
         conn_read, conn_write = await self.get_db_conns()
         if not conn_read or not conn_write:
@@ -854,10 +997,18 @@ class ReportFilter:
         q = (
             f"insert or replace into {REPORT_FILTER_DB_NAME}."
             + f"{REPORT_FILTER_REGISTRY_NAME} ( uid, user, dbpath, "
-            + "filterjson, status) values (?, ?, ?, ?, ?)"
+            + "filterjson, status, dbmtime) values (?, ?, ?, ?, ?, ?)"
         )
         await cursor_write.execute(  # type: ignore
-            q, (uid, self.user, self.dbpath, filterjson, REPORT_FILTER_IN_PROGRESS)
+            q,
+            (
+                uid,
+                self.user,
+                self.dbpath,
+                filterjson,
+                REPORT_FILTER_IN_PROGRESS,
+                getmtime(self.dbpath),
+            ),
         )
         await conn_write.commit()
         await conn_read.close()
@@ -876,10 +1027,14 @@ class ReportFilter:
             return None
         return f"{REPORT_FILTER_DB_NAME}.f{ftype}_{uid}"
 
-    def get_fvariant_sql(self, uid=None, gene_to_filter=None, sample_to_filter=None):
+    def get_fvariant_sql(
+        self, uid=None, gene_to_filter=None, sample_to_filter=None
+    ) -> Tuple[str, List[Any], List[List[Any]]]:
         q = "select v.base__uid from main.variant as v"
+        params: List[Any] = []
+        value_sets: List[List[Any]] = []
         if uid is None:
-            return q
+            return q, params, value_sets
         if gene_to_filter:
             gene_to_filter_table_name = self.get_gene_to_filter_table_name(uid=uid)
             q += (
@@ -891,7 +1046,7 @@ class ReportFilter:
                 f" join {sample_to_filter_table_name} as sl on v.base__uid=sl.base__uid"
             )
         if self.filter:
-            where = self.getwhere("variant")
+            where, params, value_sets = self.getwhere("variant")
             if "g." in where:
                 q += " join gene as g on v.base__hugo=g.base__hugo"
             q += " " + where
@@ -901,7 +1056,7 @@ class ReportFilter:
             if "s." in self.filtersql:
                 q += " join main.sample as s on v.base__uid=s.base__uid"
             q += " where " + self.filtersql
-        return q
+        return q, params, value_sets
 
     async def populate_fvariant(
         self,
@@ -918,11 +1073,16 @@ class ReportFilter:
         if uid is None:
             return
         table_name = self.get_ftable_name(uid=uid, ftype="variant")
-        q = self.get_fvariant_sql(
+        q, params, value_sets = self.get_fvariant_sql(
             uid=uid, gene_to_filter=gene_to_filter, sample_to_filter=sample_to_filter
         )
+        if value_sets:
+            await self.make_filter_value_tables(value_sets, cursor_write)
         q = f"create table {table_name} as {q}"
-        await cursor_write.execute(q)  # type: ignore
+        await cursor_write.execute(q, params)  # type: ignore
+        if value_sets:
+            # Inserting the values opened a transaction on cursor_write's connection.
+            await cursor_write.execute("commit")  # type: ignore
         await conn_write.commit()
         await conn_read.close()
         await conn_write.close()
@@ -973,8 +1133,8 @@ class ReportFilter:
         if uid is None or not status:
             return
         table_name = self.get_registry_table_name()
-        q = f"update {table_name} set status=?"
-        await cursor_write.execute(q, (status,))  # type: ignore
+        q = f"update {table_name} set status=? where uid=?"
+        await cursor_write.execute(q, (status, uid))  # type: ignore
         await conn_write.commit()
         await conn_read.close()
         await conn_write.close()
@@ -1015,14 +1175,19 @@ class ReportFilter:
         await conn_write.close()
 
     async def make_ftables(self):
+        from os.path import getmtime
+
         if self.should_bypass_filter():
             return None
         if not self.filter and not self.filtersql:
             return {"uid": None, "status": REPORT_FILTER_NOT_NEEDED}
         ret = await self.exec_db(self.get_existing_report_filter_status)
         if ret:
-            self.uid = ret["uid"]
-            return ret
+            if ret["dbmtime"] == getmtime(self.dbpath):
+                self.uid = ret["uid"]
+                return ret
+            # The result database was changed or replaced after filtering.
+            await self.exec_db(self.remove_ftables, ret["uid"])
         ret = await self.exec_db(self.get_new_report_filter_uid)
         if not ret:
             return None
@@ -1060,6 +1225,7 @@ class ReportFilter:
             await self.exec_db(
                 self.set_registry_status, uid=uid, status=REPORT_FILTER_READY
             )
+            await self.index_frequent_filter_columns()
             return {"uid": uid, "status": REPORT_FILTER_READY}
         except Exception as e:
             await self.exec_db(self.remove_ftables, uid)
@@ -1097,16 +1263,87 @@ class ReportFilter:
         if not level or not ftype:
             return
         ftable_name = self.get_ftable_name(uid=uid, ftype=ftype)
-        if ftable_name:
-            if await self.filter_table_exists(ftable_name, cursor=cursor_read) is True:
-                q = f"select count(*) from {ftable_name}"
-            else:
-                q = f"select count(*) from main.{level}"
-        else:
-            q = f"select count(*) from main.{level}"
-        await cursor_read.execute(q)  # type: ignore
-        ret = await cursor_read.fetchone()  # type: ignore
-        return ret[0]
+        if ftable_name and await self.filter_table_exists(
+            ftable_name, cursor=cursor_read
+        ):
+            num_rows = await self.get_stored_ftable_num_rows(
+                uid=uid, ftype=ftype, cursor=cursor_read
+            )
+            if num_rows is not None:
+                return num_rows
+            q = f"select count(*) from {ftable_name}"
+            await cursor_read.execute(q)  # type: ignore
+            ret = await cursor_read.fetchone()  # type: ignore
+            await self.store_ftable_num_rows(uid, ftype, ret[0])
+            return ret[0]
+        return await self.get_level_num_rows(level, cursor=cursor_read)
+
+    async def get_stored_ftable_num_rows(
+        self, uid=None, ftype=None, cursor=Any
+    ) -> Optional[int]:
+        from json import loads
+
+        tablename = self.get_registry_table_name()
+        q = f"select num_rows from {tablename} where uid=?"
+        await cursor.execute(q, (uid,))  # type: ignore
+        ret = await cursor.fetchone()  # type: ignore
+        if not ret or not ret[0]:
+            return None
+        return loads(ret[0]).get(ftype)
+
+    async def store_ftable_num_rows(self, uid, ftype: str, num_rows: int):
+        from json import dumps
+        from json import loads
+
+        conn_read, conn_write = await self.get_db_conns()
+        if not conn_read or not conn_write:
+            return
+        cursor_write = await conn_write.cursor()
+        tablename = self.get_registry_table_name()
+        await cursor_write.execute(
+            f"select num_rows from {tablename} where uid=?", (uid,)
+        )
+        ret = await cursor_write.fetchone()
+        if ret:
+            stored = loads(ret[0]) if ret[0] else {}
+            stored[ftype] = num_rows
+            await cursor_write.execute(
+                f"update {tablename} set num_rows=? where uid=?", (dumps(stored), uid)
+            )
+            await conn_write.commit()
+        await cursor_write.close()
+        await conn_read.close()
+        await conn_write.close()
+
+    async def get_level_num_rows(self, level: str, cursor=Any) -> int:
+        from os.path import getmtime
+
+        key = (self.dbpath, level, getmtime(self.dbpath))
+        if key not in self.level_num_rows_cache:
+            await cursor.execute(f"select count(*) from main.{level}")  # type: ignore
+            ret = await cursor.fetchone()  # type: ignore
+            self.level_num_rows_cache[key] = ret[0]
+        return self.level_num_rows_cache[key]
+
+    async def get_page_start_rowid(
+        self, level: str, offset: int, cursor=Any
+    ) -> Optional[int]:
+        """Returns the rowid of the first row of a page of an unfiltered level,
+        if the rowids of the level table are consecutive."""
+        # Separate queries, since sqlite looks up min and max with the rowid
+        # b-tree only when each is the only aggregate of the query.
+        await cursor.execute(f"select min(rowid) from main.{level}")
+        ret = await cursor.fetchone()
+        if not ret or ret[0] is None:
+            return None
+        min_rowid = ret[0]
+        await cursor.execute(f"select max(rowid) from main.{level}")
+        ret = await cursor.fetchone()
+        max_rowid = ret[0]
+        num_rows = await self.get_level_num_rows(level, cursor=cursor)
+        if max_rowid - min_rowid + 1 != num_rows:
+            return None
+        return min_rowid + offset
 
     async def get_level_data_iterator(
         self,
@@ -1133,27 +1370,65 @@ class ReportFilter:
                 uid = filter_uid_status.get("uid")
         if level == "variant" and var_added_cols:
             gene_level_cols = [f"g.{col}" for col in var_added_cols]
-            q = f"select d.*, {','.join(gene_level_cols)} from main.{level} as d left join main.gene as g on d.base__hugo=g.base__hugo"
+            columns = f"d.*, {','.join(gene_level_cols)}"
+            gene_join = " left join main.gene as g on d.base__hugo=g.base__hugo"
         else:
-            q = f"select d.* from main.{level} as d"
-        if uid is not None:
+            columns = "d.*"
+            gene_join = ""
+        offset = None
+        if page and pagesize:
+            offset = (page - 1) * pagesize
+        ftable = None
+        if uid is not None and level in ["variant", "gene"]:
             ftable = self.get_ftable_name(uid=uid, ftype=level)
-            if await self.filter_table_exists(ftable, cursor=cursor_read):
-                q += f" join {ftable} as f on d.{ref_col_name}=f.{ref_col_name}"
+            if not await self.filter_table_exists(ftable, cursor=cursor_read):
+                ftable = None
+        if ftable:
+            # Pages are read by rowid of the filtered table, which has
+            # consecutive rowids from 1, instead of skipping offset rows.
+            q = (
+                f"select {columns} from {ftable} as f cross join main.{level} as d "
+                + f"on d.{ref_col_name}=f.{ref_col_name}{gene_join}"
+            )
+            if offset is not None:
+                q += (
+                    f" where f.rowid > {offset} and f.rowid <= {offset + pagesize} "
+                    + "order by f.rowid"
+                )
+            elif head_n is not None:
+                q += f" limit {head_n}"
+            await cursor_read.execute(q)
+            return
+        q = f"select {columns} from main.{level} as d{gene_join}"
+        filter_joined = False
+        if uid is not None:
             if level == "sample":
                 fvariant = self.get_ftable_name(uid=uid, ftype="variant")
                 if await self.filter_table_exists(fvariant, cursor=cursor_read):
                     q += f" join {fvariant} as vf on d.base__uid=vf.base__uid"
+                    filter_joined = True
                 fsamplegiven = self.get_sample_to_filter_table_name(uid=uid)
                 if await self.filter_table_exists(fsamplegiven, cursor=cursor_read):
                     q += f" join {fsamplegiven} as sg on d.base__uid=sg.base__uid"
+                    filter_joined = True
             elif level == "mapping":
                 fvariant = self.get_ftable_name(uid=uid, ftype="variant")
                 if await self.filter_table_exists(fvariant, cursor=cursor_read):
                     q += f" join {fvariant} as vf on d.base__uid=vf.base__uid"
-        if page and pagesize:
-            offset = (page - 1) * pagesize
-            q += f" limit {pagesize} offset {offset}"
+                    filter_joined = True
+        if offset is not None:
+            start_rowid = None
+            if not filter_joined:
+                start_rowid = await self.get_page_start_rowid(
+                    level, offset, cursor=cursor_read
+                )
+            if start_rowid is not None:
+                q += (
+                    f" where d.rowid >= {start_rowid} order by d.rowid "
+                    + f"limit {pagesize}"
+                )
+            else:
+                q += f" limit {pagesize} offset {offset}"
         elif head_n is not None:
             q += f" limit {head_n}"
         await cursor_read.execute(q)
@@ -1195,7 +1470,8 @@ class ReportFilter:
         q = (
             f"create table if not exists {REPORT_FILTER_DB_NAME}."
             + f"{REPORT_FILTER_REGISTRY_NAME} ( uid int primary key, "
-            + "user text, dbpath text, filterjson text, status text )"
+            + "user text, dbpath text, filterjson text, status text, "
+            + "num_rows text )"
         )
         cursor.execute(q)
         table_name = self.get_gene_to_filter_table_name(uid=uid)
@@ -149,6 +149,8 @@ class BaseReporter:
         self.serveradmindb = serveradmindb
         self.outer = outer
         self.cf = None
+        self.keep_session = False
+        self.session_prepared = False
         self.colinfo = {}
         self.colnos = {}
         self.var_added_cols = []
@@ -179,6 +181,7 @@ class BaseReporter:
         self.conns = []
         self.logtofile = logtofile
         self.dictrow: bool = True
+        self.row_batch_size: int = 1000
         self.gene_summary_datas = {}
         self.total_norows: Optional[int] = None
         self.legacy_samples_col = False
@@ -341,9 +344,6 @@ class BaseReporter:
             self.logger.exception(e)
 
     def substitute_val(self, level, row):
-        from json import loads
-        from json import dumps
-
         idx: int = -1
         for sub in self.column_subs.get(level, []):
             col_name = f"{sub.module}__{sub.col}"
@@ -354,36 +354,48 @@ class BaseReporter:
                     continue
                 idx = self.retrieved_col_names[level].index(col_name)
                 value = row[idx]
-            if value is None or value == "" or value == "{}":
-                continue
-            if (
-                level == "variant"
-                and sub.module == "base"
-                and sub.col == "all_mappings"
-            ):
-                mappings = loads(value)
-                for gene in mappings:
-                    for i in range(len(mappings[gene])):
-                        sos = mappings[gene][i][2].split(",")
-                        sos = [sub.subs.get(so, so) for so in sos]
-                        mappings[gene][i][2] = ",".join(sos)
-                value = dumps(mappings)
-            elif level == "gene" and sub.module == "base" and sub.col == "all_so":
-                vals = []
-                for i, so_count in enumerate(value.split(",")):
-                    so = so_count[:3]
-                    so = sub.subs.get(so, so)
-                    so_count = so + so_count[3:]
-                    vals.append(so_count)
-                value = ",".join(vals)
-            else:
-                value = sub.subs.get(value, value)
+            value = self.substitute_col_val(
+                self.get_sub_kind(level, sub), sub.subs, value
+            )
             if self.dictrow:
                 row[col_name] = value
             else:
                 row[idx] = value
         return row
 
+    def get_sub_kind(self, level, sub) -> str:
+        if level == "variant" and sub.module == "base" and sub.col == "all_mappings":
+            return "all_mappings"
+        if level == "gene" and sub.module == "base" and sub.col == "all_so":
+            return "all_so"
+        return ""
+
+    def substitute_col_val(self, kind: str, subs: Dict[str, Any], value):
+        from json import loads
+        from json import dumps
+
+        if value is None or value == "" or value == "{}":
+            return value
+        if kind == "all_mappings":
+            mappings = loads(value)
+            for gene in mappings:
+                for i in range(len(mappings[gene])):
+                    sos = mappings[gene][i][2].split(",")
+                    sos = [subs.get(so, so) for so in sos]
+                    mappings[gene][i][2] = ",".join(sos)
+            value = dumps(mappings)
+        elif kind == "all_so":
+            vals = []
+            for so_count in value.split(","):
+                so = so_count[:3]
+                so = subs.get(so, so)
+                so_count = so + so_count[3:]
+                vals.append(so_count)
+            value = ",".join(vals)
+        else:
+            value = subs.get(value, value)
+        return value
+
     def get_extracted_header_columns(self, level):
         cols = []
         for col in self.colinfo[level]["columns"]:
@@ -499,7 +511,8 @@ class BaseReporter:
             add_summary = False
             if add_summary is None:
                 add_summary = self.add_summary
-            await self.prep()
+            if not self.session_prepared:
+                await self.prep()
             if not self.cf:
                 raise SetupError(self.module_name)
             self.start_time = time()
@@ -526,7 +539,11 @@ class BaseReporter:
                     add_summary=add_summary,
                     head_n=head_n,
                 )
-            await self.close_db()
+            if self.keep_session:
+                await self.close_db_conns()
+                self.session_prepared = True
+            else:
+                await self.close_db()
             if self.module_conf:
                 status = f"finished {self.module_conf['title']} ({self.module_name})"
                 update_status(
@@ -546,6 +563,71 @@ class BaseReporter:
             traceback.print_exc()
             raise e
 
+    async def run_fanout(
+        self,
+        worker_no: int,
+        row_queue,
+        msg_queue,
+        ftable_uid: Optional[int] = None,
+    ):
+        """Writes rows which are read once and sent to several reporters.
+
+        ReporterFanout reads the rows of each level and puts them into
+        row_queue. Progress is reported through msg_queue.
+        """
+        from time import time
+        from time import asctime
+        from time import localtime
+        from ..exceptions import SetupError
+
+        try:
+            await self.prep()
+            if not self.cf:
+                raise SetupError(self.module_name)
+            self.start_time = time()
+            self.log_run_start()
+            if self.setup() is False:
+                raise SetupError(self.module_name)
+            self.ftable_uid = ftable_uid
+            self.levels = await self.get_levels_to_run(self.level or "all")
+            msg_queue.put(("levels", worker_no, self.levels))
+            for level in self.levels:
+                self.level = level
+                await self.make_col_infos(add_summary=False)
+                if not await self.prepare_level_data(level, add_summary=False):
+                    msg_queue.put(("ready", worker_no, level, None))
+                    continue
+                var_added_cols = self.var_added_cols if level == "variant" else []
+                msg_queue.put(("ready", worker_no, level, var_added_cols))
+                self.set_retrieved_col_names(level, row_queue.get())
+                self.write_preface(level)
+                self.write_header(level)
+                row_plan = self.get_row_plan(level, add_summary=False)
+                row_count = 0
+                while True:
+                    datarows = row_queue.get()
+                    if datarows is None:
+                        break
+                    self.write_datarows(level, datarows, row_plan=row_plan)
+                    row_count += len(datarows)
+                    self.log_row_count(row_count, num_new_rows=len(datarows))
+                self.total_norows = await self.cf.exec_db(
+                    self.cf.get_ftable_num_rows,
+                    level=level,
+                    uid=self.ftable_uid,
+                    ftype=level,
+                )  # type: ignore
+            await self.close_db()
+            end_time = time()
+            if not (hasattr(self, "no_log") and self.no_log) and self.logger:
+                self.logger.info("finished: {0}".format(asctime(localtime(end_time))))
+                run_time = end_time - self.start_time
+                self.logger.info("runtime: {0:0.3f}".format(run_time))
+            return self.end()
+        except Exception as e:
+            await self.close_db()
+            raise e
+
     async def write_data(
         self,
         level: str,
@@ -555,32 +637,17 @@ class BaseReporter:
         make_filtered_table=True,
         head_n: Optional[int] = None,
     ):
-        from ..exceptions import SetupError
-
         _ = make_filtered_table
-        if self.should_write_level(level) is False:
-            return
-        if not await self.exec_db(self.table_exists, level):
+        if not await self.prepare_level_data(level, add_summary=add_summary):
             return
         if not self.cf:
-            raise SetupError(self.module_name)
-        if add_summary and self.level == "gene":
-            await self.do_gene_level_summary(add_summary=add_summary)
-        self.extracted_cols[level] = self.get_extracted_header_columns(level)
-        self.extracted_col_names[level] = [
-            col_def.get("col_name") for col_def in self.extracted_cols[level]
-        ]
-        self.hugo_colno = self.colnos[level].get("base__hugo", None)
+            return
         #datacols = await self.cf.exec_db(self.cf.get_variant_data_cols)
         #self.total_norows = await self.cf.exec_db(
         #    self.cf.get_ftable_num_rows, level=level, uid=self.ftable_uid, ftype=level
         #)  # type: ignore
         #if datacols is None or self.total_norows is None:
         #    return
-        if level == "variant" and self.separatesample:
-            self.write_variant_sample_separately = True
-        else:
-            self.write_variant_sample_separately = False
         row_count = 0
         conn_read, conn_write = await self.cf.get_db_conns()
         if not conn_read or not conn_write:
@@ -595,7 +662,81 @@ class BaseReporter:
             var_added_cols=self.var_added_cols,
             head_n=head_n,
         )
-        self.retrieved_col_names[level] = [d[0] for d in cursor_read.description]
+        self.set_retrieved_col_names(level, [d[0] for d in cursor_read.description])
+        self.write_preface(level)
+        self.write_header(level)
+        row_plan = self.get_row_plan(level, add_summary=add_summary)
+        if row_plan is not None:
+            completed = await self.write_planned_rows(
+                row_plan, cursor_read, pagesize=pagesize
+            )
+            if not completed:
+                await cursor_read.close()
+                await conn_read.close()
+                await conn_write.close()
+                if self.cf:
+                    await self.cf.close_db()
+                return
+        else:
+            async for datarow in cursor_read:
+                if self.dictrow:
+                    datarow = dict(datarow)
+                else:
+                    datarow = list(datarow)
+                if level == "gene" and add_summary:
+                    await self.add_gene_summary_data_to_gene_level(datarow)
+                datarow = self.substitute_val(level, datarow)
+                self.stringify_all_mapping(level, datarow)
+                self.escape_characters(datarow)
+                try:
+                    self.write_row_with_samples_separate_or_not(datarow)
+                except Exception:
+                    import traceback
+
+                    traceback.print_exc()
+                    await cursor_read.close()
+                    await conn_read.close()
+                    await conn_write.close()
+                    if self.cf:
+                        await self.cf.close_db()
+                row_count += 1
+                self.log_row_count(row_count)
+                if pagesize and row_count == pagesize:
+                    break
+        #datacols = await self.cf.exec_db(self.cf.get_variant_data_cols)
+        self.total_norows = await self.cf.exec_db(
+            self.cf.get_ftable_num_rows, level=level, uid=self.ftable_uid, ftype=level
+        )  # type: ignore
+        #if datacols is None or self.total_norows is None:
+        #    return
+        await cursor_read.close()
+        await conn_read.close()
+        await conn_write.close()
+
+    async def prepare_level_data(self, level: str, add_summary=True) -> bool:
+        from ..exceptions import SetupError
+
+        if self.should_write_level(level) is False:
+            return False
+        if not await self.exec_db(self.table_exists, level):
+            return False
+        if not self.cf:
+            raise SetupError(self.module_name)
+        if add_summary and self.level == "gene":
+            await self.do_gene_level_summary(add_summary=add_summary)
+        self.extracted_cols[level] = self.get_extracted_header_columns(level)
+        self.extracted_col_names[level] = [
+            col_def.get("col_name") for col_def in self.extracted_cols[level]
+        ]
+        self.hugo_colno = self.colnos[level].get("base__hugo", None)
+        if level == "variant" and self.separatesample:
+            self.write_variant_sample_separately = True
+        else:
+            self.write_variant_sample_separately = False
+        return True
+
+    def set_retrieved_col_names(self, level: str, col_names: List[str]):
+        self.retrieved_col_names[level] = col_names
         self.extracted_col_nos[level] = [
             self.retrieved_col_names[level].index(col_name)
             for col_name in self.extracted_col_names[level]
@@ -609,47 +750,159 @@ class BaseReporter:
             self.retrieved_col_names[level].index(c)
             for c in self.extracted_col_names[level]
         ]
-        self.write_preface(level)
-        self.write_header(level)
-        async for datarow in cursor_read:
-            if self.dictrow:
-                datarow = dict(datarow)
+
+    def log_row_count(self, row_count: int, num_new_rows: int = 1):
+        first_n = (row_count - num_new_rows) // 10000 + 1
+        for n in range(first_n, row_count // 10000 + 1):
+            msg = f"Wrote {n * 10000} rows."
+            if self.logger is not None:
+                self.logger.info(msg)
+            elif self.outer is not None:
+                self.outer.write(msg)
+
+    def get_row_plan(self, level: str, add_summary=True) -> Optional[Dict[str, Any]]:
+        """Precomputes the per-row work of write_data for a level.
+
+        Returns None if a subclass customizes the per-row steps, in which
+        case rows go through those methods one by one.
+        """
+        for method_name in [
+            "substitute_val",
+            "stringify_all_mapping",
+            "escape_characters",
+            "write_row_with_samples_separate_or_not",
+            "get_extracted_row",
+        ]:
+            method = getattr(type(self), method_name)
+            if method is not getattr(BaseReporter, method_name):
+                return None
+        if level == "gene" and add_summary:
+            return None
+        colnos = {
+            col_name: colno
+            for colno, col_name in enumerate(self.retrieved_col_names[level])
+        }
+        mapping_colno = None
+        if level == "variant" and not hasattr(self, "keep_json_all_mapping"):
+            mapping_colno = colnos.get("base__all_mappings")
+        subs = []
+        special_subs = []
+        mapping_subs = None
+        for sub in self.column_subs.get(level, []):
+            colno = colnos.get(f"{sub.module}__{sub.col}")
+            if colno is None:
+                continue
+            kind = self.get_sub_kind(level, sub)
+            if not kind:
+                subs.append((colno, sub.subs))
+            elif kind == "all_mappings" and colno == mapping_colno:
+                # Substituted while the mappings are stringified, to parse
+                # the json only once.
+                mapping_subs = sub.subs
             else:
-                datarow = list(datarow)
-            if level == "gene" and add_summary:
-                await self.add_gene_summary_data_to_gene_level(datarow)
-            datarow = self.substitute_val(level, datarow)
-            self.stringify_all_mapping(level, datarow)
-            self.escape_characters(datarow)
+                special_subs.append((colno, kind, sub.subs))
+        if self.dictrow:
+            display_names = self.cols_to_display[level]
+            if [c for c in display_names if c not in colnos]:
+                return None
+            display_colnos = [colnos[c] for c in display_names]
+        else:
+            display_names = None
+            display_colnos = self.colnos_to_display[level]
+        samples_colno = None
+        if self.write_variant_sample_separately:
+            if self.legacy_samples_col:
+                samples_colno = colnos.get("base__samples")
+            else:
+                samples_colno = colnos.get("tagsampler__samples")
+        return {
+            "subs": subs,
+            "special_subs": special_subs,
+            "mapping_colno": mapping_colno,
+            "mapping_subs": mapping_subs,
+            "display_names": display_names,
+            "display_colnos": display_colnos,
+            "samples_colno": samples_colno,
+        }
+
+    async def write_planned_rows(
+        self, row_plan: Dict[str, Any], cursor_read, pagesize=None
+    ) -> bool:
+        row_count = 0
+        while True:
+            datarows = await cursor_read.fetchmany(self.row_batch_size)
+            if not datarows:
+                break
+            if pagesize:
+                datarows = datarows[: pagesize - row_count]
             try:
-                self.write_row_with_samples_separate_or_not(datarow)
+                self.write_planned_datarows(row_plan, datarows)
             except Exception:
                 import traceback
 
                 traceback.print_exc()
-                await cursor_read.close()
-                await conn_read.close()
-                await conn_write.close()
-                if self.cf:
-                    await self.cf.close_db()
-            row_count += 1
-            if row_count % 10000 == 0:
-                msg = f"Wrote {row_count} rows."
-                if self.logger is not None:
-                    self.logger.info(msg)
-                elif self.outer is not None:
-                    self.outer.write(msg)
-            if pagesize and row_count == pagesize:
+                return False
+            row_count += len(datarows)
+            self.log_row_count(row_count, num_new_rows=len(datarows))
+            if pagesize and row_count >= pagesize:
                 break
-        #datacols = await self.cf.exec_db(self.cf.get_variant_data_cols)
-        self.total_norows = await self.cf.exec_db(
-            self.cf.get_ftable_num_rows, level=level, uid=self.ftable_uid, ftype=level
-        )  # type: ignore
-        #if datacols is None or self.total_norows is None:
-        #    return
-        await cursor_read.close()
-        await conn_read.close()
-        await conn_write.close()
+        return True
+
+    def write_planned_datarows(self, row_plan: Dict[str, Any], datarows):
+        subs = row_plan["subs"]
+        special_subs = row_plan["special_subs"]
+        mapping_colno = row_plan["mapping_colno"]
+        mapping_subs = row_plan["mapping_subs"]
+        display_names = row_plan["display_names"]
+        display_colnos = row_plan["display_colnos"]
+        samples_colno = row_plan["samples_colno"]
+        substitute_col_val = self.substitute_col_val
+        stringify_all_mapping_value = self.stringify_all_mapping_value
+        write_table_row = self.write_table_row
+        for datarow in datarows:
+            datarow = list(datarow)
+            for colno, col_subs in subs:
+                value = datarow[colno]
+                if value is not None:
+                    datarow[colno] = col_subs.get(value, value)
+            for colno, kind, col_subs in special_subs:
+                datarow[colno] = substitute_col_val(kind, col_subs, datarow[colno])
+            if mapping_colno is not None and datarow[mapping_colno] is not None:
+                datarow[mapping_colno] = stringify_all_mapping_value(
+                    datarow[mapping_colno], subs=mapping_subs
+                )
+            for colno in display_colnos:
+                value = datarow[colno]
+                if type(value) is str and "\n" in value:
+                    datarow[colno] = value.replace("\n", "%0A")
+            if samples_colno is not None and datarow[samples_colno]:
+                samples = datarow[samples_colno].split(";")
+            else:
+                samples = [None]
+            for sample in samples:
+                if sample is not None:
+                    datarow[samples_colno] = sample
+                values = [datarow[colno] for colno in display_colnos]
+                if display_names is None:
+                    write_table_row(values)
+                else:
+                    write_table_row(dict(zip(display_names, values)))
+
+    def write_datarows(
+        self, level: str, datarows, row_plan: Optional[Dict[str, Any]] = None
+    ):
+        if row_plan is not None:
+            self.write_planned_datarows(row_plan, datarows)
+            return
+        for datarow in datarows:
+            if self.dictrow:
+                datarow = dict(zip(self.retrieved_col_names[level], datarow))
+            else:
+                datarow = list(datarow)
+            datarow = self.substitute_val(level, datarow)
+            self.stringify_all_mapping(level, datarow)
+            self.escape_characters(datarow)
+            self.write_row_with_samples_separate_or_not(datarow)
 
     def write_row_with_samples_separate_or_not(self, datarow):
         if self.legacy_samples_col:
@@ -681,22 +934,30 @@ class BaseReporter:
                     datarow[col_no] = v.replace("\n", "%0A")
 
     def stringify_all_mapping(self, level, datarow):
-        from json import loads
-
         if hasattr(self, "keep_json_all_mapping") is True or level != "variant":
             return
         col_name = "base__all_mappings"
-        idx: Optional[int] = None
         if self.dictrow:
-            all_map = loads(datarow[col_name])
+            datarow[col_name] = self.stringify_all_mapping_value(datarow[col_name])
         else:
             if col_name not in self.retrieved_col_names[level]:
                 return
             idx = self.retrieved_col_names[level].index(col_name)
-            all_map = loads(datarow[idx])
+            datarow[idx] = self.stringify_all_mapping_value(datarow[idx])
+
+    def stringify_all_mapping_value(
+        self, value, subs: Optional[Dict[str, Any]] = None
+    ) -> str:
+        from json import loads
+
+        all_map = loads(value)
         newvals = []
         for hugo in all_map:
             for maprow in all_map[hugo]:
+                if subs:
+                    maprow[2] = ",".join(
+                        [subs.get(so, so) for so in maprow[2].split(",")]
+                    )
                 if len(maprow) == 9:
                     [
                         transcript,
@@ -725,11 +986,7 @@ class BaseReporter:
                 )
                 newvals.append(newval)
         newvals.sort()
-        newcell = "; ".join(newvals)
-        if self.dictrow:
-            datarow[col_name] = newcell
-        elif idx is not None:
-            datarow[idx] = newcell
+        return "; ".join(newvals)
 
     async def add_gene_summary_data_to_gene_level(self, datarow):
         hugo = datarow["base__hugo"]
@@ -1195,7 +1452,7 @@ class BaseReporter:
         if not exists(self.dbpath):
             raise WrongInput()
 
-    async def close_db(self):
+    async def close_db_conns(self):
         import sqlite3
 
         for conn in self.conns:
@@ -1204,6 +1461,11 @@ class BaseReporter:
             else:
                 await conn.close()
         self.conns = []
+        self.conn = None
+
+    async def close_db(self):
+        await self.close_db_conns()
+        self.session_prepared = False
         if self.cf is not None:
             await self.cf.close_db()
             self.cf = None
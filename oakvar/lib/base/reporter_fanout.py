@@ -0,0 +1,289 @@
+# OakVar
+#
+# Copyright (c) 2024 Oak Bioinformatics, LLC
+#
+# All rights reserved.
+#
+# Do not distribute or use this software without obtaining
+# a license from Oak Bioinformatics, LLC.
+#
+# Do not use this software to develop another software
+# which competes with the products by Oak Bioinformatics, LLC,
+# without obtaining a license for such use from Oak Bioinformatics, LLC.
+#
+# For personal use of non-commercial nature, you may use this software
+# after registering with `ov store account create`.
+#
+# For research use of non-commercial nature, you may use this software
+# after registering with `ov store account create`.
+#
+# For use by commercial entities, you must obtain a commercial license
+# from Oak Bioinformatics, LLC. Please write to info@oakbioinformatics.com
+# to obtain the commercial license.
+# ================
+# OpenCRAVAT
+#
+# MIT License
+#
+# Copyright (c) 2021 KarchinLab
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is furnished to do
+# so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from typing import Any
+from typing import Optional
+from typing import List
+from typing import Tuple
+from typing import Dict
+
+FILTER_ARG_NAMES = [
+    "filter",
+    "filterpath",
+    "filtername",
+    "filterstring",
+    "filtersql",
+    "includesample",
+    "excludesample",
+]
+ROW_QUEUE_SIZE = 8
+ROW_BATCH_SIZE = 1000
+
+
+def can_fan_out_reporters(script_paths: List[str]) -> bool:
+    from ..util.util import load_class
+    from .reporter import BaseReporter
+
+    for script_path in script_paths:
+        Reporter = load_class(script_path, "Reporter")
+        if not Reporter:
+            return False
+        # Reporters with their own run or write_data read the database
+        # themselves.
+        if (
+            Reporter.run is not BaseReporter.run
+            or Reporter.write_data is not BaseReporter.write_data
+        ):
+            return False
+    return True
+
+
+class ReporterFanout:
+    """Runs reporters in worker processes with one read of the result database.
+
+    The filtered tables are made once, and the rows of each level are read
+    once and sent to every reporter which writes the level. All reporters
+    should have the same result database and filter arguments.
+    """
+
+    def __init__(
+        self,
+        script_paths: Dict[str, str],
+        arg_dicts: Dict[str, Dict[str, Any]],
+        head_n: Optional[int] = None,
+    ):
+        self.script_paths = script_paths
+        self.arg_dicts = arg_dicts
+        self.head_n = head_n
+        self.module_names = list(script_paths.keys())
+        self.cf = None
+        self.ftable_uid: Optional[int] = None
+        self.msg_queue = None
+        self.row_queues = []
+        self.procs = []
+        # Messages which arrived before they were waited for.
+        self.pending_msgs = []
+
+    async def run(self) -> Dict[str, Any]:
+        """Returns the return values of the reporters by module name."""
+        import multiprocessing as mp
+        from ... import ReportFilter
+        from ..system.consts import DEFAULT_SERVER_DEFAULT_USERNAME
+        from .mp_runners import reporter_fanout_runner
+
+        first_arg_dict = self.arg_dicts[self.module_names[0]]
+        user = first_arg_dict.get("user") or DEFAULT_SERVER_DEFAULT_USERNAME
+        self.cf = await ReportFilter.create(
+            dbpath=str(first_arg_dict["dbpath"]), user=user, strict=False
+        )
+        filter_args = {"includesample": []}
+        for arg_name in FILTER_ARG_NAMES:
+            if arg_name in first_arg_dict:
+                filter_args[arg_name] = first_arg_dict[arg_name]
+        await self.cf.exec_db(self.cf.loadfilter, **filter_args)
+        self.ftable_uid = await self.cf.make_ftables_and_ftable_uid()
+        ctx = mp.get_context("spawn")
+        self.msg_queue = ctx.Queue()
+        try:
+            for worker_no, module_name in enumerate(self.module_names):
+                arg_dict = self.arg_dicts[module_name].copy()
+                # Not picklable, and reporters in workers log to files.
+                arg_dict["serveradmindb"] = None
+                arg_dict["outer"] = None
+                # Bounded, so that a slow reporter holds back reading instead
+                # of rows piling up in memory.
+                row_queue = ctx.Queue(maxsize=ROW_QUEUE_SIZE)
+                proc = ctx.Process(
+                    target=reporter_fanout_runner,
+                    args=(
+                        self.script_paths[module_name],
+                        arg_dict,
+                        worker_no,
+                        row_queue,
+                        self.msg_queue,
+                        self.ftable_uid,
+                    ),
+                    daemon=True,
+                )
+                proc.start()
+                self.row_queues.append(row_queue)
+                self.procs.append(proc)
+            rets = await self.feed_reporters()
+            for proc in self.procs:
+                proc.join()
+        finally:
+            for proc in self.procs:
+                if proc.is_alive():
+                    proc.terminate()
+                    proc.join()
+            for row_queue in self.row_queues:
+                # Rows left for a failed reporter should not block exiting.
+                row_queue.cancel_join_thread()
+            await self.cf.close_db()
+        return {
+            module_name: rets[worker_no]
+            for worker_no, module_name in enumerate(self.module_names)
+        }
+
+    async def feed_reporters(self) -> Dict[int, Any]:
+        levels_by_worker: Dict[int, List[str]] = {}
+        for _, worker_no, levels in self.get_messages(("levels",), len(self.procs)):
+            levels_by_worker[worker_no] = levels
+        all_levels = []
+        for levels in levels_by_worker.values():
+            for level in levels:
+                if level not in all_levels:
+                    all_levels.append(level)
+        for level in all_levels:
+            # Reporters which join the same gene level columns share a read.
+            worker_nos_by_cols: Dict[Tuple[str, ...], List[int]] = {}
+            num_workers = len([v for v in levels_by_worker.values() if level in v])
+            for _, worker_no, _, var_added_cols in self.get_messages(
+                ("ready", level), num_workers
+            ):
+                if var_added_cols is None:
+                    continue
+                worker_nos_by_cols.setdefault(tuple(var_added_cols), []).append(
+                    worker_no
+                )
+            for var_added_cols, worker_nos in worker_nos_by_cols.items():
+                await self.send_level_rows(level, list(var_added_cols), worker_nos)
+        rets = {}
+        for _, worker_no, ret in self.get_messages(("done",), len(self.procs)):
+            rets[worker_no] = ret
+        return rets
+
+    async def send_level_rows(
+        self, level: str, var_added_cols: List[str], worker_nos: List[int]
+    ):
+        if not self.cf:
+            return
+        conn_read, conn_write = await self.cf.get_db_conns()
+        try:
+            cursor_read = await conn_read.cursor()
+            await self.cf.get_level_data_iterator(
+                level,
+                uid=self.ftable_uid,
+                cursor_read=cursor_read,
+                var_added_cols=var_added_cols,
+                head_n=self.head_n,
+            )
+            col_names = [d[0] for d in cursor_read.description]
+            for worker_no in worker_nos:
+                self.put_item(worker_no, col_names)
+            while True:
+                datarows = await cursor_read.fetchmany(ROW_BATCH_SIZE)
+                if not datarows:
+                    break
+                datarows = [tuple(datarow) for datarow in datarows]
+                for worker_no in worker_nos:
+                    self.put_item(worker_no, datarows)
+            for worker_no in worker_nos:
+                self.put_item(worker_no, None)
+            await cursor_read.close()
+        finally:
+            await conn_read.close()
+            await conn_write.close()
+
+    def put_item(self, worker_no: int, item):
+        from queue import Full
+
+        while True:
+            try:
+                self.row_queues[worker_no].put(item, True, 1)
+                return
+            except Full:
+                if not self.procs[worker_no].is_alive():
+                    self.raise_worker_error(worker_no)
+
+    def get_messages(self, kind: Tuple[str, ...], num_msgs: int) -> list:
+        """Waits for num_msgs messages of kind from the workers.
+
+        kind is a message type, followed by a level for "ready" messages.
+        """
+        from queue import Empty
+        from ..exceptions import SetupError
+
+        msgs = []
+        for msg in self.pending_msgs[:]:
+            if self.is_message_of(msg, kind):
+                msgs.append(msg)
+                self.pending_msgs.remove(msg)
+        while len(msgs) < num_msgs:
+            try:
+                msg = self.msg_queue.get(True, 1)  # type: ignore
+            except Empty:
+                for worker_no, proc in enumerate(self.procs):
+                    if proc.exitcode:
+                        self.raise_worker_error(worker_no)
+                continue
+            if msg[0] == "error":
+                raise SetupError(msg=f"{self.module_names[msg[1]]}: {msg[2]}")
+            if self.is_message_of(msg, kind):
+                msgs.append(msg)
+            else:
+                self.pending_msgs.append(msg)
+        return msgs
+
+    def is_message_of(self, msg: tuple, kind: Tuple[str, ...]) -> bool:
+        return msg[0] == kind[0] and msg[2 : len(kind) + 1] == kind[1:]
+
+    def raise_worker_error(self, worker_no: int):
+        from queue import Empty
+        from ..exceptions import SetupError
+
+        # A failed worker sends its traceback before exiting.
+        while True:
+            try:
+                msg = self.msg_queue.get(True, 1)  # type: ignore
+            except Empty:
+                break
+            if msg[0] == "error":
+                raise SetupError(msg=f"{self.module_names[msg[1]]}: {msg[2]}")
+            self.pending_msgs.append(msg)
+        raise SetupError(module_name=self.module_names[worker_no])
@@ -1262,84 +1262,6 @@ class Runner(object):
             self.logger.info("num_workers: {}".format(num_workers))
         return num_workers
 
-    def collect_crxs(self, run_no: int):
-        from ..util.util import escape_glob_pattern
-        from os import remove
-        from pathlib import Path
-
-        run_name, output_dir = self.get_run_name_output_dir_by_run_no(run_no)
-        if not output_dir:
-            return
-        crx_path = Path(output_dir) / f"{run_name}.crx"
-        wf = open(str(crx_path), "w")
-        fns = sorted(
-            [
-                str(v)
-                for v in Path(output_dir).glob(escape_glob_pattern(run_name) + ".crx.*")
-            ]
-        )
-        fn = fns[0]
-        f = open(fn)
-        for line in f:
-            wf.write(line)
-        f.close()
-        remove(fn)
-        for fn in fns[1:]:
-            f = open(fn)
-            for line in f:
-                if line[0] != "#":
-                    wf.write(line)
-            f.close()
-            remove(fn)
-        wf.close()
-
-    def collect_crgs(self, run_no: int):
-        from os import remove
-        from pathlib import Path
-        from ..util.util import escape_glob_pattern
-        from ..consts import GENE_LEVEL_MAPPED_FILE_SUFFIX
-
-        run_name, output_dir = self.get_run_name_output_dir_by_run_no(run_no)
-        if not output_dir:
-            return
-        crg_path = Path(output_dir) / f"{run_name}{GENE_LEVEL_MAPPED_FILE_SUFFIX}"
-        wf = open(str(crg_path), "w")
-        unique_hugos = {}
-        fns = sorted(
-            [
-                str(v)
-                for v in crg_path.parent.glob(escape_glob_pattern(crg_path.name) + ".*")
-            ]
-        )
-        fn = fns[0]
-        f = open(fn)
-        for line in f:
-            if line[0] != "#":
-                hugo = line.split()[0]
-                if hugo not in unique_hugos:
-                    unique_hugos[hugo] = line
-            else:
-                wf.write(line)
-        f.close()
-        remove(fn)
-        for fn in fns[1:]:
-            f = open(fn)
-            for line in f:
-                if line[0] != "#":
-                    hugo = line.split()[0]
-                    if hugo not in unique_hugos:
-                        # wf.write(line)
-                        unique_hugos[hugo] = line
-            f.close()
-            remove(fn)
-        hugos = list(unique_hugos.keys())
-        hugos.sort()
-        for hugo in hugos:
-            wf.write(unique_hugos[hugo])
-        wf.close()
-        del unique_hugos
-        del hugos
-
     def table_exists(self, cursor, table):
         sql = (
             'select name from sqlite_master where type="table" and '
@@ -1357,6 +1279,7 @@ class Runner(object):
         self, run_no: int
     ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         from pathlib import Path
+        from ..util.inout import FileReader
         from ..consts import VARIANT_LEVEL_MAPPED_FILE_SUFFIX
 
         run_name, output_dir = self.get_run_name_output_dir_by_run_no(run_no)
@@ -1365,17 +1288,13 @@ class Runner(object):
         modulename = None
         fn = Path(output_dir) / (run_name + VARIANT_LEVEL_MAPPED_FILE_SUFFIX)
         if fn.exists():
-            f = open(fn)
-            for line in f:
+            for line in FileReader(fn).get_header_lines():
                 if line.startswith("#title="):
                     title = line.strip().split("=")[1]
                 elif line.startswith("#version="):
                     version = line.strip().split("=")[1]
                 elif line.startswith("#modulename="):
                     modulename = line.strip().split("=")[1]
-                elif line.startswith("#") is False:
-                    break
-            f.close()
         return title, version, modulename
 
     def get_run_name_output_dir_by_run_no(self, run_no: int) -> Tuple[str, str]:
@@ -1404,10 +1323,11 @@ class Runner(object):
         from pathlib import Path
         import json
         from ..consts import MAPPING_FILE_SUFFIX
+        from ..util.inout import FileReader
 
         run_name, output_dir = self.get_run_name_output_dir_by_run_no(run_no)
-        f = open(Path(output_dir) / (run_name + MAPPING_FILE_SUFFIX))
-        for line in f:
+        reader = FileReader(str(Path(output_dir) / (run_name + MAPPING_FILE_SUFFIX)))
+        for line in reader.get_header_lines():
             if line.startswith("#input_paths="):
                 new_line = "=".join(line.strip().split("=")[1:])
                 input_paths = json.loads(new_line)
@@ -1701,6 +1621,7 @@ class Runner(object):
             mp=self.args.mp,
             keep_liftover_failed=self.args.keep_liftover_failed,
             keep_ref=self.keep_ref,
+            use_processes=self.args.converter_processes,
             outer=self.outer,
         )
         ret = converter.run()
@@ -1739,8 +1660,10 @@ class Runner(object):
 
     async def run_mapper(self, run_no: int):
         import multiprocessing as mp
-        from ..base.mp_runners import init_worker, mapper_runner
+        from ..base.mp_runners import init_worker, mapper_shard_runner
         from ..util.inout import FileReader
+        from ..consts import MAPPER_SHARDS_PER_WORKER
+        from ..consts import MAPPER_MIN_LINES_PER_SHARD
 
         if not self.args or not self.run_name or not self.output_dir:
             raise
@@ -1748,59 +1671,63 @@ class Runner(object):
         output_dir = self.output_dir[run_no]
         num_workers = self.get_num_workers()
         reader = FileReader(self.crvinput)
-        num_lines, chunksize, poss, len_poss, max_num_lines = reader.get_chunksize(
-            num_workers
+        # Many more shards than workers, so that workers which finish fast
+        # shards take the remaining ones instead of idling.
+        num_shards = min(
+            num_workers * MAPPER_SHARDS_PER_WORKER,
+            reader.estimate_num_data_lines() // MAPPER_MIN_LINES_PER_SHARD,
         )
-        if self.logger:
-            self.logger.info(
-                f"input line chunksize={chunksize} total number of "
-                + f"input lines={num_lines} number of chunks={len_poss}"
+        chunk_ranges = reader.get_chunk_ranges(max(num_shards, 1))
+        shard_args = [
+            (
+                self.crvinput,
+                seekpos,
+                endpos,
+                run_name,
+                output_dir,
+                self.mapper_name,
+                shard_no,
+                ";".join(self.args.primary_transcript),
+                self.serveradmindb,
             )
-        pool = mp.get_context("spawn").Pool(num_workers, init_worker)
-        pos_no = 0
-        while pos_no < len_poss:
-            jobs = []
-            for _ in range(num_workers):
-                if pos_no == len_poss:
-                    break
-                (seekpos, num_lines) = poss[pos_no]
-                if pos_no == len_poss - 1:
-                    job = pool.apply_async(
-                        mapper_runner,
-                        (
-                            self.crvinput,
-                            seekpos,
-                            max_num_lines - num_lines,
-                            run_name,
-                            output_dir,
-                            self.mapper_name,
-                            pos_no,
-                            ";".join(self.args.primary_transcript),
-                            self.serveradmindb,
-                        ),
-                    )
-                else:
-                    job = pool.apply_async(
-                        mapper_runner,
-                        (
-                            self.crvinput,
-                            seekpos,
-                            chunksize,
-                            run_name,
-                            output_dir,
-                            self.mapper_name,
-                            pos_no,
-                            ";".join(self.args.primary_transcript),
-                            self.serveradmindb,
-                        ),
+            for shard_no, (seekpos, endpos) in enumerate(chunk_ranges)
+        ]
+        if self.logger:
+            self.logger.info(f"number of input chunks={len(shard_args)}")
+        num_procs = min(num_workers, len(shard_args))
+        with mp.get_context("spawn").Pool(num_procs, init_worker) as pool:
+            for num_done, _ in enumerate(
+                pool.imap_unordered(mapper_shard_runner, shard_args), start=1
+            ):
+                if self.logger:
+                    self.logger.info(
+                        f"mapped input chunks: {num_done}/{len(shard_args)}"
                     )
-                jobs.append(job)
-                pos_no += 1
-            for job in jobs:
-                job.get()
-        pool.close()
-        self.collect_crxs(run_no)
-        self.collect_crgs(run_no)
+        self.write_mapper_shard_manifests(run_no, len(shard_args))
+
+    def write_mapper_shard_manifests(self, run_no: int, num_shards: int):
+        """Mapper shards are read in place through shard manifests at the crx
+        and crg paths. Gene shards are merged by hugo."""
+        from pathlib import Path
+        from ..util.inout import write_shard_manifest
+        from ..consts import VARIANT_LEVEL_MAPPED_FILE_SUFFIX
+        from ..consts import GENE_LEVEL_MAPPED_FILE_SUFFIX
+
+        run_name, output_dir = self.get_run_name_output_dir_by_run_no(run_no)
+        for suffix, merge_key in [
+            (VARIANT_LEVEL_MAPPED_FILE_SUFFIX, None),
+            (GENE_LEVEL_MAPPED_FILE_SUFFIX, "hugo"),
+        ]:
+            path = Path(output_dir) / f"{run_name}{suffix}"
+            shard_paths = []
+            for shard_no in range(num_shards):
+                shard_path = Path(f"{path}.{shard_no:010.0f}")
+                if not shard_path.exists():
+                    if self.logger:
+                        self.logger.warning(f"{shard_path} does not exist.")
+                    continue
+                shard_paths.append(str(shard_path))
+            write_shard_manifest(str(path), shard_paths, merge_key=merge_key)
 
     async def run_annotators(self, run_no: int):
         import os
@@ -1875,12 +1802,15 @@ class Runner(object):
             }
             kwargs["run_name"] = run_name
             kwargs["output_dir"] = output_dir
-            run_args[module.name] = (module, kwargs)
+            run_args[module.name] = self.get_annotator_shard_args(
+                module, kwargs, num_workers
+            )
         start_queue = self.manager.Queue()
         end_queue = self.manager.Queue()
         all_mnames = set(self.annotators_to_run)
         assigned_mnames = set()
         done_mnames = set(self.done_annotators)
+        shards_left: Dict[str, int] = {}
         queue_populated = self.manager.Value("c_bool", False)
         pool_args = [
             [
@@ -1904,30 +1834,166 @@ class Runner(object):
                     mname not in assigned_mnames
                     and set(module.secondary_module_names) <= done_mnames
                 ):
-                    start_queue.put(run_args[mname])
+                    for task in run_args[mname]:
+                        start_queue.put(task)
+                    if len(run_args[mname]) > 1:
+                        shards_left[mname] = len(run_args[mname])
                     assigned_mnames.add(mname)
             while (
-                assigned_mnames != all_mnames
+                assigned_mnames != all_mnames or shards_left
             ):  # TODO not handling case where parent module errors out
                 finished_module = end_queue.get()
+                if finished_module in shards_left:
+                    shards_left[finished_module] -= 1
+                    if shards_left[finished_module] > 0:
+                        continue
+                    del shards_left[finished_module]
+                    self.collect_annotator_shards(
+                        self.annotators_to_run[finished_module],
+                        run_no,
+                        len(run_args[finished_module]),
+                    )
                 done_mnames.add(finished_module)
                 for mname, module in self.annotators_to_run.items():
                     if (
                         mname not in assigned_mnames
                         and set(module.secondary_module_names) <= done_mnames
                     ):
-                        start_queue.put(run_args[mname])
+                        for task in run_args[mname]:
+                            start_queue.put(task)
+                        if len(run_args[mname]) > 1:
+                            shards_left[mname] = len(run_args[mname])
                         assigned_mnames.add(mname)
             queue_populated = True
             pool.join()
         if len(self.annotators_to_run) > 0:
             self.annotator_ran = True
 
+    def get_annotator_shard_args(
+        self, module, kwargs: Dict[str, Any], num_workers: int
+    ) -> List[Tuple[Any, Dict[str, Any]]]:
+        from ..util.inout import FileReader
+        from ..consts import ANNOTATOR_MIN_LINES_PER_SHARD
+
+        inputpath = kwargs.get("input_file")
+        if num_workers < 2 or not inputpath or not module.conf.get("shardable"):
+            return [(module, kwargs)]
+        reader = FileReader(inputpath)
+        num_data_lines = reader.estimate_num_data_lines()
+        num_shards = min(num_workers, num_data_lines // ANNOTATOR_MIN_LINES_PER_SHARD)
+        if num_shards < 2:
+            return [(module, kwargs)]
+        chunk_ranges = reader.get_chunk_ranges(num_shards)
+        if len(chunk_ranges) < 2:
+            return [(module, kwargs)]
+        if self.logger:
+            self.logger.info(
+                f"{module.name}: running in {len(chunk_ranges)} shards of about "
+                + f"{num_data_lines // len(chunk_ranges)} lines"
+            )
+        shard_args: List[Tuple[Any, Dict[str, Any]]] = []
+        for shard_no, (seekpos, endpos) in enumerate(chunk_ranges):
+            shard_kwargs = kwargs.copy()
+            shard_kwargs["seekpos"] = seekpos
+            shard_kwargs["endpos"] = endpos
+            shard_kwargs["postfix"] = f".{shard_no:010.0f}"
+            shard_args.append((module, shard_kwargs))
+        return shard_args
+
+    def collect_annotator_shards(self, module, run_no: int, num_shards: int):
+        from os import remove
+        from pathlib import Path
+        from ..util.inout import concat_intermediate_files
+
+        output_path = self.get_module_output_path(module, run_no)
+        if not output_path:
+            return
+        shard_paths = []
+        for shard_no in range(num_shards):
+            shard_path = Path(f"{output_path}.{shard_no:010.0f}")
+            if not shard_path.exists():
+                if self.logger:
+                    self.logger.warning(f"{shard_path} does not exist.")
+                continue
+            shard_paths.append(str(shard_path))
+        concat_intermediate_files(shard_paths, str(output_path))
+        for shard_path in shard_paths:
+            remove(shard_path)
+
     async def run_aggregator(self, run_no: int):
-        db_path = await self.run_aggregator_level("variant", run_no)
-        await self.run_aggregator_level("gene", run_no)
-        await self.run_aggregator_level("sample", run_no)
-        await self.run_aggregator_level("mapping", run_no)
+        if self.append_mode[run_no] or self.get_num_workers() < 2:
+            db_path = await self.run_aggregator_level("variant", run_no)
+            await self.run_aggregator_level("gene", run_no)
+            await self.run_aggregator_level("sample", run_no)
+            await self.run_aggregator_level("mapping", run_no)
+            return db_path
+        return self.run_aggregator_levels_concurrently(run_no)
+
+    def get_aggregator_arg_dict(self, level: str, run_no: int) -> Dict[str, Any]:
+        if not self.run_name or not self.output_dir:
+            raise
+        output_dir = self.output_dir[run_no]
+        arg_dict = {
+            "input_dir": output_dir,
+            "output_dir": output_dir,
+            "level": level,
+            "run_name": self.run_name[run_no],
+            "serveradmindb": self.serveradmindb,
+        }
+        if self.cleandb and level == "variant":
+            arg_dict["delete"] = True
+        if self.append_mode[run_no]:
+            arg_dict["append"] = True
+        return arg_dict
+
+    def get_worker_log_args(self) -> Tuple[bool, Any, Any, int]:
+        """Arguments of setup_worker_loggers for spawned workers."""
+        return (
+            self.args.logtofile,
+            self.log_path,
+            self.error_log_path,
+            self.args.loglevel,
+        )
+
+    def run_aggregator_levels_concurrently(self, run_no: int):
+        import multiprocessing as mp
+        from time import time
+        from ..base.mp_runners import init_worker
+        from ..base.mp_runners import aggregator_runner
+        from ..base.aggregator import merge_staging_db
+        from ..util.run import update_status
+
+        levels = ["variant", "gene", "sample", "mapping"]
+        update_status(
+            f"running Aggregator ({', '.join(levels)})",
+            logger=self.logger,
+            serveradmindb=self.serveradmindb,
+        )
+        stime = time()
+        arg_dicts = []
+        for level in levels:
+            arg_dict = self.get_aggregator_arg_dict(level, run_no)
+            # The variant level is written to the final database directly,
+            # and the other levels are merged into it after all are done.
+            if level != "variant":
+                arg_dict["staging"] = True
+            arg_dicts.append(arg_dict)
+        num_workers = min(self.get_num_workers(), len(levels))
+        with mp.get_context("spawn").Pool(num_workers, init_worker) as pool:
+            db_paths = pool.starmap(
+                aggregator_runner,
+                [(v, self.get_worker_log_args()) for v in arg_dicts],
+                chunksize=1,
+            )
+        db_path = db_paths[0]
+        for level, staging_db_path in zip(levels[1:], db_paths[1:]):
+            merge_staging_db(db_path, staging_db_path, level)
+        rtime = time() - stime
+        update_status(
+            f"Aggregator finished in {rtime:.3f}s",
+            logger=self.logger,
+            serveradmindb=self.serveradmindb,
+        )
         return db_path
 
     async def run_aggregator_level(self, level, run_no: int):
@@ -1937,27 +2003,13 @@ class Runner(object):
 
         if self.append_mode[run_no] and level not in ["variant", "gene"]:
             return
-        if not self.run_name or not self.output_dir:
-            raise
-        run_name = self.run_name[run_no]
-        output_dir = self.output_dir[run_no]
         update_status(
             f"running Aggregator ({level})",
             logger=self.logger,
             serveradmindb=self.serveradmindb,
         )
         stime = time()
-        arg_dict = {
-            "input_dir": output_dir,
-            "output_dir": output_dir,
-            "level": level,
-            "run_name": run_name,
-            "serveradmindb": self.serveradmindb,
-        }
-        if self.cleandb and level == "variant":
-            arg_dict["delete"] = True
-        if self.append_mode[run_no]:
-            arg_dict["append"] = True
+        arg_dict = self.get_aggregator_arg_dict(level, run_no)
         v_aggregator = Aggregator(**arg_dict)
         v_aggregator.run()
         rtime = time() - stime
@@ -1969,29 +2021,15 @@ class Runner(object):
         return v_aggregator.db_path
 
     async def run_postaggregators(self, run_no: int):
-        from time import time
-        from ..util.run import announce_module
         from ..util.util import load_class
-        from ..util.run import update_status
         from ..system.consts import default_postaggregator_names
-        from ..consts import MODULE_OPTIONS_KEY
 
         if not self.run_name or not self.output_dir:
             raise
-        run_name = self.run_name[run_no]
-        output_dir = self.output_dir[run_no]
+        module_names = []
         for module_name, module in self.postaggregators.items():
             if self.append_mode[run_no] and module_name in default_postaggregator_names:
                 continue
-            arg_dict = {
-                "module_name": module_name,
-                "run_name": run_name,
-                "output_dir": output_dir,
-                "serveradmindb": self.serveradmindb,
-            }
-            postagg_conf = self.run_conf.get(module_name, {})
-            if postagg_conf:
-                arg_dict[MODULE_OPTIONS_KEY] = postagg_conf
             post_agg_cls = load_class(module.script_path, "PostAggregator")
             if not post_agg_cls:
                 post_agg_cls = load_class(module.script_path, "CravatPostAggregator")
@@ -2001,16 +2039,153 @@ class Runner(object):
                         f"{module_name} does not exist. Skipping the module."
                     )
                 continue
-            post_agg = post_agg_cls(**arg_dict)
-            announce_module(module, serveradmindb=self.serveradmindb)
-            stime = time()
-            post_agg.run()
-            rtime = time() - stime
-            update_status(
-                f"{module_name} finished in {rtime:.3f}s",
-                logger=self.logger,
-                serveradmindb=self.serveradmindb,
-            )
+            module_names.append(module_name)
+        waves = self.get_postaggregator_waves(module_names)
+        if self.get_num_workers() < 2 or max([len(v) for v in waves] + [0]) < 2:
+            for module_name in module_names:
+                self.run_postaggregator(module_name, run_no)
+            return
+        self.run_postaggregator_waves(waves, run_no)
+
+    def get_postaggregator_arg_dict(self, module_name: str, run_no: int):
+        from ..consts import MODULE_OPTIONS_KEY
+
+        if not self.run_name or not self.output_dir:
+            raise
+        arg_dict = {
+            "module_name": module_name,
+            "run_name": self.run_name[run_no],
+            "output_dir": self.output_dir[run_no],
+            "serveradmindb": self.serveradmindb,
+        }
+        postagg_conf = self.run_conf.get(module_name, {})
+        if postagg_conf:
+            arg_dict[MODULE_OPTIONS_KEY] = postagg_conf
+        return arg_dict
+
+    def run_postaggregator(self, module_name: str, run_no: int):
+        from time import time
+        from ..util.run import announce_module
+        from ..util.run import update_status
+        from ..base.mp_runners import postaggregator_runner
+
+        module = self.postaggregators[module_name]
+        arg_dict = self.get_postaggregator_arg_dict(module_name, run_no)
+        announce_module(module, serveradmindb=self.serveradmindb)
+        stime = time()
+        postaggregator_runner(module.script_path, arg_dict)
+        rtime = time() - stime
+        update_status(
+            f"{module_name} finished in {rtime:.3f}s",
+            logger=self.logger,
+            serveradmindb=self.serveradmindb,
+        )
+
+    def get_postaggregator_waves(self, module_names: List[str]) -> List[List[str]]:
+        """Groups postaggregators so that each group only depends on earlier
+        groups, based on requires and input_columns of the modules.
+
+        Modules without input_columns read all columns, so they run alone and
+        after the modules listed before them, and the modules listed after them
+        run after them. Modules in a dependency cycle run one by one."""
+        dependencies: Dict[str, Set[str]] = {v: set() for v in module_names}
+        for module_no, module_name in enumerate(module_names):
+            conf = self.postaggregators[module_name].conf
+            input_columns = conf.get("input_columns")
+            dependencies[module_name].update(conf.get("requires") or [])
+            if not input_columns:
+                dependencies[module_name].update(module_names[:module_no])
+                for later_name in module_names[module_no + 1 :]:
+                    dependencies[later_name].add(module_name)
+                continue
+            for col_name in input_columns:
+                dependencies[module_name].add(col_name.split("__")[0])
+        for module_name in module_names:
+            dependencies[module_name].intersection_update(dependencies.keys())
+            dependencies[module_name].discard(module_name)
+        wave_by_name: Dict[str, int] = {}
+        names_left = list(module_names)
+        while names_left:
+            ready_names = [
+                v
+                for v in names_left
+                if all([d in wave_by_name for d in dependencies[v]])
+            ]
+            if not ready_names:
+                if self.logger:
+                    self.logger.warning(
+                        f"Dependency cycle among {', '.join(names_left)}. "
+                        + "Running them one by one."
+                    )
+                wave = max(list(wave_by_name.values()) + [-1]) + 1
+                for module_name in names_left:
+                    wave_by_name[module_name] = wave
+                    wave += 1
+                break
+            for module_name in ready_names:
+                wave_by_name[module_name] = max(
+                    [wave_by_name[v] + 1 for v in dependencies[module_name]] + [0]
+                )
+                names_left.remove(module_name)
+        waves: List[List[str]] = [
+            [] for _ in range(max(list(wave_by_name.values()) + [-1]) + 1)
+        ]
+        for module_name in module_names:
+            waves[wave_by_name[module_name]].append(module_name)
+        return waves
+
+    def run_postaggregator_waves(self, waves: List[List[str]], run_no: int):
+        import multiprocessing as mp
+        from sqlite3 import connect
+        from time import time
+        from ..util.run import announce_module
+        from ..util.run import update_status
+        from ..util.util import get_result_dbpath
+        from ..base.mp_runners import init_worker
+        from ..base.mp_runners import postaggregator_runner
+
+        if not self.run_name or not self.output_dir:
+            raise
+        db_path = get_result_dbpath(self.output_dir[run_no], self.run_name[run_no])
+        # WAL lets postaggregators of a wave read while another one writes.
+        conn = connect(db_path)
+        conn.execute("pragma journal_mode=wal")
+        conn.close()
+        num_workers = min(self.get_num_workers(), max([len(v) for v in waves]))
+        try:
+            with mp.get_context("spawn").Pool(num_workers, init_worker) as pool:
+                for wave in waves:
+                    jobs = []
+                    stime = time()
+                    for module_name in wave:
+                        module = self.postaggregators[module_name]
+                        arg_dict = self.get_postaggregator_arg_dict(
+                            module_name, run_no
+                        )
+                        arg_dict["concurrent"] = True
+                        announce_module(module, serveradmindb=self.serveradmindb)
+                        jobs.append(
+                            pool.apply_async(
+                                postaggregator_runner,
+                                (
+                                    module.script_path,
+                                    arg_dict,
+                                    self.get_worker_log_args(),
+                                ),
+                            )
+                        )
+                    for job in jobs:
+                        job.get()
+                    rtime = time() - stime
+                    update_status(
+                        f"{', '.join(wave)} finished in {rtime:.3f}s",
+                        logger=self.logger,
+                        serveradmindb=self.serveradmindb,
+                    )
+        finally:
+            conn = connect(db_path)
+            conn.execute("pragma journal_mode=delete")
+            conn.close()
 
     async def run_vcf2vcf(self, run_no: int):
         from time import time
@@ -2068,48 +2243,92 @@ class Runner(object):
         self.report_response = response
 
     async def run_reporter(self, run_no: int, head_n: Optional[int] = None):
-        from pathlib import Path
         from ..util.util import load_class
-        from ..util.run import update_status
         from ..exceptions import ModuleNotExist
         from ..util.run import announce_module
-        from ..consts import MODULE_OPTIONS_KEY
         from .reporter import BaseReporter
 
         if not self.run_name or not self.args or not self.output_dir or not self.inputs:
             raise
-        run_name = self.run_name[run_no]
-        output_dir = Path(self.output_dir[run_no])
+        if self.should_fan_out_reporters():
+            return await self.log_time_of_func(
+                self.run_reporters_fanout, run_no, head_n=head_n, work="reporters"
+            )
         response = {}
         for module_name, module in self.reporters.items():
             reporter = None
             announce_module(module, serveradmindb=self.serveradmindb)
             if module is None:
                 raise ModuleNotExist(module_name)
-            arg_dict = {}  # dict(vars(self.args))
-            arg_dict["dbpath"] = output_dir / (run_name + ".sqlite")
-            arg_dict["savepath"] = output_dir / run_name
-            arg_dict["output_dir"] = output_dir
-            arg_dict["run_name"] = run_name
-            arg_dict["module_name"] = module_name
-            arg_dict["filtersql"] = self.filtersql
-            arg_dict[MODULE_OPTIONS_KEY] = self.run_conf.get(module_name, {})
+            arg_dict = self.get_reporter_arg_dict(module_name, run_no)
             Reporter: Type[BaseReporter] = load_class(module.script_path, "Reporter")  # type: ignore
             reporter = Reporter(**arg_dict)
             response_t = await self.log_time_of_func(
                 reporter.run, head_n=head_n, work=module_name
             )
-            output_fns = None
-            if isinstance(response_t, list):
-                output_fns = " ".join(response_t)
-            elif isinstance(response_t, str):
-                output_fns = response_t
-            if output_fns is not None:
-                update_status(
-                    f"report created: {output_fns} ",
-                    logger=self.logger,
-                    serveradmindb=self.serveradmindb,
-                )
+            self.announce_report_created(response_t)
+            report_type: str = module_name.replace("reporter", "")
+            response[report_type] = response_t
+        return response
+
+    def get_reporter_arg_dict(self, module_name: str, run_no: int) -> Dict[str, Any]:
+        from pathlib import Path
+        from ..consts import MODULE_OPTIONS_KEY
+
+        if not self.run_name or not self.output_dir:
+            raise
+        run_name = self.run_name[run_no]
+        output_dir = Path(self.output_dir[run_no])
+        arg_dict = {}  # dict(vars(self.args))
+        arg_dict["dbpath"] = output_dir / (run_name + ".sqlite")
+        arg_dict["savepath"] = output_dir / run_name
+        arg_dict["output_dir"] = output_dir
+        arg_dict["run_name"] = run_name
+        arg_dict["module_name"] = module_name
+        arg_dict["filtersql"] = self.filtersql
+        arg_dict[MODULE_OPTIONS_KEY] = self.run_conf.get(module_name, {})
+        return arg_dict
+
+    def announce_report_created(self, response_t):
+        from ..util.run import update_status
+
+        output_fns = None
+        if isinstance(response_t, list):
+            output_fns = " ".join(response_t)
+        elif isinstance(response_t, str):
+            output_fns = response_t
+        if output_fns is not None:
+            update_status(
+                f"report created: {output_fns} ",
+                logger=self.logger,
+                serveradmindb=self.serveradmindb,
+            )
+
+    def should_fan_out_reporters(self) -> bool:
+        from .reporter_fanout import can_fan_out_reporters
+
+        if len(self.reporters) < 2 or self.get_num_workers() < 2:
+            return False
+        if None in self.reporters.values():
+            return False
+        return can_fan_out_reporters(
+            [module.script_path for module in self.reporters.values()]
+        )
+
+    async def run_reporters_fanout(self, run_no: int, head_n: Optional[int] = None):
+        from ..util.run import announce_module
+        from .reporter_fanout import ReporterFanout
+
+        script_paths = {}
+        arg_dicts = {}
+        for module_name, module in self.reporters.items():
+            announce_module(module, serveradmindb=self.serveradmindb)
+            script_paths[module_name] = module.script_path
+            arg_dicts[module_name] = self.get_reporter_arg_dict(module_name, run_no)
+        rets = await ReporterFanout(script_paths, arg_dicts, head_n=head_n).run()
+        response = {}
+        for module_name, response_t in rets.items():
+            self.announce_report_created(response_t)
             report_type: str = module_name.replace("reporter", "")
             response[report_type] = response_t
         return response
@@ -66,6 +66,10 @@ crs_idx = [["uid"], ["sample_id"], ["sample_id", "uid"]]
 crv_idx = [["uid"]]
 crx_idx = [["uid"]]
 crg_idx = [["hugo"]]
+ANNOTATOR_MIN_LINES_PER_SHARD = 100000
+MAPPER_SHARDS_PER_WORKER = 8
+MAPPER_MIN_LINES_PER_SHARD = 10000
+DEFAULT_ANNOTATE_BATCH_SIZE = 1000
 
 all_mappings_col_name = "all_mappings"
 mapping_parser_name = "mapping_parser"
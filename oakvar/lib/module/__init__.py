@@ -928,6 +928,7 @@ def install_module(
 def uninstall_module(module_name, outer=None):
     import shutil
     from .local import get_local_module_info
+    from .local import is_builtin_module
     from .cache import get_module_cache
 
     if module_name not in list_local():
@@ -939,6 +940,12 @@ def uninstall_module(module_name, outer=None):
         if outer:
             outer.write(f"{module_name} does not exist.")
         return False
+    if is_builtin_module(local_info):
+        if outer:
+            outer.write(
+                f"{module_name} is built into OakVar and cannot be uninstalled."
+            )
+        return False
     shutil.rmtree(local_info.directory, ignore_errors=True)
     mc = get_module_cache()
     mc.remove_local(module_name)
@@ -119,20 +119,30 @@ class ModuleCache(object):
 
     def update_local(self):
         import os
-        from ..consts import install_tempdir_name
         from ..system import get_modules_dir
         from ..exceptions import SystemMissingException
+        from .local import get_builtin_modules_dir
 
         self.local = LocalModuleCache()
         self._modules_dir = get_modules_dir()
         if self._modules_dir is None:
             raise SystemMissingException(msg="Modules directory is not set")
+        # Installed modules override the built-in modules of the same name.
+        self.add_local_modules(get_builtin_modules_dir())
         if not (os.path.exists(self._modules_dir)):
             return None
-        for mg in os.listdir(self._modules_dir):
+        self.add_local_modules(self._modules_dir)
+
+    def add_local_modules(self, modules_dir):
+        import os
+        from ..consts import install_tempdir_name
+
+        if not os.path.exists(modules_dir):
+            return
+        for mg in os.listdir(modules_dir):
             if mg == install_tempdir_name:
                 continue
-            mg_path = os.path.join(self._modules_dir, mg)
+            mg_path = os.path.join(modules_dir, mg)
             basename = os.path.basename(mg_path)
             if (
                 not (os.path.isdir(mg_path))
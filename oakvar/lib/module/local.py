@@ -309,9 +309,27 @@ def get_module_dir(module_name: str, module_type: str = "") -> Optional[Path]:
             for module_fn in module_fns:
                 if module_fn.name == module_name:
                     return module_fn
+    builtin_modules_dir = get_builtin_modules_dir()
+    if module_type:
+        p = builtin_modules_dir / (module_type + "s") / module_name
+        if p.exists():
+            return p
+    else:
+        for p in builtin_modules_dir.glob(f"*/{module_name}"):
+            return p
     return None
 
 
+def get_builtin_modules_dir() -> Path:
+    from ..util.admin_util import get_packagedir
+
+    return get_packagedir() / "lib" / "assets" / "modules"
+
+
+def is_builtin_module(module_info: LocalModule) -> bool:
+    return get_builtin_modules_dir() in module_info.directory.parents
+
+
 def get_module_test_dir(module_name: str, module_type: str = "") -> Optional[Path]:
     module_dir = get_module_dir(module_name, module_type=module_type)
     if module_dir:
@@ -83,6 +83,9 @@ max_num_concurrent_annotators_per_job_key = "max_num_concurrent_annotators_per_j
 max_num_concurrent_modules_per_job_key = "max_num_concurrent_modules_per_job"
 default_assembly_key = "default_assembly"
 report_filter_max_num_cache_per_user_key = "report_filter_max_num_cache_per_user"
+report_filter_auto_index_key = "report_filter_auto_index"
+report_filter_auto_index_min_uses_key = "report_filter_auto_index_min_uses"
+intermediate_format_key = "intermediate_format"
 
 #
 # default system conf values
@@ -93,6 +96,7 @@ default_gui_port_ssl = 8443
 default_assembly = "hg38"
 default_postaggregator_names = ["tagsampler", "vcfinfo"]
 DEFAULT_REPORT_FILTER_MAX_NUM_CACHE_PER_USER = 20
+DEFAULT_REPORT_FILTER_AUTO_INDEX_MIN_USES = 3
 
 #
 # Server
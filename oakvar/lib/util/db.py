@@ -49,8 +49,20 @@
 from typing import Union
 from typing import Dict
 from typing import Any
+from typing import List
+from typing import Set
 from pathlib import Path
 
+# Key columns added to filter column indexes so that filtering reads only the index.
+FILTER_INDEX_KEY_COLUMNS = {"variant": "base__uid", "gene": "base__hugo"}
+VARIANT_KEY_COLUMNS = ["base__chrom", "base__pos", "base__ref_base", "base__alt_base"]
+# Indexes used only while result databases are merged.
+MERGE_INDEXES = [
+    ("gene_merge_idx", "gene", ["base__hugo"]),
+    ("variant_merge_idx", "variant", VARIANT_KEY_COLUMNS),
+    ("sample_merge_idx", "sample", ["base__uid", "base__sample_id"]),
+]
+
 
 def get_table_info_sqlite(dbpath: Path, level: str):
     import sqlite3
@@ -171,6 +183,59 @@ def get_sqliteinfo(dbpath: Union[Path, str] = "") -> Dict[str, Any]:
     return out
 
 
+def get_leading_index_columns(cursor, table_name: str) -> Set[str]:
+    q = (
+        "select ii.name from pragma_index_list(?) as il, "
+        + "pragma_index_info(il.name) as ii where ii.seqno=0"
+    )
+    cursor.execute(q, (table_name,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def make_filter_column_indexes(
+    dbpath: Union[Path, str], columns: Dict[str, List[str]]
+) -> List[str]:
+    """Creates indexes on the columns which filters are applied on.
+
+    Args:
+        dbpath: Path to a result SQLite file
+        columns: Filter column names by level (variant or gene)
+
+    Returns:
+        Names of the created indexes. Columns which do not exist or already
+        lead an index are skipped.
+    """
+    import sqlite3
+
+    conn = sqlite3.connect(dbpath, timeout=60)
+    cursor = conn.cursor()
+    index_names = []
+    for level, col_names in columns.items():
+        key_col = FILTER_INDEX_KEY_COLUMNS.get(level)
+        if not key_col:
+            continue
+        cursor.execute("select name from pragma_table_info(?)", (level,))
+        table_cols = {row[0] for row in cursor.fetchall()}
+        indexed_cols = get_leading_index_columns(cursor, level)
+        for col_name in col_names:
+            if col_name not in table_cols or col_name in indexed_cols:
+                continue
+            index_name = f"{level}_fidx_{col_name}"
+            cursor.execute(
+                f"create index if not exists {index_name} on {level} "
+                + f"({col_name}, {key_col})"
+            )
+            cursor.execute(f"analyze {index_name}")
+            conn.commit()
+            indexed_cols.add(col_name)
+            index_names.append(index_name)
+    if index_names:
+        cursor.execute("pragma wal_checkpoint(truncate)")
+    cursor.close()
+    conn.close()
+    return index_names
+
+
 def move_job_to_account(job_dir: Union[Path, str], new_username: str):
     from sqlite3 import connect
     import json
@@ -229,3 +294,176 @@ def move_job_to_account(job_dir: Union[Path, str], new_username: str):
     # Move job dir
     job_dir.rename(new_job_dir)
     print(f"Job {job_dir} moved to {new_job_dir} for {new_username}.")
+
+
+def merge_result_dbs(dbpaths: List[str], outpath: str):
+    """Merges OakVar result databases into a new result database.
+
+    The first database is copied to outpath and the others are merged into
+    it in order with merge_result_db_into.
+
+    Args:
+        dbpaths: Paths to result SQLite files
+        outpath: Path to the merged result SQLite file
+    """
+    import sqlite3
+
+    print(f"Copying {dbpaths[0]} to {outpath}...")
+    src_conn = sqlite3.connect(dbpaths[0])
+    conn = sqlite3.connect(outpath)
+    src_conn.backup(conn)
+    src_conn.close()
+    cursor = conn.cursor()
+    cursor.execute("pragma synchronous=off")
+    for index_name, table_name, col_names in MERGE_INDEXES:
+        cursor.execute(
+            f"create index if not exists {index_name} on {table_name} "
+            + f"({', '.join(col_names)})"
+        )
+    conn.commit()
+    for dbpath in dbpaths[1:]:
+        print(f"Merging {dbpath}...")
+        merge_result_db_into(conn, dbpath)
+    for index_name, _, _ in MERGE_INDEXES:
+        cursor.execute(f"drop index if exists {index_name}")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def merge_result_db_into(conn, dbpath: str):
+    """Merges a result database into the result database of conn.
+
+    Genes and variants not in conn are appended, and variants get new
+    uids after the largest one in conn. Sample rows are added unless the
+    same sample already has the variant. Mapping rows are added for the
+    input files which conn does not have yet.
+    """
+    from json import loads
+    from json import dumps
+
+    cursor = conn.cursor()
+    cursor.execute("attach database ? as src", (dbpath,))
+    cursor.execute("begin")
+    table_cols = {}
+    for table_name in ["gene", "variant", "sample", "mapping"]:
+        cursor.execute(f"select name from main.pragma_table_info('{table_name}')")
+        table_cols[table_name] = [row[0] for row in cursor.fetchall()]
+    # Gene
+    cols = ", ".join(table_cols["gene"])
+    s_cols = ", ".join([f"s.{col}" for col in table_cols["gene"]])
+    cursor.execute(
+        f"insert into main.gene ({cols}) select {s_cols} from src.gene as s "
+        + "where not exists (select 1 from main.gene as g "
+        + "where g.base__hugo=s.base__hugo) order by s.rowid"
+    )
+    # Variant
+    key_match = " and ".join(
+        [f"v.{col}=uid_map.{col}" for col in VARIANT_KEY_COLUMNS]
+    )
+    key_cols = ", ".join(VARIANT_KEY_COLUMNS)
+    cursor.execute("drop table if exists temp.uid_map")
+    cursor.execute(
+        "create temp table uid_map (old_uid integer primary key, new_uid integer, "
+        + f"src_rowid integer, {key_cols})"
+    )
+    cursor.execute(
+        f"insert into temp.uid_map (old_uid, src_rowid, {key_cols}) "
+        + f"select base__uid, rowid, {key_cols} from src.variant"
+    )
+    update_uid_map = (
+        "update temp.uid_map set new_uid=(select v.base__uid from "
+        + f"main.variant as v where {key_match} limit 1) where new_uid is null"
+    )
+    cursor.execute(update_uid_map)
+    cursor.execute("select max(base__uid) from main.variant")
+    max_uid = cursor.fetchone()[0] or 0
+    cols = ", ".join(table_cols["variant"])
+    s_cols = ", ".join(
+        [
+            f"{max_uid} + row_number() over (order by min(m.src_rowid))"
+            if col == "base__uid"
+            else f"s.{col}"
+            for col in table_cols["variant"]
+        ]
+    )
+    # Variants repeated in src are added once, from the first of them.
+    cursor.execute(
+        f"insert into main.variant ({cols}) select {s_cols} from src.variant as s "
+        + "join temp.uid_map as m on m.old_uid=s.base__uid where m.new_uid is null "
+        + f"group by {', '.join([f'm.{col}' for col in VARIANT_KEY_COLUMNS])} "
+        + "order by min(m.src_rowid)"
+    )
+    cursor.execute(update_uid_map)
+    # Sample
+    cols = ", ".join(table_cols["sample"])
+    s_cols = ", ".join(
+        [
+            "m.new_uid" if col == "base__uid" else f"s.{col}"
+            for col in table_cols["sample"]
+        ]
+    )
+    cursor.execute(
+        f"insert into main.sample ({cols}) select {s_cols} from src.sample as s "
+        + "join temp.uid_map as m on m.old_uid=s.base__uid "
+        + "where not exists (select 1 from main.sample as x where "
+        + "x.base__uid=m.new_uid and x.base__sample_id=s.base__sample_id) "
+        + "order by s.rowid"
+    )
+    # Input files
+    cursor.execute('select colval from main.info where colkey="_input_paths"')
+    input_paths = loads(cursor.fetchone()[0].replace("'", '"'))
+    cursor.execute('select colval from src.info where colkey="_input_paths"')
+    src_input_paths = loads(cursor.fetchone()[0].replace("'", '"'))
+    rev_input_paths = {filepath: fileno for fileno, filepath in input_paths.items()}
+    new_fileno = max([int(v) for v in input_paths.keys()]) + 1
+    cursor.execute("drop table if exists temp.fileno_map")
+    cursor.execute(
+        "create temp table fileno_map (old_fileno integer primary key, "
+        + "new_fileno integer)"
+    )
+    for fileno, filepath in src_input_paths.items():
+        if filepath in rev_input_paths:
+            continue
+        input_paths[str(new_fileno)] = filepath
+        rev_input_paths[filepath] = str(new_fileno)
+        cursor.execute(
+            "insert into temp.fileno_map values (?, ?)", (int(fileno), new_fileno)
+        )
+        new_fileno += 1
+    # Mapping
+    cols = ", ".join(table_cols["mapping"])
+    s_cols = []
+    for col in table_cols["mapping"]:
+        if col == "base__uid":
+            s_cols.append("m.new_uid")
+        elif col == "base__fileno":
+            s_cols.append("f.new_fileno")
+        else:
+            s_cols.append(f"s.{col}")
+    cursor.execute(
+        f"insert into main.mapping ({cols}) select {', '.join(s_cols)} "
+        + "from src.mapping as s join temp.uid_map as m on m.old_uid=s.base__uid "
+        + "join temp.fileno_map as f on f.old_fileno=s.base__fileno "
+        + "order by s.rowid"
+    )
+    cursor.execute(
+        'update main.info set colval=? where colkey="_input_paths"',
+        [dumps(input_paths)],
+    )
+    cursor.execute(
+        'update main.info set colval=? where colkey="Input file name"',
+        [
+            ";".join(
+                [
+                    input_paths[str(v)]
+                    for v in sorted(input_paths.keys(), key=lambda v: int(v))
+                ]
+            )
+        ],
+    )
+    cursor.execute("drop table temp.uid_map")
+    cursor.execute("drop table temp.fileno_map")
+    conn.commit()
+    cursor.execute("detach database src")
+    cursor.close()
@@ -49,8 +49,18 @@ from typing import Union
 from typing import Optional
 from typing import Dict
 from typing import Any
+from typing import List
+from typing import Tuple
+from typing import Callable
 from pathlib import Path
 
+ARROW_FILE_MAGIC = b"ARROW1"
+# Schema metadata key of the header lines of Arrow intermediate files
+ARROW_META_KEY = b"oakvar_meta"
+ARROW_BATCH_SIZE = 10000
+# Line prefix of the shard paths in shard manifests
+SHARD_MANIFEST_PREFIX = "#shard="
+
 
 class BaseFile(object):
     valid_types = ["string", "int", "float"]
@@ -78,14 +88,20 @@ class BaseFile(object):
 
 class FileReader(BaseFile):
     def __init__(
-        self, path, seekpos: int = 0, chunksize: Optional[int] = None, logger=None
+        self,
+        path,
+        seekpos: int = 0,
+        chunksize: Optional[int] = None,
+        logger=None,
+        endpos: Optional[int] = None,
+        encoding: Optional[str] = None,
     ):
         from .util import detect_encoding
 
         super().__init__(path)
         self.seekpos = seekpos
         self.chunksize = chunksize
-        self.encoding = detect_encoding(self.path)
+        self.endpos = endpos
         self.annotator_name = ""
         self.annotator_displayname = ""
         self.annotator_version = ""
@@ -94,16 +110,57 @@ class FileReader(BaseFile):
         self.f = None
         self.csvfmt: bool = False
         self.logger = logger
+        # Readers of the shard files listed in a shard manifest at path
+        self.shard_readers: List["FileReader"] = []
+        self.merge_key: Optional[str] = None
+        self.merge_col_no: Optional[int] = None
+        shard_paths, self.merge_key = read_shard_manifest(self.path)
+        if shard_paths:
+            self.setup_shard_readers(shard_paths)
+            return
+        self.arrowfmt: bool = is_arrow_file(self.path)
+        if self.arrowfmt:
+            self.encoding = "utf-8"
+        elif encoding:
+            self.encoding = encoding
+        else:
+            self.encoding = detect_encoding(self.path)
         self._setup_definition()
 
+    def setup_shard_readers(self, shard_paths: List[str]):
+        # Shards are written alike, so the encoding is detected only once.
+        first_reader = FileReader(shard_paths[0], logger=self.logger)
+        self.shard_readers = [first_reader] + [
+            FileReader(shard_path, logger=self.logger, encoding=first_reader.encoding)
+            for shard_path in shard_paths[1:]
+        ]
+        self.arrowfmt = first_reader.arrowfmt
+        self.encoding = first_reader.encoding
+        self.csvfmt = first_reader.csvfmt
+        self.annotator_name = first_reader.annotator_name
+        self.annotator_displayname = first_reader.annotator_displayname
+        self.annotator_version = first_reader.annotator_version
+        self.index_columns = first_reader.index_columns
+        self.report_substitution = first_reader.report_substitution
+        # Shared, so that override_column applies to all shards.
+        self.columns = first_reader.columns
+        for shard_reader in self.shard_readers[1:]:
+            shard_reader.columns = self.columns
+        if self.merge_key:
+            # Column names can be changed later, as by the aggregator.
+            self.merge_col_no = self.get_col_nos([self.merge_key])[0]
+            if self.merge_col_no is None:
+                raise KeyError(f"{self.merge_key} is not a column of {self.path}")
+
     def _setup_definition(self):
         from json import loads
         from json.decoder import JSONDecodeError
 
-        with open(self.path, encoding=self.encoding) as f:
-            line = f.readline()[:-1]
-            if line.startswith("#fmt=csv"):
-                self.csvfmt = True
+        if not self.arrowfmt:
+            with open(self.path, encoding=self.encoding) as f:
+                line = f.readline()[:-1]
+                if line.startswith("#fmt=csv"):
+                    self.csvfmt = True
         for line in self._loop_definition():
             if line.startswith("#name="):
                 self.annotator_name = line.split("=")[1]
@@ -160,6 +217,10 @@ class FileReader(BaseFile):
         return self.annotator_version
 
     def get_chunksize(self, num_core):
+        if self.shard_readers:
+            return self.get_shard_chunksize(num_core)
+        if self.arrowfmt:
+            return self.get_arrow_chunksize(num_core)
         f = open(self.path)
         max_data_line_no = 0
         max_line_no = 0
@@ -186,53 +247,471 @@ class FileReader(BaseFile):
         len_poss = len(poss)
         return max_line_no, chunksize, poss, len_poss, max_data_line_no
 
-    def loop_data(self):
+    def get_chunk_ranges(self, num_chunks: int) -> List[Tuple[int, Optional[int]]]:
+        """Returns (seekpos, endpos) of up to num_chunks chunks of the data rows.
+
+        Positions are byte offsets of line starts in text files and row numbers
+        in Arrow files. Text files are not read through. Chunk boundaries are
+        found by seeking to equal fractions of the file and moving to the next
+        line. endpos of the last chunk is None.
+
+        Positions in sharded files count the data of the shards one after
+        another, starting at 0. Shards merged by a key are not split.
+        """
+        if self.merge_key:
+            return [(0, None)]
+        segments = self.get_data_segments()
+        first_pos = segments[0][3]
+        data_size = sum([end - start for _, start, end, _ in segments])
+        starts = [first_pos]
+        for chunk_no in range(1, num_chunks):
+            pos = first_pos + data_size * chunk_no // num_chunks
+            for reader, start, end, base in segments:
+                if pos >= base + end - start:
+                    continue
+                local_pos = reader.get_row_start(start + pos - base)
+                pos = base + min(local_pos, end) - start
+                break
+            if pos >= first_pos + data_size:
+                break
+            if pos > starts[-1]:
+                starts.append(pos)
+        ends: List[Optional[int]] = [v for v in starts[1:]]
+        ends.append(None)
+        return list(zip(starts, ends))
+
+    def get_data_segments(self) -> List[Tuple["FileReader", int, int, int]]:
+        """Returns the reader, data start, data end, and position of the data
+        start of each shard. For unsharded files, positions are local."""
+        if not self.shard_readers:
+            start, end = self.get_data_extent()
+            return [(self, start, end, start)]
+        segments = []
+        base = 0
+        for shard_reader in self.shard_readers:
+            start, end = shard_reader.get_data_extent()
+            segments.append((shard_reader, start, end, base))
+            base += end - start
+        return segments
+
+    def get_data_extent(self) -> Tuple[int, int]:
+        """Start and end positions of the data rows."""
+        from os.path import getsize
+
+        if self.arrowfmt:
+            return 0, self.estimate_num_data_lines()
+        with open(self.path, "rb") as f:
+            return self.get_data_start(f), getsize(self.path)
+
+    def get_row_start(self, pos: int) -> int:
+        """Position of the first row which starts at or after pos."""
+        if self.arrowfmt:
+            return pos
+        with open(self.path, "rb") as f:
+            # The line at the seek position is skipped unless the position is
+            # right after a newline.
+            f.seek(pos - 1)
+            f.readline()
+            return f.tell()
+
+    def get_data_start(self, f) -> int:
+        """Byte offset of the first line after the header lines."""
+        f.seek(0)
+        pos = 0
+        for line in f:
+            if not line.startswith(b"#"):
+                break
+            pos += len(line)
+        f.seek(pos)
+        return pos
+
+    def estimate_num_data_lines(self, num_sample_lines: int = 1000) -> int:
+        """Number of data rows, estimated from the average length of the first
+        num_sample_lines lines in text files."""
+        from os.path import getsize
+
+        if self.shard_readers:
+            return sum(
+                [
+                    shard_reader.estimate_num_data_lines(num_sample_lines)
+                    for shard_reader in self.shard_readers
+                ]
+            )
+        if self.arrowfmt:
+            with self.open_arrow_file() as reader:
+                return sum(
+                    [
+                        reader.get_batch(i).num_rows
+                        for i in range(reader.num_record_batches)
+                    ]
+                )
+        size = getsize(self.path)
+        with open(self.path, "rb") as f:
+            data_start = self.get_data_start(f)
+            num_lines = 0
+            num_bytes = 0
+            for line in f:
+                num_lines += 1
+                num_bytes += len(line)
+                if num_lines == num_sample_lines:
+                    break
+            else:
+                return num_lines
+        return int((size - data_start) / num_bytes * num_lines)
+
+    def get_arrow_chunksize(self, num_core):
+        """Same as get_chunksize, but chunk positions are row numbers."""
+        num_rows = self.estimate_num_data_lines()
+        chunksize = max(int(num_rows / num_core), 1)
+        poss = [[0, 0]]
+        for row_no in range(chunksize, num_rows, chunksize):
+            if len(poss) == num_core:
+                break
+            poss.append([row_no, chunksize])
+        return num_rows, chunksize, poss, len(poss), num_rows
+
+    def get_shard_chunksize(self, num_core):
+        """Same as get_chunksize, but chunk positions count the data of the
+        shards one after another. Shards merged by a key are one chunk."""
+        if self.merge_key:
+            num_rows = sum([1 for _ in self.loop_data(row_type="tuple")])
+            return num_rows, max(num_rows, 1), [[0, 0]], 1, num_rows
+        segments = self.get_data_segments()
+        num_rows = sum(
+            [sum([1 for _ in reader._loop_row_starts()]) for reader, *_ in segments]
+        )
+        chunksize = max(int(num_rows / num_core), 1)
+        poss = [[0, 0]]
+        row_no = 0
+        for reader, start, _, base in segments:
+            for pos in reader._loop_row_starts():
+                if row_no and row_no % chunksize == 0 and len(poss) < num_core:
+                    poss.append([base + pos - start, chunksize])
+                row_no += 1
+        return num_rows, chunksize, poss, len(poss), num_rows
+
+    def _loop_row_starts(self):
+        """Yields the start position of each data row."""
+        import csv
+
+        if self.arrowfmt:
+            yield from range(self.estimate_num_data_lines())
+            return
+        with open(self.path, "rb") as f:
+            end_of_row = [self.get_data_start(f)]
+            if not self.csvfmt:
+                for line in f:
+                    if not line.startswith(b"#"):
+                        yield end_of_row[0]
+                    end_of_row[0] += len(line)
+                return
+
+            def loop_lines():
+                for line in f:
+                    end_of_row[0] += len(line)
+                    yield line.decode(self.encoding)
+
+            csv.field_size_limit(1147483647)
+            row_start = end_of_row[0]
+            for row in csv.reader(loop_lines()):
+                if row and not row[0].startswith("#"):
+                    yield row_start
+                row_start = end_of_row[0]
+
+    def open_arrow_file(self):
+        import pyarrow as pa
+
+        return pa.ipc.open_file(pa.memory_map(self.path))
+
+    def loop_data(
+        self,
+        row_type: str = "dict",
+        col_names: Optional[List[str]] = None,
+        on_error: Optional[Callable[[int, List[str], Exception], Any]] = None,
+    ):
+        """Yields line numbers, tokens, and decoded rows.
+
+        Args:
+            row_type: "dict", "tuple", or "namedtuple"
+            col_names: Names of the columns to decode. All columns if None.
+                Names not in the file are decoded to None.
+            on_error: Called with the line number, tokens, and error of each
+                malformed row, which is then skipped. Errors are raised if None.
+        """
         from ..exceptions import BadFormatError
-        from json import loads
 
+        if self.shard_readers:
+            yield from self._loop_shard_data(
+                row_type=row_type, col_names=col_names, on_error=on_error
+            )
+            return
+        if self.arrowfmt:
+            yield from self._loop_arrow_data(row_type=row_type, col_names=col_names)
+            return
+        decode_row = self.get_row_decoder(row_type=row_type, col_names=col_names)
+        num_cols = len(self.columns)
         for lnum, toks in self._loop_data():
-            out = {}
-            if len(toks) < len(self.columns):
-                err_msg = "Too few columns. Received %s. Expected %s." % (
+            if len(toks) < num_cols:
+                err_msg = "Too few columns at line %s. Received %s. Expected %s." % (
+                    lnum,
                     len(toks),
-                    len(self.columns),
+                    num_cols,
                 )
-                return BadFormatError(err_msg)
-            for col_index, col_def in self.columns.items():
-                col_name = col_def.name
-                col_type = col_def.type
-                tok = toks[col_index]
-                if tok == "":
-                    out[col_name] = None
-                else:
-                    if col_type == "string":
-                        out[col_name] = tok
-                    elif col_type == "int":
-                        try:
-                            out[col_name] = int(tok)
-                        except ValueError:
-                            try:
-                                out[col_name] = int(float(tok))
-                            except Exception:
-                                out[col_name] = None
-                        except Exception:
-                            out[col_name] = None
-                    elif col_type == "float":
-                        try:
-                            tok = loads(tok)
-                            if type(tok) == list:
-                                out[col_name] = ",".join([str(v) for v in tok])
-                            else:
-                                out[col_name] = float(tok)
-                        except Exception:
-                            tok = None
-            yield lnum, toks, out
+                if on_error is None:
+                    raise BadFormatError(err_msg)
+                on_error(lnum, toks, BadFormatError(err_msg))
+                continue
+            yield lnum, toks, decode_row(toks)
 
     def get_data(self):
         all_data = [d for _, _, d in self.loop_data()]
         return all_data
 
+    def get_col_nos(self, col_names: Optional[List[str]] = None) -> List[Optional[int]]:
+        if col_names is None:
+            return sorted(self.columns.keys())
+        name_to_col_no = {
+            col_def.name: col_no for col_no, col_def in self.columns.items()
+        }
+        return [name_to_col_no.get(col_name) for col_name in col_names]
+
+    def get_row_decoder(
+        self, row_type: str = "dict", col_names: Optional[List[str]] = None
+    ):
+        """Returns a function which converts the tokens of a line to a row.
+
+        The function is compiled once from the column definitions, so that
+        the type of each column is not looked up for every token. Numbers
+        are converted inline, and rows with a token which is not a plain
+        number are converted again token by token.
+        """
+        col_nos = self.get_col_nos(col_names)
+        if col_names is None:
+            col_names = [self.columns[col_no].name for col_no in col_nos]
+        fast_exprs = []
+        exprs = []
+        for col_no in col_nos:
+            if col_no is None:
+                fast_exprs.append("None")
+                exprs.append("None")
+                continue
+            col_type = self.columns[col_no].type
+            tok = f"t[{col_no}]"
+            if col_type == "int":
+                fast_exprs.append(f"(int({tok}) if {tok} else None)")
+                exprs.append(f"decode_int({tok})")
+            elif col_type == "float":
+                fast_exprs.append(f"(float({tok}) if {tok} else None)")
+                exprs.append(f"decode_float({tok})")
+            else:
+                fast_exprs.append(f"({tok} or None)")
+                exprs.append(f"({tok} or None)")
+        namespace: Dict[str, Any] = {
+            "decode_int": decode_int_tok,
+            "decode_float": decode_float_tok,
+        }
+        if row_type == "namedtuple":
+            namespace["Row"] = self.get_row_class(col_names)
+        elif row_type not in ["dict", "tuple"]:
+            raise ValueError(f"Unknown row type: {row_type}")
+
+        def get_row_src(exprs: List[str]) -> str:
+            if row_type == "dict":
+                items = [f"{repr(name)}: {e}" for name, e in zip(col_names, exprs)]
+                return "{" + ", ".join(items) + "}"
+            elif row_type == "tuple":
+                return "(" + "".join([f"{e}, " for e in exprs]) + ")"
+            return "Row(" + ", ".join(exprs) + ")"
+
+        src = "\n".join(
+            [
+                "def decode_row(t):",
+                "    try:",
+                "        return " + get_row_src(fast_exprs),
+                "    except ValueError:",
+                "        return " + get_row_src(exprs),
+            ]
+        )
+        exec(src, namespace)
+        return namespace["decode_row"]
+
+    def get_row_class(self, col_names: List[str]):
+        from collections import namedtuple
+
+        return namedtuple("Row", col_names, rename=True)
+
+    def loop_value_batches(
+        self,
+        col_names: List[str],
+        batch_size: int,
+        on_error: Optional[Callable[[int, List[str], Exception], Any]] = None,
+    ):
+        """Yields lists of tuples of the values of col_names.
+
+        Arrow files are read a column at a time without parsing tokens.
+        on_error is as in loop_data.
+        """
+        if self.shard_readers and not self.merge_key and not self.chunksize:
+            for shard_reader in self.get_shard_readers_in_range():
+                yield from shard_reader.loop_value_batches(
+                    col_names, batch_size, on_error=on_error
+                )
+            return
+        value_batch = []
+        if not self.arrowfmt or self.shard_readers:
+            for _, _, row in self.loop_data(
+                row_type="tuple", col_names=col_names, on_error=on_error
+            ):
+                value_batch.append(row)
+                if len(value_batch) == batch_size:
+                    yield value_batch
+                    value_batch = []
+        else:
+            for _, columns in self._loop_arrow_columns(col_names):
+                value_batch.extend(zip(*columns))
+                while len(value_batch) >= batch_size:
+                    yield value_batch[:batch_size]
+                    value_batch = value_batch[batch_size:]
+        if value_batch:
+            yield value_batch
+
+    def _loop_arrow_columns(self, col_names: Optional[List[str]] = None):
+        col_nos = self.get_col_nos(col_names)
+        for first_row_no, batch in self._loop_arrow_batches():
+            columns = [
+                batch.column(col_no).to_pylist()
+                if col_no is not None
+                else [None] * batch.num_rows
+                for col_no in col_nos
+            ]
+            yield first_row_no, columns
+
+    def _loop_arrow_batches(self):
+        """Yields the row number of the first row and record batches of the
+        rows from seekpos, up to chunksize rows or to endpos."""
+        with self.open_arrow_file() as reader:
+            row_no = 0
+            start = self.seekpos or 0
+            end = self.endpos
+            if self.chunksize:
+                end = start + self.chunksize
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                batch_start = row_no
+                row_no += batch.num_rows
+                if row_no <= start:
+                    continue
+                if end is not None and batch_start >= end:
+                    break
+                offset = max(start - batch_start, 0)
+                length = batch.num_rows - offset
+                if end is not None:
+                    length = min(length, end - batch_start - offset)
+                if offset or length < batch.num_rows:
+                    batch = batch.slice(offset, length)
+                yield batch_start + offset, batch
+
+    def _loop_arrow_data(
+        self, row_type: str = "dict", col_names: Optional[List[str]] = None
+    ):
+        if col_names is None:
+            col_names = self.get_column_names()
+        row_class = None
+        if row_type == "namedtuple":
+            row_class = self.get_row_class(col_names)
+        elif row_type not in ["dict", "tuple"]:
+            raise ValueError(f"Unknown row type: {row_type}")
+        for first_row_no, columns in self._loop_arrow_columns(col_names):
+            for row_no, toks in enumerate(zip(*columns)):
+                if row_type == "dict":
+                    row = dict(zip(col_names, toks))
+                elif row_class is not None:
+                    row = row_class._make(toks)
+                else:
+                    row = toks
+                yield first_row_no + row_no + 1, list(toks), row
+
+    def _loop_shard_data(
+        self,
+        row_type: str = "dict",
+        col_names: Optional[List[str]] = None,
+        on_error: Optional[Callable[[int, List[str], Exception], Any]] = None,
+    ):
+        if self.merge_key:
+            yield from self._loop_merged_shard_data(
+                row_type=row_type, col_names=col_names, on_error=on_error
+            )
+            return
+        num_rows = 0
+        for shard_reader in self.get_shard_readers_in_range():
+            for row in shard_reader.loop_data(
+                row_type=row_type, col_names=col_names, on_error=on_error
+            ):
+                yield row
+                num_rows += 1
+                if self.chunksize and num_rows >= self.chunksize:
+                    return
+
+    def _loop_merged_shard_data(
+        self,
+        row_type: str = "dict",
+        col_names: Optional[List[str]] = None,
+        on_error: Optional[Callable[[int, List[str], Exception], Any]] = None,
+    ):
+        """Merges shards sorted by merge_key, keeping the first row of each
+        key value."""
+        from heapq import merge
+
+        key_col_no = self.merge_col_no
+        loops = []
+        for shard_reader in self.shard_readers:
+            shard_reader.seekpos = 0
+            shard_reader.endpos = None
+            shard_reader.chunksize = None
+            loops.append(
+                shard_reader.loop_data(
+                    row_type=row_type, col_names=col_names, on_error=on_error
+                )
+            )
+        seen_keys = set()
+        for lnum, toks, row in merge(*loops, key=lambda v: v[1][key_col_no] or ""):
+            key = toks[key_col_no]
+            if key in seen_keys:
+                continue
+            seen_keys.add(key)
+            yield lnum, toks, row
+
+    def get_shard_readers_in_range(self) -> List["FileReader"]:
+        """Shard readers set to read the rows from seekpos to endpos."""
+        readers = []
+        start_pos = self.seekpos or 0
+        for shard_reader, start, end, base in self.get_data_segments():
+            if self.endpos is not None and base >= self.endpos:
+                break
+            if base + end - start <= start_pos:
+                continue
+            shard_reader.seekpos = start + max(start_pos - base, 0)
+            shard_reader.endpos = None
+            if self.endpos is not None and self.endpos < base + end - start:
+                shard_reader.endpos = start + self.endpos - base
+            shard_reader.chunksize = None
+            readers.append(shard_reader)
+        return readers
+
+    def get_header_lines(self) -> List[str]:
+        """Returns the # lines of the header."""
+        if self.shard_readers:
+            return self.shard_readers[0].get_header_lines()
+        return list(self._loop_definition())
+
     def _loop_definition(self):
+        if self.arrowfmt:
+            with self.open_arrow_file() as reader:
+                metadata = reader.schema.metadata or {}
+            meta = metadata.get(ARROW_META_KEY, b"").decode("utf-8")
+            for line in meta.splitlines():
+                yield line
+            return
         if self.csvfmt:
             f = open(self.path, newline="", encoding=self.encoding)
         else:
@@ -248,7 +727,9 @@ class FileReader(BaseFile):
     def _loop_data(self):
         if not self.encoding:
             return
-        if self.csvfmt:
+        if self.csvfmt and self.endpos is not None:
+            yield from self._loop_csv_data_to_endpos()
+        elif self.csvfmt:
             with open(self.path, newline="") as f:
                 f.seek(self.seekpos)
                 lnum = 0
@@ -270,8 +751,12 @@ class FileReader(BaseFile):
             with open(self.path, "rb") as f:
                 if self.seekpos is not None:
                     f.seek(self.seekpos)
+                pos = f.tell()
                 lnum = 0
                 for line in f:
+                    if self.endpos is not None and pos >= self.endpos:
+                        break
+                    pos += len(line)
                     line = line.decode(self.encoding)
                     if line.startswith("#"):
                         continue
@@ -282,6 +767,33 @@ class FileReader(BaseFile):
                     if self.chunksize is not None and lnum == self.chunksize:
                         break
 
+    def _loop_csv_data_to_endpos(self):
+        """Rows which start before endpos. Byte offsets are counted from
+        undecoded lines, since text files do not tell positions while being
+        iterated."""
+        import csv
+
+        csv.field_size_limit(1147483647)
+        end_of_row = [self.seekpos or 0]
+
+        def loop_lines(f):
+            for line in f:
+                end_of_row[0] += len(line)
+                yield line.decode(self.encoding)
+
+        with open(self.path, "rb") as f:
+            f.seek(end_of_row[0])
+            csvreader = csv.reader(loop_lines(f))
+            num_data_rows = 0
+            for row in csvreader:
+                if row and not row[0].startswith("#"):
+                    yield csvreader.line_num, row
+                    num_data_rows += 1
+                    if self.chunksize and num_data_rows >= self.chunksize:
+                        return
+                if end_of_row[0] >= self.endpos:  # type: ignore
+                    return
+
 
 class FileWriter(BaseFile):
     def __init__(
@@ -292,16 +804,27 @@ class FileWriter(BaseFile):
         titles_prefix="#",
         columns=[],
         mode="w",
-        fmt="csv",
+        fmt: Optional[str] = None,
     ):
         from sys import platform
 
         super().__init__(path)
+        if fmt is None:
+            fmt = get_intermediate_format()
+        if fmt == "arrow" and mode != "w":
+            fmt = "csv"
         self.csvfmt: bool = False
         if fmt == "csv":
             self.csvfmt = True
+        self.arrowfmt: bool = fmt == "arrow"
+        self.arrow_writer = None
+        self.arrow_schema = None
+        self.meta_lines: List[str] = []
+        self.col_values: List[List[Any]] = []
         self.csvwriter = None
-        if fmt == "csv":
+        if self.arrowfmt:
+            self.wf = None
+        elif fmt == "csv":
             self.wf = open(self.path, mode, newline="", encoding="utf-8")
             from csv import writer
 
@@ -367,20 +890,32 @@ class FileWriter(BaseFile):
 
     def write_names(self, annotator_name, annotator_display_name, annotator_version):
         line = "#name={:}\n".format(annotator_name)
-        self.wf.write(line)
+        self.write_header_line(line)
         line = "#displayname={:}\n".format(annotator_display_name)
-        self.wf.write(line)
+        self.write_header_line(line)
         line = "#version={:}\n".format(annotator_version)
-        self.wf.write(line)
-        self.wf.flush()
+        self.write_header_line(line)
+        self.flush()
 
     def add_index(self, index_columns):
         self.write_meta_line("index", ",".join(index_columns))
 
     def write_meta_line(self, key, value):
         line = "#{:}={:}\n".format(key, value)
-        self.wf.write(line)
-        self.wf.flush()
+        self.write_header_line(line)
+        self.flush()
+
+    def write_header_line(self, line: str):
+        if not self.arrowfmt:
+            self.wf.write(line)  # type: ignore
+            return
+        if self.arrow_writer is not None:
+            raise Exception(f"Header lines should precede data in {self.path}")
+        self.meta_lines.append(line.rstrip("\n"))
+
+    def flush(self):
+        if self.wf is not None:
+            self.wf.flush()
 
     def write_definition(self, conf=None):
         from json import dumps
@@ -392,19 +927,27 @@ class FileWriter(BaseFile):
             self.write_meta_line(
                 "report_substitution", dumps(conf["report_substitution"])
             )
-        self.wf.flush()
+        self.flush()
 
     def write_input_paths(self, input_path_dict):
         from json import dumps
 
         s = "#input_paths={}\n".format(dumps(input_path_dict))
-        self.wf.write(s)
-        self.wf.flush()
+        self.write_header_line(s)
+        self.flush()
 
     def write_data(self, data):
         if not data:
             return
         self.prep_for_write()
+        if self.arrowfmt:
+            if not self.col_values:
+                self.col_values = [[] for _ in self.ordered_columns]
+            for values, col_def in zip(self.col_values, self.ordered_columns):
+                values.append(data.get(col_def.name))
+            if len(self.col_values[0]) >= ARROW_BATCH_SIZE:
+                self.write_arrow_batch()
+            return
         wtoks = [data.get(col.name, None) for col in self.columns.values()]
         if self.csvfmt:
             if self.csvwriter is not None:
@@ -417,8 +960,220 @@ class FileWriter(BaseFile):
         else:
             self.wf.write("\t".join(wtoks) + "\n")
 
+    def get_ordered_column_names(self) -> List[str]:
+        self.prep_for_write()
+        return [col_def.name for col_def in self.ordered_columns]
+
+    def write_values(self, values: List[Any]):
+        """Same as write_data, but with the values of all columns in order."""
+        self.prep_for_write()
+        if self.arrowfmt:
+            if not self.col_values:
+                self.col_values = [[] for _ in self.ordered_columns]
+            for col_values, value in zip(self.col_values, values):
+                col_values.append(value)
+            if len(self.col_values[0]) >= ARROW_BATCH_SIZE:
+                self.write_arrow_batch()
+            return
+        if self.csvfmt:
+            if self.csvwriter is not None:
+                self.csvwriter.writerow(values)
+        else:
+            self.wf.write("\t".join(values) + "\n")  # type: ignore
+
+    def get_arrow_schema(self):
+        import pyarrow as pa
+
+        fields = []
+        for col_def in self.ordered_columns:
+            if col_def.type == "int":
+                arrow_type = pa.int64()
+            elif col_def.type == "float":
+                arrow_type = pa.float64()
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(col_def.name, arrow_type))
+        meta = "\n".join(self.meta_lines).encode("utf-8")
+        return pa.schema(fields, metadata={ARROW_META_KEY: meta})
+
+    def write_arrow_batch(self):
+        import pyarrow as pa
+
+        if self.arrow_writer is None:
+            self.prep_for_write()
+            self.arrow_schema = self.get_arrow_schema()
+            self.arrow_writer = pa.ipc.new_file(self.path, self.arrow_schema)
+        if not self.col_values or not self.col_values[0]:
+            return
+        arrays = []
+        for col_def, values in zip(self.ordered_columns, self.col_values):
+            # Empty strings are read back as None, as from text files.
+            values = [None if v == "" else v for v in values]
+            arrow_type = self.arrow_schema.field(len(arrays)).type
+            try:
+                arrays.append(pa.array(values, type=arrow_type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                arrays.append(
+                    pa.array(coerce_values(values, col_def.type), type=arrow_type)
+                )
+        self.arrow_writer.write_batch(
+            pa.RecordBatch.from_arrays(arrays, schema=self.arrow_schema)
+        )
+        self.col_values = []
+
     def close(self):
-        self.wf.close()
+        if self.arrowfmt:
+            self.write_arrow_batch()
+            if self.arrow_writer is not None:
+                self.arrow_writer.close()
+            return
+        self.wf.close()  # type: ignore
+
+
+def decode_int_tok(tok: str) -> Optional[int]:
+    if tok == "":
+        return None
+    try:
+        return int(tok)
+    except ValueError:
+        try:
+            return int(float(tok))
+        except Exception:
+            return None
+
+
+def decode_float_tok(tok: str) -> Union[float, str, None]:
+    """Lists, as JSON, of float columns are decoded to comma-separated strings."""
+    from json import loads
+
+    if tok == "":
+        return None
+    try:
+        return float(tok)
+    except ValueError:
+        pass
+    try:
+        value = loads(tok)
+        if type(value) == list:
+            return ",".join([str(v) for v in value])
+        return float(value)
+    except Exception:
+        return None
+
+
+def write_shard_manifest(
+    path: str, shard_paths: List[str], merge_key: Optional[str] = None
+):
+    """Writes a file at path which FileReader reads as the data rows of
+    shard_paths, concatenated, or merged by merge_key if given. Shards merged
+    by a key should be sorted by and unique in it."""
+    from os.path import relpath
+    from os.path import dirname
+    from os.path import abspath
+
+    base_dir = dirname(abspath(path))
+    with open(path, "w", encoding="utf-8") as wf:
+        for shard_path in shard_paths:
+            wf.write(SHARD_MANIFEST_PREFIX + relpath(shard_path, base_dir) + "\n")
+        if merge_key:
+            wf.write(f"#merge_key={merge_key}\n")
+
+
+def read_shard_manifest(path: str) -> Tuple[List[str], Optional[str]]:
+    """Returns the shard paths and the merge key of the shard manifest at path.
+    The list is empty if path is not a shard manifest."""
+    from os.path import isfile
+    from os.path import join
+    from os.path import dirname
+
+    shard_paths = []
+    merge_key = None
+    if not isfile(path):
+        return shard_paths, merge_key
+    with open(path, "rb") as f:
+        if f.read(len(SHARD_MANIFEST_PREFIX)) != SHARD_MANIFEST_PREFIX.encode():
+            return shard_paths, merge_key
+        f.seek(0)
+        for line in f:
+            line = line.decode("utf-8").rstrip("\r\n")
+            if line.startswith(SHARD_MANIFEST_PREFIX):
+                shard_path = line[len(SHARD_MANIFEST_PREFIX) :]
+                shard_paths.append(join(dirname(path), shard_path))
+            elif line.startswith("#merge_key="):
+                merge_key = line.split("=", 1)[1]
+    return shard_paths, merge_key
+
+
+def is_arrow_file(path) -> bool:
+    from os.path import isfile
+
+    if not isfile(path):
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(ARROW_FILE_MAGIC)) == ARROW_FILE_MAGIC
+
+
+def get_intermediate_format() -> str:
+    from ..system import get_sys_conf_value
+    from ..system.consts import intermediate_format_key
+
+    fmt = get_sys_conf_value(intermediate_format_key)
+    if fmt == "arrow":
+        return "arrow"
+    return "csv"
+
+
+def coerce_values(values: List[Any], col_type: str) -> List[Any]:
+    """Converts values as FileReader converts the tokens of text files.
+    Values which cannot be converted become None."""
+    coerced = []
+    for value in values:
+        if value is None:
+            coerced.append(None)
+            continue
+        try:
+            if col_type == "int":
+                try:
+                    coerced.append(int(value))
+                except ValueError:
+                    coerced.append(int(float(value)))
+            elif col_type == "float":
+                coerced.append(float(value))
+            else:
+                coerced.append(str(value))
+        except Exception:
+            coerced.append(None)
+    return coerced
+
+
+def concat_intermediate_files(paths: List[str], out_path: str):
+    """Writes the header of the first file and the data rows of all files
+    to out_path. Files should have the same columns."""
+    from shutil import copyfileobj
+
+    if paths and is_arrow_file(paths[0]):
+        import pyarrow as pa
+
+        writer = None
+        for path in paths:
+            with pa.ipc.open_file(pa.memory_map(path)) as reader:
+                if writer is None:
+                    writer = pa.ipc.new_file(out_path, reader.schema)
+                for i in range(reader.num_record_batches):
+                    writer.write_batch(reader.get_batch(i))
+        if writer is not None:
+            writer.close()
+        return
+    with open(out_path, "wb") as wf:
+        for path_no, path in enumerate(paths):
+            with open(path, "rb") as f:
+                line = f.readline()
+                while line.startswith(b"#"):
+                    if path_no == 0:
+                        wf.write(line)
+                    line = f.readline()
+                wf.write(line)
+                copyfileobj(f, wf)
 
 
 class CrxMapping(object):
@@ -711,6 +1466,9 @@ class ColumnDefinition(object):
 def read_crv(fpath):
     import polars as pl
 
+    if is_arrow_file(fpath):
+        df = pl.read_ipc(fpath)
+        return df.select(["uid", "chrom", "pos", "pos_end", "ref_base", "alt_base"])
     # Read the CSV using the comment character
     df = pl.read_csv(
         fpath,
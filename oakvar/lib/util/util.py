@@ -799,85 +799,206 @@ def get_result_db_conn(db_path: str):
 
 
 def get_sample_uid_variant_arrays(
-    db_path: str, variant_criteria=None, use_zygosity: bool = True
-) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-    """Gets a Polars DataFrame of the presence of variants in samples.
+    db_path: str,
+    variant_criteria=None,
+    use_zygosity: bool = True,
+    dtype=np.float64,
+    sparse: bool = False,
+    samples_per_block: int = 1000,
+):
+    """Gets arrays of the presence of variants in samples.
 
     Rows are samples and columns are variants.
 
     Args:
         db_path (str): Path to the OakVar result database file
-                       from which a Polars DataFrame will be extracted.
+                       from which the arrays will be extracted.
+        variant_criteria (Optional[str]): SQL condition on the variant table
+            to select variants. For example, `"clinvar__sig='Pathogenic'"`.
+        use_zygosity (bool): If True, het is 1 and hom is 2. If False,
+            presence is 1.
+        dtype: numpy dtype of the presence array. `numpy.int8` takes
+            one eighth of the memory of the default.
+        sparse (bool): If True, the presence array is a
+            `scipy.sparse.csr_matrix`. scipy should be installed.
+        samples_per_block (int): Number of samples read at once.
 
     Returns:
-        Optional[Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]]: If no error, three DataFrames will be returned.
+        Tuple[numpy.ndarray, numpy.ndarray, Any]: Three arrays.
             The first array is a 1D array of sample names.
             The second array is a 1D array of variant UIDs.
             The third array is a 2D array of variant presence in samples.
     """
+    if sparse:
+        try:
+            from scipy.sparse import csr_matrix
+            from scipy.sparse import vstack
+        except ModuleNotFoundError:
+            raise ValueError(
+                "To get a sparse array, you need to install the `scipy` module."
+            )
+    conn = get_result_db_conn(db_path)
+    if not conn:
+        raise ValueError(f"{db_path} is not an OakVar result database file.")
+    try:
+        samples, uids = get_sample_uid_axes(db_path, variant_criteria, conn=conn)
+        arr = None
+        sparse_blocks = []
+        if not sparse:
+            arr = np.zeros([len(samples), len(uids)], dtype=dtype)
+        for start in range(0, len(samples), samples_per_block):
+            block_samples = samples[start : start + samples_per_block]
+            rows, cols, values = get_sample_block_entries(
+                db_path,
+                block_samples,
+                uids,
+                variant_criteria=variant_criteria,
+                use_zygosity=use_zygosity,
+                conn=conn,
+            )
+            if arr is not None:
+                arr[rows + start, cols] = values
+            else:
+                sparse_blocks.append(
+                    csr_matrix(  # type: ignore
+                        (values.astype(dtype), (rows, cols)),
+                        shape=(len(block_samples), len(uids)),
+                    )
+                )
+    finally:
+        conn.close()
+    if arr is None:
+        if sparse_blocks:
+            arr = vstack(sparse_blocks, format="csr")  # type: ignore
+        else:
+            arr = csr_matrix((len(samples), len(uids)), dtype=dtype)  # type: ignore
+    return samples, uids, arr
 
-    import sqlite3
-    import numpy as np
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+def iter_sample_uid_variant_blocks(
+    db_path: str,
+    variant_criteria=None,
+    use_zygosity: bool = True,
+    dtype=np.int8,
+    samples_per_block: int = 1000,
+):
+    """Yields arrays of the presence of variants in blocks of samples.
+
+    Only one block of samples is in memory at a time.
+
+    Args:
+        db_path (str): Path to the OakVar result database file
+        variant_criteria (Optional[str]): SQL condition on the variant table
+            to select variants.
+        use_zygosity (bool): If True, het is 1 and hom is 2. If False,
+            presence is 1.
+        dtype: numpy dtype of the presence arrays
+        samples_per_block (int): Number of samples in a block
+
+    Yields:
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]: Sample names of
+            the block, variant UIDs, and a 2D array of variant presence in
+            the samples of the block.
+    """
+    conn = get_result_db_conn(db_path)
+    if not conn:
+        raise ValueError(f"{db_path} is not an OakVar result database file.")
+    try:
+        samples, uids = get_sample_uid_axes(db_path, variant_criteria, conn=conn)
+        for start in range(0, len(samples), samples_per_block):
+            block_samples = samples[start : start + samples_per_block]
+            rows, cols, values = get_sample_block_entries(
+                db_path,
+                block_samples,
+                uids,
+                variant_criteria=variant_criteria,
+                use_zygosity=use_zygosity,
+                conn=conn,
+            )
+            arr = np.zeros([len(block_samples), len(uids)], dtype=dtype)
+            arr[rows, cols] = values
+            yield block_samples, uids, arr
+    finally:
+        conn.close()
+
+
+def get_sample_uid_axes(
+    db_path: str, variant_criteria=None, conn=None
+) -> Tuple[np.ndarray, np.ndarray]:
+    cursor = conn.cursor()  # type: ignore
     cursor.execute("select distinct(base__sample_id) from sample")
     samples = np.array([r[0] for r in cursor.fetchall()], dtype=str)
+    cursor.close()
     samples.sort()
+    sql = "select base__uid from variant"
+    if variant_criteria is not None:
+        sql += f" where {variant_criteria}"
+    sql += " order by base__uid"
+    df = get_df_from_db(db_path, table_name="variant", sql=sql, conn=conn)
+    if df is None or df.height == 0:
+        uids = np.array([], dtype=np.uint32)
+    else:
+        uids = df["base__uid"].to_numpy().astype(np.uint32)
+    return samples, uids
+
+
+def get_sample_block_entries(
+    db_path: str,
+    block_samples: np.ndarray,
+    uids: np.ndarray,
+    variant_criteria=None,
+    use_zygosity: bool = True,
+    conn=None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Gets the sample numbers, variant numbers, and values of the sample
+    table rows of a block of samples with one query."""
+    import polars as pl
+
+    sample_ids = ",".join(
+        ["'" + str(sample).replace("'", "''") + "'" for sample in block_samples]
+    )
+    columns = "base__sample_id, base__uid"
+    if use_zygosity:
+        columns += ", base__zygosity"
+    sql = f"select {columns} from sample where base__sample_id in ({sample_ids})"
     if variant_criteria is not None:
-        cursor.execute(
-            f"select distinct(base__uid) from variant where {variant_criteria} order by base__uid"
+        sql += (
+            " and base__uid in (select base__uid from variant where "
+            + f"{variant_criteria})"
+        )
+    df = get_df_from_db(db_path, table_name="sample", sql=sql, conn=conn)
+    if df is None or df.height == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.int8)
+    rows = (
+        df["base__sample_id"]
+        .replace_strict(
+            list(block_samples),
+            list(range(len(block_samples))),
+            return_dtype=pl.Int64,
         )
+        .to_numpy()
+    )
+    row_uids = df["base__uid"].to_numpy()
+    cols = np.searchsorted(uids, row_uids)
+    if use_zygosity:
+        values = (
+            df["base__zygosity"]
+            .replace_strict(["het", "hom"], [1, 2], default=0, return_dtype=pl.Int8)
+            .fill_null(0)
+            .to_numpy()
+        )
+        if (values == 0).any():
+            zygosity = df["base__zygosity"].to_numpy()[values == 0][0]
+            raise ValueError(f"Unknown zygosity: {zygosity}")
     else:
-        cursor.execute("select distinct(base__uid) from variant order by base__uid")
-    uids = [r[0] for r in cursor.fetchall()]
-    num_samples = len(samples)
-    num_uids = len(uids)
-    arr = np.zeros([num_samples, num_uids])
-    for sample_no in range(num_samples):
-        if use_zygosity:
-            if variant_criteria is not None:
-                cursor.execute(
-                    "select s.base__uid, s.base__zygosity from (select base__uid, base__zygosity from sample where base__sample_id=?) as s, (select base__uid from variant where "
-                    + variant_criteria
-                    + ") as v on s.base__uid = v.base__uid order by s.base__uid",
-                    (samples[sample_no],),
-                )
-            else:
-                cursor.execute(
-                    "select base__uid, base__zygosity from sample where base__sample_id=? order by base__uid",
-                    (samples[sample_no],),
-                )
-        else:
-            if variant_criteria is not None:
-                cursor.execute(
-                    "select s.base__uid from (select base__uid from sample where base__sample_id=?) as s, (select base__uid from variant where "
-                    + variant_criteria
-                    + ") as v on s.base__uid = v.base__uid order by s.base__uid",
-                    (samples[sample_no],),
-                )
-            else:
-                cursor.execute(
-                    "select base__uid from sample where base__sample_id=? order by base__uid",
-                    (samples[sample_no],),
-                )
-        for r in cursor.fetchall():
-            if variant_criteria is not None:
-                pos = uids.index(r[0])
-            else:
-                pos = r[0] - 1
-            if use_zygosity:
-                zygosity = r[1]
-                if zygosity == "het":
-                    arr[sample_no][pos] = 1
-                elif zygosity == "hom":
-                    arr[sample_no][pos] = 2
-                else:
-                    raise ValueError(f"Unknown zygosity: {zygosity}")
-            else:
-                arr[sample_no][pos] = 1
-    uids = np.array(uids, dtype=np.uint32)
-    return samples, uids, arr
+        values = np.ones(len(rows), dtype=np.int8)
+    # Sample rows of variants not in the variant table are dropped.
+    found = cols < len(uids)
+    found[found] = uids[cols[found]] == row_uids[found]
+    if not found.all():
+        rows, cols, values = rows[found], cols[found], values[found]
+    return rows, cols, values
 
 
 def get_df_from_db(
@@ -949,11 +1070,11 @@ def get_df_from_db(
         conn_url = f"sqlite://{db_path_to_use}"
     if partition_on and num_cores > 1:
         if library == "polars":
-            df = pl.read_database(
+            df = pl.read_database_uri(
                 sql, conn_url, partition_on=partition_on, partition_num=num_cores
-            ) # type: ignore
+            )
     else:
-        df = pl.read_database(sql, conn_url)  # type: ignore
+        df = pl.read_database_uri(sql, conn_url)
     return df
 
 